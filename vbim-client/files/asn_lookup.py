@@ -8,24 +8,223 @@
 
 import sys
 import re
-from dns.resolver import Resolver
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from tempfile import NamedTemporaryFile
+try:
+    from Queue import Queue, Empty
+except ImportError:
+    from queue import Queue, Empty
+from dns.resolver import NoAnswer, NXDOMAIN, Resolver
 from IPy import IP
 
 ASN_REGEX = re.compile(r'^(?P<asn>\d+) |')
 
-def get_asn(ip):
+def query_cymru(ip):
+    """Return the origin AS of ip, None if it has none; raises if the lookup fails."""
+    ipy = IP(ip)
+    host = ipy.reverseName()
+    host = host.replace('.in-addr.arpa.', '.origin.asn.cymru.com.')
+    host = host.replace('.ip6.arpa.', '.origin6.asn.cymru.com.')
     try:
-        ipy = IP(ip)
-        if ipy.iptype() == 'PRIVATE':
-            return None
-        host = ipy.reverseName()
-        host = host.replace('.in-addr.arpa.', '.origin.asn.cymru.com.')
-        host = host.replace('.ip6.arpa.', '.origin6.asn.cymru.com.')
         record = Resolver().query(host, "TXT")
-        m = ASN_REGEX.match(record[0].strings[0])
-        return m.group('asn')
-    except Exception as e:
+    except (NXDOMAIN, NoAnswer):
         return None
+    m = ASN_REGEX.match(record[0].strings[0])
+    return m.group('asn')
+
+class PrefixTable(object):
+    """Longest prefix match from IP prefixes to AS numbers, e.g. a CAIDA pfx2as snapshot."""
+
+    def __init__(self):
+        # (version, prefix length) -> {network as int: asn}
+        self.networks = {}
+        self.lengths = {4: [], 6: []}
+
+    def add(self, prefix, asn):
+        net = IP(prefix, make_net=True)
+        key = (net.version(), net.prefixlen())
+        if key not in self.networks:
+            self.networks[key] = {}
+            self.lengths[net.version()] = sorted(self.lengths[net.version()] + [net.prefixlen()], reverse=True)
+        self.networks[key][net.int()] = asn
+
+    def load(self, path):
+        """Load "prefix<TAB>length<TAB>asn" (pfx2as) or "prefix/length asn" lines.
+
+           For multi-origin prefixes ("123_456" or "123,456") the first AS is used.
+        """
+        with open(path) as f:
+            for line in f:
+                fields = line.split()
+                if not fields or fields[0].startswith('#'):
+                    continue
+                try:
+                    if len(fields) >= 3:
+                        prefix = "{}/{}".format(fields[0], fields[1])
+                        asn = fields[2]
+                    else:
+                        prefix, asn = fields[0], fields[1]
+                    self.add(prefix, re.split(r'[_,]', asn)[0])
+                except Exception:
+                    continue
+        return self
+
+    def lookup(self, ip):
+        ipy = IP(ip)
+        version = ipy.version()
+        bits = 32 if version == 4 else 128
+        address = ipy.int()
+        for length in self.lengths[version]:
+            mask = ((1 << length) - 1) << (bits - length)
+            asn = self.networks[(version, length)].get(address & mask)
+            if asn is not None:
+                return asn
+        return None
+
+class AsnResolver(object):
+    """Resolves IP addresses to AS numbers with caching.
+
+       Lookups go through an in-memory LRU, the prefix table (if any), the
+       on-disk cache (if any, entries expire after ttl, addresses without an
+       AS after negative_ttl) and finally query, which defaults to a Team
+       Cymru DNS lookup. Lookups that fail (query raises) are not cached.
+       get_asns() resolves the remaining addresses concurrently with at most
+       workers threads.
+    """
+
+    def __init__(self, cache_file=None, ttl=7 * 86400, negative_ttl=3600, lru_size=4096, prefix_table=None, query=query_cymru, workers=4):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lru_size = lru_size
+        self.prefix_table = prefix_table
+        self.query = query
+        self.workers = workers
+        self.lru = OrderedDict()
+        self.lock = threading.Lock()
+        self.disk = {}
+        self.dirty = False
+        if cache_file:
+            self.disk = self._read_cache_file()
+
+    def _read_cache_file(self):
+        try:
+            with open(self.cache_file) as f:
+                entries = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+        now = time.time()
+        return dict((ip, entry) for ip, entry in entries.items() if entry[1] > now)
+
+    def _remember(self, ip, asn):
+        with self.lock:
+            self.lru.pop(ip, None)
+            self.lru[ip] = asn
+            if len(self.lru) > self.lru_size:
+                self.lru.popitem(last=False)
+
+    def _cached(self, ip):
+        """Return (True, asn) if ip can be resolved without a query, else (False, None)."""
+        with self.lock:
+            if ip in self.lru:
+                asn = self.lru.pop(ip)
+                self.lru[ip] = asn
+                return True, asn
+        try:
+            if IP(ip).iptype() == 'PRIVATE':
+                return True, None
+        except Exception:
+            return True, None
+        if self.prefix_table is not None:
+            asn = self.prefix_table.lookup(ip)
+            if asn is not None:
+                self._remember(ip, asn)
+                return True, asn
+        entry = self.disk.get(ip)
+        if entry is not None and entry[1] > time.time():
+            self._remember(ip, entry[0])
+            return True, entry[0]
+        return False, None
+
+    def _query(self, ip):
+        try:
+            asn = self.query(ip)
+        except Exception:
+            return None
+        self._remember(ip, asn)
+        with self.lock:
+            self.disk[ip] = [asn, time.time() + (self.ttl if asn else self.negative_ttl)]
+            self.dirty = True
+        return asn
+
+    def get_asn(self, ip):
+        found, asn = self._cached(ip)
+        if found:
+            return asn
+        return self._query(ip)
+
+    def get_asns(self, ips):
+        """Resolve the unique addresses in ips, return a dict ip -> asn (or None)."""
+        result = {}
+        pending = Queue()
+        for ip in set(ips):
+            found, asn = self._cached(ip)
+            if found:
+                result[ip] = asn
+            else:
+                pending.put(ip)
+
+        def worker():
+            while True:
+                try:
+                    ip = pending.get_nowait()
+                except Empty:
+                    return
+                result[ip] = self._query(ip)
+
+        threads = [threading.Thread(target=worker) for i in range(min(self.workers, pending.qsize()))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return result
+
+    def refresh(self):
+        """Add the entries other processes saved to the on-disk cache meanwhile."""
+        if not self.cache_file:
+            return
+        entries = self._read_cache_file()
+        with self.lock:
+            entries.update(self.disk)
+            self.disk = entries
+
+    def save(self):
+        """Write the on-disk cache, merged with entries other processes saved meanwhile."""
+        if not self.cache_file or not self.dirty:
+            return
+        entries = self._read_cache_file()
+        with self.lock:
+            entries.update(self.disk)
+            self.dirty = False
+        directory = os.path.dirname(os.path.abspath(self.cache_file))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        f = NamedTemporaryFile(mode="w", delete=False, dir=directory)
+        json.dump(entries, f)
+        f.close()
+        os.rename(f.name, self.cache_file)
+
+_default_resolver = AsnResolver()
+
+def get_asn(ip):
+    return _default_resolver.get_asn(ip)
+
+def get_asns(ips):
+    return _default_resolver.get_asns(ips)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,214 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Pool of pre-launched headless Chrome sessions.
+
+The pool lives in the process that runs the configurations of an interface.
+Every session has its own ChromeDriver service and temporary profile
+directory. Experiment processes attach to a leased session with
+attach_driver(), the pool resets (or replaces) it after the run and tears
+everything down in close().
+"""
+
+import os
+import shutil
+import signal
+import tempfile
+import time
+import traceback
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+from selenium.webdriver.chrome.remote_connection import ChromeRemoteConnection
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
+
+TAG = "[browser_pool.py] "
+
+class AttachedDriver(RemoteWebDriver):
+    """Remote driver bound to an already running session instead of creating one."""
+
+    def __init__(self, info):
+        self._attach_info = info
+        RemoteWebDriver.__init__(self,
+                                 command_executor=ChromeRemoteConnection(remote_server_addr=info["service_url"]),
+                                 desired_capabilities={})
+
+    def start_session(self, capabilities, browser_profile=None):
+        self.session_id = self._attach_info["session_id"]
+        self.capabilities = self._attach_info["capabilities"]
+        self.w3c = self._attach_info["w3c"]
+
+    def quit(self):
+        # The session belongs to the pool
+        pass
+
+def attach_driver(info):
+    """Return a driver for the session described by BrowserSession.info()."""
+    return AttachedDriver(info)
+
+def execute_cdp(driver, cmd, params=None):
+    """Run a Chrome DevTools Protocol command through ChromeDriver.
+
+       The Chrome remote connection of Selenium 3 does not know the command,
+       so it is registered on the connection first.
+    """
+    commands = driver.command_executor._commands
+    if "executeCdpCommand" not in commands:
+        commands["executeCdpCommand"] = ("POST", "/session/$sessionId/chromium/send_command_and_get_result")
+    return driver.execute("executeCdpCommand", {"cmd": cmd, "params": params or {}})
+
+def kill_profile_processes(profile_dir):
+    """Kill leftover Chrome processes started with the given profile directory."""
+    marker = "--user-data-dir=" + profile_dir
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(os.path.join("/proc", pid, "cmdline"), "rb") as f:
+                cmdline = f.read().decode("utf-8", "replace")
+        except (IOError, OSError):
+            continue
+        if marker in cmdline:
+            try:
+                os.kill(int(pid), signal.SIGKILL)
+            except OSError:
+                pass
+
+class BrowserSession(object):
+    """A ChromeDriver service with one open Chrome session."""
+
+    def __init__(self, chrome_options, desired_capabilities, executable_path="chromedriver"):
+        self.profile_dir = tempfile.mkdtemp(prefix="vbim-chrome-")
+        self.uses = 0
+        self.service = None
+        self.driver = None
+
+        chrome_options.add_argument("--user-data-dir=" + self.profile_dir)
+        capabilities = chrome_options.to_capabilities()
+        capabilities.update(desired_capabilities)
+
+        time_start = time.time()
+        try:
+            self.service = Service(executable_path)
+            self.service.start()
+            self.driver = RemoteWebDriver(command_executor=ChromeRemoteConnection(remote_server_addr=self.service.service_url),
+                                          desired_capabilities=capabilities)
+        except Exception:
+            self.close()
+            raise
+        self.startup_latency = time.time() - time_start
+
+    def info(self):
+        """Picklable description of the session, passed to experiment processes."""
+        return {"service_url": self.service.service_url,
+                "session_id": self.driver.session_id,
+                "capabilities": self.driver.capabilities,
+                "w3c": self.driver.w3c,
+                "startup_latency": self.startup_latency,
+                "uses": self.uses,
+                "pid": self.service.process.pid}
+
+    def is_healthy(self):
+        try:
+            return (self.service.process.poll() is None and
+                    self.driver.execute_script("return 1;") == 1)
+        except Exception:
+            return False
+
+    def reset(self):
+        """Give the next configuration a clean context; return False if that is not possible."""
+        try:
+            url = urlparse(self.driver.current_url)
+            execute_cdp(self.driver, "Network.clearBrowserCache")
+            execute_cdp(self.driver, "Network.clearBrowserCookies")
+            if url.scheme in ("http", "https"):
+                execute_cdp(self.driver, "Storage.clearDataForOrigin",
+                            {"origin": "{}://{}".format(url.scheme, url.netloc), "storageTypes": "all"})
+            self.driver.get("about:blank")
+            # Drop console output that belongs to the previous run
+            self.driver.get_log("browser")
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        try:
+            if self.driver is not None:
+                self.driver.quit()
+        except Exception:
+            pass
+        try:
+            if self.service is not None:
+                self.service.stop()
+        except Exception:
+            pass
+        kill_profile_processes(self.profile_dir)
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+        self.driver = None
+        self.service = None
+
+class BrowserPool(object):
+    """Keeps up to size warm sessions and hands them out one configuration at a time.
+
+       A session is reused for at most max_uses configurations (0 = no limit)
+       and only if it can be reset to a clean state; otherwise it is replaced.
+    """
+
+    def __init__(self, size, options_factory, desired_capabilities, executable_path="chromedriver", max_uses=1, verbosity=0):
+        self.size = max(1, size)
+        self.options_factory = options_factory
+        self.desired_capabilities = desired_capabilities
+        self.executable_path = executable_path
+        self.max_uses = max_uses
+        self.verbosity = verbosity
+        self.idle = []
+        self.startup_latencies = []
+
+    def _launch(self):
+        session = BrowserSession(self.options_factory(), self.desired_capabilities, self.executable_path)
+        self.startup_latencies.append(session.startup_latency)
+        if self.verbosity > 1:
+            print(TAG + "Launched browser session in {:.3f} s".format(session.startup_latency))
+        return session
+
+    def fill(self):
+        while len(self.idle) < self.size:
+            self.idle.append(self._launch())
+
+    def acquire(self):
+        while self.idle:
+            session = self.idle.pop(0)
+            if session.is_healthy():
+                session.uses += 1
+                return session
+            if self.verbosity > 0:
+                print(TAG + "Discarding unhealthy browser session")
+            session.close()
+        session = self._launch()
+        session.uses += 1
+        return session
+
+    def release(self, session, reuse=True, refill=True):
+        if (reuse and (self.max_uses == 0 or session.uses < self.max_uses) and
+                session.is_healthy() and session.reset()):
+            self.idle.append(session)
+        else:
+            session.close()
+        if not refill:
+            return
+        try:
+            self.fill()
+        except Exception:
+            if self.verbosity > 0:
+                traceback.print_exc()
+
+    def close(self):
+        while self.idle:
+            self.idle.pop().close()
@@ -0,0 +1,62 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Background collector for the browser console log.
+
+The driver log buffer is drained periodically and every entry is written as
+one JSON line, so long sessions neither overflow the buffer nor keep the whole
+log in memory.
+"""
+
+import json
+import threading
+
+class ConsoleLogCollector(threading.Thread):
+    """Drains driver.get_log("browser") into fileobj every interval seconds.
+
+       Driver calls are made under lock if one is given, as the driver is
+       shared with the playback monitor. on_entries, if given, is called
+       with every drained batch of entries (e.g. to extract QoE events).
+    """
+
+    def __init__(self, driver, fileobj, interval=5, lock=None, on_entries=None):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.driver = driver
+        self.fileobj = fileobj
+        self.interval = interval
+        self.lock = lock or threading.Lock()
+        self.on_entries = on_entries
+        self.count = 0
+        self.errors = 0
+        self._stop_event = threading.Event()
+
+    def drain(self):
+        with self.lock:
+            entries = self.driver.get_log("browser")
+        for entry in entries:
+            self.fileobj.write(json.dumps(entry) + "\n")
+        self.fileobj.flush()
+        self.count += len(entries)
+        if self.on_entries is not None:
+            self.on_entries(entries)
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.drain()
+            except Exception:
+                self.errors += 1
+
+    def stop(self):
+        """Stop the thread and collect what is left in the buffer."""
+        self._stop_event.set()
+        self.join()
+        try:
+            self.drain()
+        except Exception:
+            self.errors += 1
@@ -0,0 +1,123 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Batch-level DNS cache.
+
+Resolves the host names used in a batch once per interface, with the queries
+sent from the interface address, and records how long each lookup took. The
+resolved (pinned) addresses are then used by the probes and can be passed to
+Chrome as host resolver rules, so that all measurements of the batch go to
+the same servers.
+"""
+
+import socket
+import threading
+import time
+try:
+    from Queue import Queue, Empty
+except ImportError:
+    from queue import Queue, Empty
+try:
+    from dns.resolver import Resolver
+except ImportError:
+    Resolver = None
+
+def is_address(host):
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, host)
+            return True
+        except (socket.error, ValueError):
+            pass
+    return False
+
+class DnsCache(object):
+    """Resolves each host once to its IPv4 addresses.
+
+       Queries are sent from source (the interface address) if dnspython is
+       available, else the system resolver is used without binding.
+    """
+
+    def __init__(self, source=None, timeout=5, nameservers=None, workers=4):
+        self.source = source
+        self.timeout = timeout
+        self.workers = workers
+        self.resolver = None
+        if Resolver is not None:
+            self.resolver = Resolver()
+            self.resolver.lifetime = timeout
+            if nameservers:
+                self.resolver.nameservers = nameservers
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def _query(self, host):
+        entry = {"host": host, "addresses": [], "latency": None, "nameserver": None,
+                 "source": self.source if self.resolver else None, "time": time.time(), "error": None}
+        start = time.time()
+        try:
+            if self.resolver is not None:
+                answer = self.resolver.query(host, "A", source=self.source)
+                entry["addresses"] = [rdata.address for rdata in answer]
+                entry["nameserver"] = getattr(answer, "nameserver", None)
+            else:
+                infos = socket.getaddrinfo(host, None, socket.AF_INET, socket.SOCK_STREAM)
+                entry["addresses"] = list(sorted(set(info[4][0] for info in infos)))
+        except Exception as e:
+            entry["error"] = "{}: {}".format(type(e).__name__, e)
+        entry["latency"] = time.time() - start
+        return entry
+
+    def resolve(self, host):
+        """Return the entry of host, resolving it on first use."""
+        with self.lock:
+            entry = self.entries.get(host)
+        if entry is None:
+            if is_address(host):
+                entry = {"host": host, "addresses": [host], "latency": 0, "nameserver": None,
+                         "source": None, "time": time.time(), "error": None}
+            else:
+                entry = self._query(host)
+            with self.lock:
+                entry = self.entries.setdefault(host, entry)
+        return entry
+
+    def resolve_all(self, hosts):
+        """Resolve the not yet known hosts concurrently with at most workers threads."""
+        pending = Queue()
+        for host in set(hosts):
+            if host and host not in self.entries:
+                pending.put(host)
+
+        def worker():
+            while True:
+                try:
+                    host = pending.get_nowait()
+                except Empty:
+                    return
+                self.resolve(host)
+
+        threads = [threading.Thread(target=worker) for i in range(min(self.workers, pending.qsize()))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return [self.entries[host] for host in sorted(set(hosts)) if host in self.entries]
+
+    def pinned(self):
+        """Return host -> first address for the successfully resolved names."""
+        with self.lock:
+            return dict((host, entry["addresses"][0]) for host, entry in self.entries.items()
+                        if entry["addresses"] and not is_address(host))
+
+    def host_resolver_rules(self):
+        """Return the pinned addresses as value for Chrome's --host-resolver-rules."""
+        return ", ".join("MAP {} {}".format(host, address) for host, address in sorted(self.pinned().items()))
+
+    def summary(self):
+        with self.lock:
+            return [dict(entry) for host, entry in sorted(self.entries.items())]
@@ -0,0 +1,505 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Experiment worker role of the VBIM client.
+
+run_exp is the process of one run: it starts (or attaches to) Chrome, loads
+the landing page, watches the playback and saves the results. Selenium and
+the collectors of a run are imported on first use; the interface batch
+imports them once with preload() before forking its runs, so that the runs
+inherit them instead of importing them each time.
+"""
+
+import json
+from metadata_subscriber import get_metadata_dir
+from metadata_writer import closed_segments, collect_segments
+from multiprocessing import Process
+import os
+from probe_runner import finish_probes, get_probe_results, get_probe_summary, start_probes
+from results import get_filename, move_file, open_output, save_bundle, save_output
+from settings import CONTAINER_VERSION, DEBUG, TAG
+import threading
+import time
+from tracing import Tracer
+try:
+    from urllib import urlencode
+except ImportError:
+    from urllib.parse import urlencode
+import uuid
+
+def preload():
+    """Import the modules this role loads lazily."""
+    from selenium import webdriver
+    from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
+    import browser_pool
+    import console_collector
+    import ifcounters
+    import playback_monitor
+    import procstats
+    import qoe_events
+
+def get_url(stub, player, cdnprovider=None, experimentname=None, title=None, userid=None, videoid=None, customdata1=None, customdata2=None, customdata3=None, customdata4=None, customdata5=None):
+
+    f = urlencode({"cdnProvider": str(cdnprovider), "experimentName": str(experimentname), "title": str(title), "userId": str(userid), "videoId": str(videoid), "customData1": str(customdata1), "customData2": str(customdata2), "customData3": str(customdata3), "customData4": str(customdata4), "customData5": str(customdata5)})
+
+    return "{}/{}/index.php?{}".format(stub, player, f)
+
+def setup_chrome_options(host_resolver_rules=None):
+    from selenium import webdriver
+
+    chrome_options = webdriver.ChromeOptions()
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-quic")
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--autoplay-policy=no-user-gesture-required")
+    if host_resolver_rules:
+        chrome_options.add_argument("--host-resolver-rules=" + host_resolver_rules)
+    return chrome_options
+
+def setup_desired_capabilities():
+    from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
+
+    desired_capabilities = DesiredCapabilities.CHROME.copy()
+    desired_capabilities["loggingPrefs"] = { "browser":"ALL" }
+    return desired_capabilities
+
+def create_browser_pool(expconfig, host_resolver_rules=None):
+    """Create and pre-launch the Chrome session pool, None if disabled or not possible."""
+    if not expconfig["cnf_browser_pool_enabled"]:
+        return None
+    from browser_pool import BrowserPool
+
+    pool = BrowserPool(size=expconfig["cnf_browser_pool_size"],
+                       options_factory=lambda: setup_chrome_options(host_resolver_rules),
+                       desired_capabilities=setup_desired_capabilities(),
+                       executable_path=expconfig["cnf_chromedriver_path"],
+                       max_uses=expconfig["cnf_browser_pool_max_uses"],
+                       verbosity=expconfig["cnf_verbosity"])
+    try:
+        pool.fill()
+    except Exception as e:
+        if expconfig["cnf_verbosity"] > 0:
+            print(TAG + "Cannot start browser pool, falling back to one browser per run: {}".format(e))
+        pool.close()
+        return None
+    return pool
+
+def update_session_tag(expconfig):
+    cfg = expconfig.copy()
+    cfg.update({"cnf_tag": str(uuid.uuid4())})
+    return cfg
+
+def update_abr_algorithm(expconfig):
+    cfg = expconfig.copy()
+    abr_str=cfg["cnf_abr"]
+    if "bitmovin" in cfg["cnf_player"] or "bitdash" in cfg["cnf_player"]:
+        abr_str = "bitmovin"
+    if "shaka" in cfg["cnf_player"]:
+        abr_str = "shaka"
+    cfg.update({"cnf_abr": abr_str})
+    return cfg
+
+def update_session_id(expconfig, sessionid):
+    cfg = expconfig.copy()
+    cfg.update({"cnf_sessionid": sessionid})
+    return cfg
+
+def update_custom_data_fields(expconfig):
+    cfg = expconfig.copy()
+    cfg.update({
+    "cnf_customdata1": expconfig["cnf_cdnprovider"],
+    "cnf_customdata2": expconfig["cnf_abr"],
+    "cnf_customdata3": expconfig["cnf_experimentname"],
+    "cnf_customdata4": CONTAINER_VERSION,
+    "cnf_customdata5": expconfig["cnf_tag"],
+    })
+    return cfg
+
+def create_exp_process(meta_info, expconfig, ifname, browser=None, meta_rotation=None, asn_resolver=None):
+    process = Process(target=run_exp, args=(meta_info, expconfig, ifname, browser, meta_rotation, asn_resolver))
+    process.daemon = True
+    return process
+
+def run_exp(meta_info, expconfig, ifname, browser=None, meta_rotation=None, asn_resolver=None):
+    """Seperate process that runs the experiment and collects the ouput.
+        Will abort if the interface goes down.
+        If browser is given (see BrowserSession.info), the run attaches to
+        that pooled Chrome session instead of launching its own.
+        meta_rotation (a SegmentRotation) is used to close the metadata file
+        of the interface before it is moved to the results.
+        asn_resolver is the ASN resolver of the interface batch for traceroute.
+    """
+    from browser_pool import attach_driver
+    from console_collector import ConsoleLogCollector
+    from ifcounters import CounterReader, CounterSampler, DataUsage
+    from playback_monitor import PlaybackMonitor
+    from procstats import ProcessTreeSampler
+    from qoe_events import compute_kpis, extract_events
+    from selenium import webdriver
+
+    cfg = update_custom_data_fields(update_abr_algorithm(update_session_tag(expconfig.copy())))
+    tracer = Tracer("run " + ifname, cfg["cnf_verbosity"], TAG)
+    time_run_start = time.time()
+    timestamp_run = time.strftime("%Y%m%d-%H%M%S",time.gmtime())
+    driver = None
+    console_file = None
+    counters = CounterReader(ifname)
+    data_usage = DataUsage(counters)
+    sampler = None
+    resources = None
+
+    try:
+        # Follow this process and the ChromeDriver of a pooled session, with all their children
+        if cfg["cnf_resources_sample_interval"] > 0:
+            resources = ProcessTreeSampler([os.getpid()] + ([browser["pid"]] if browser else []),
+                                           cfg["cnf_resources_sample_interval"], cfg["cnf_resources_saturation"])
+            resources.start()
+
+        # Run ping and traceroute if requested, in the phases given by the schedule
+        probe_schedule = cfg["cnf_probe_schedule"]
+        probes = []
+        if "before" in probe_schedule:
+            data_usage.phase("probes_before")
+            with tracer.span("probes_before"):
+                probes.extend(finish_probes(start_probes(cfg, ifname, "before", asn_resolver)))
+
+        if cfg["cnf_verbosity"] > 1:
+            print("\n" + TAG + "Player..." + str(cfg["cnf_player"]))
+            print(TAG + "ABR Algorithm..." + str(cfg["cnf_abr"]))
+
+            # Can add further printouts, see examples below
+            # print(TAG + "Title..." + str(cfg["cnf_title"]))
+            # print(TAG + "User ID..." + str(cfg["cnf_userid"]))
+            # print(TAG + "Video ID..." + str(cfg["cnf_videoid"]))
+            # print(TAG + "Custom Data 1..." + str(cfg["cnf_customdata1"]))
+            # print(TAG + "Custom Data 2..." + str(cfg["cnf_customdata2"]))
+            # print(TAG + "Custom Data 3..." + str(cfg["cnf_customdata3"]))
+            # print(TAG + "Custom Data 4..." + str(cfg["cnf_customdata4"]))
+            # print(TAG + "Custom Data 5..." + str(cfg["cnf_customdata5"]))
+
+        target_url = get_url(cfg["cnf_stub"], cfg["cnf_player"], cfg["cnf_cdnprovider"], cfg["cnf_experimentname"], cfg["cnf_title"], cfg["cnf_userid"], cfg["cnf_videoid"], cfg["cnf_customdata1"], cfg["cnf_customdata2"], cfg["cnf_customdata3"], cfg["cnf_customdata4"], cfg["cnf_customdata5"])
+
+        data_usage.phase("browser_start")
+        time_browser_start = time.time()
+        with tracer.span("browser_start", pooled=bool(browser)):
+            if browser:
+                driver = attach_driver(browser)
+            else:
+                driver = webdriver.Chrome(chrome_options=setup_chrome_options(cfg.get("cnf_dns_host_resolver_rules")), desired_capabilities=setup_desired_capabilities())
+        time_browser_ready = time.time() - time_browser_start
+
+        # The console log is streamed to a JSON-lines file while the page runs
+        driver_lock = threading.Lock()
+        console_file = open_output(cfg["cnf_tmpdir"])
+        qoe_events = []
+        on_entries = None
+        if cfg["cnf_qoe_events"]:
+            on_entries = lambda entries: qoe_events.extend(extract_events(entries, cfg["cnf_player"]))
+        console_collector = ConsoleLogCollector(driver, console_file, cfg["cnf_consolelog_interval"], driver_lock, on_entries)
+        console_collector.start()
+
+        probes_during = []
+        if "during" in probe_schedule:
+            probes_during = start_probes(cfg, ifname, "during", asn_resolver)
+
+        data_usage.phase("page_load")
+        time_page_load = time.time()
+        with tracer.span("page_load"), driver_lock:
+            driver.get(target_url)
+        data_usage.phase("playback")
+        playback_span = tracer.begin("playback")
+        if cfg["cnf_data_usage_sample_interval"] > 0:
+            sampler = CounterSampler(counters, cfg["cnf_data_usage_sample_interval"])
+            sampler.start()
+        if cfg["cnf_playback_monitor"]:
+            playback = PlaybackMonitor(driver, cfg["cnf_duration"],
+                                       poll_interval=cfg["cnf_playback_poll_interval"],
+                                       target_played=cfg["cnf_playback_target_played"],
+                                       startup_timeout=cfg["cnf_playback_startup_timeout"],
+                                       stall_timeout=cfg["cnf_playback_stall_timeout"],
+                                       lock=driver_lock).run()
+            if cfg["cnf_verbosity"] > 1:
+                print(TAG + "Playback ended: {}".format(playback["end_reason"]))
+        else:
+            playback = None
+            time.sleep(cfg["cnf_duration"])
+
+        time_playback_end = time.time()
+        tracer.end(playback_span)
+        with tracer.span("collectors_stop"):
+            if sampler is not None:
+                sampler.stop()
+            console_collector.stop()
+            console_file.close()
+
+        if probes_during or "after" in probe_schedule:
+            data_usage.phase("probes_after")
+        with tracer.span("probes_after"):
+            probes.extend(finish_probes(probes_during))
+            if "after" in probe_schedule:
+                probes.extend(finish_probes(start_probes(cfg, ifname, "after", asn_resolver)))
+        data_usage.stop()
+        if resources is not None:
+            resources.stop()
+        towrite_ping = get_probe_results(probes, "ping")
+        towrite_traceroute = get_probe_results(probes, "traceroute")
+
+        session_span = tracer.begin("session_id")
+        try:
+            session_id = driver.find_element_by_id("sessionID").get_attribute("value")
+            if session_id:
+                print("\n" + TAG + "sessionID..."+session_id)
+                cfg = update_session_id(cfg,session_id)
+
+            else:
+                cfg = update_session_id(cfg,"NA")
+        except Exception as e:
+            if cfg["cnf_verbosity"] > 0:
+                print (TAG + "[Exception #3] Retrieving session ID failed for error: {}").format(e)
+            cfg = update_session_id(cfg,"NA")
+            pass
+        tracer.end(session_span)
+
+        assemble_span = tracer.begin("assemble_summary")
+        try:
+            if "cnf_add_to_result" not in cfg:
+                cfg["cnf_add_to_result"] = {}
+
+            cfg["cnf_add_to_result"].update({
+                "summary_containerversion": CONTAINER_VERSION,
+                "summary_debug": DEBUG,
+                "monroe_guid": cfg["guid"],
+                "monroe_nodeid": cfg["nodeid"],
+                "monroe_modeminterfacename": cfg["modeminterfacename"],
+                "cnf_save_metadata_topic": cfg["cnf_save_metadata_topic"],
+                "cnf_cdnprovider": cfg["cnf_cdnprovider"],
+                "cnf_customdata1": cfg["cnf_customdata1"],
+                "cnf_customdata2": cfg["cnf_customdata2"],
+                "cnf_customdata3": cfg["cnf_customdata3"],
+                "cnf_customdata4": cfg["cnf_customdata4"],
+                "cnf_customdata5": cfg["cnf_customdata5"],
+                "cnf_experimentname": cfg["cnf_experimentname"],
+                "cnf_sessionid": cfg["cnf_sessionid"],
+                "cnf_title": cfg["cnf_title"],
+                "cnf_userid": cfg["cnf_userid"],
+                "cnf_videoid": cfg["cnf_videoid"],
+                "cnf_abr": cfg["cnf_abr"],
+                "cnf_dataid": cfg["cnf_dataid"],
+                "cnf_duration": cfg["cnf_duration"],
+                "cnf_player": cfg["cnf_player"],
+                "cnf_stub": cfg["cnf_stub"],
+                "cnf_tag": cfg["cnf_tag"],
+                "cnf_time_between_runs": cfg["cnf_time_between_runs"],
+                "cnf_verbosity": cfg["cnf_verbosity"],
+                "summary_time_batch": time.strftime("%Y%m%d-%H%M%S",cfg["timestamp"]),
+                "summary_time_run": timestamp_run,
+                "summary_consoleoutput_entries": console_collector.count,
+                "summary_browser_pooled": bool(browser),
+                "summary_browser_ready_latency": time_browser_ready,
+                "summary_browser_startup_latency": browser["startup_latency"] if browser else time_browser_ready,
+                "summary_browser_session_uses": browser["uses"] if browser else 1
+                })
+
+            if "cnf_multiconfig_enabled" in cfg and cfg["cnf_multiconfig_enabled"]:
+                cfg["cnf_add_to_result"].update({
+                    "cnf_multiconfig_enabled": cfg["cnf_multiconfig_enabled"],
+                    "cnf_multiconfig_randomize": cfg["cnf_multiconfig_randomize"],
+                    "cnf_multiconfig": cfg["cnf_multiconfig"],
+                    "summary_number_of_configurations": cfg["summary_number_of_configurations"]
+                })
+
+            if playback is not None:
+                cfg["cnf_add_to_result"].update({
+                    "cnf_playback_poll_interval": cfg["cnf_playback_poll_interval"],
+                    "cnf_playback_stall_timeout": cfg["cnf_playback_stall_timeout"],
+                    "cnf_playback_startup_timeout": cfg["cnf_playback_startup_timeout"],
+                    "cnf_playback_target_played": cfg["cnf_playback_target_played"],
+                    "summary_playback_end_reason": playback["end_reason"],
+                    "summary_playback_time_start": playback["time_start"],
+                    "summary_playback_time_end": playback["time_end"],
+                    "summary_playback_duration": playback["duration"],
+                    "summary_playback_instrumented": playback["instrumented"],
+                    "summary_playback_time_to_first_frame": playback["time_to_first_frame"],
+                    "summary_playback_played": playback["played"],
+                    "summary_playback_fatal_error": playback["fatal_error"],
+                    "summary_playback_stall_count": playback["stall_count"],
+                    "summary_playback_stall_duration": playback["stall_duration"],
+                    "summary_playback_stalls": playback["stalls"],
+                    "summary_playback_events": playback["events"]
+                })
+
+            usage = data_usage.summary()
+            cfg["cnf_add_to_result"].update({
+                "cnf_data_usage_sample_interval": cfg["cnf_data_usage_sample_interval"],
+                "summary_data_rx_bytes": usage["total"]["rx_bytes"] if usage["total"] else None,
+                "summary_data_tx_bytes": usage["total"]["tx_bytes"] if usage["total"] else None,
+                "summary_data_usage": usage,
+                "summary_data_usage_series": sampler.series() if sampler is not None else None
+            })
+
+            if cfg["cnf_qoe_events"]:
+                qoe = compute_kpis(qoe_events, time_page_load, time_playback_end)
+                cfg["cnf_add_to_result"].update({
+                    "summary_qoe_startup_delay": qoe["startup_delay"],
+                    "summary_qoe_stall_count": qoe["stall_count"],
+                    "summary_qoe_stall_duration": qoe["stall_duration"],
+                    "summary_qoe_bitrate_mean": qoe["bitrate_mean"],
+                    "summary_qoe_switch_count": qoe["switch_count"],
+                    "summary_qoe": qoe
+                })
+
+            if resources is not None:
+                usage = resources.result()
+                cfg["cnf_add_to_result"].update({
+                    "cnf_resources_sample_interval": cfg["cnf_resources_sample_interval"],
+                    "cnf_resources_saturation": cfg["cnf_resources_saturation"],
+                    "summary_resources_cpu_mean": usage["stats"]["tree_cpu_mean"],
+                    "summary_resources_rss_kb_max": usage["stats"]["tree_rss_kb_max"],
+                    "summary_resources_saturated_fraction": usage["stats"]["saturated_fraction"],
+                    "summary_resources": usage
+                })
+
+            if probes:
+                cfg["cnf_add_to_result"].update({
+                    "cnf_probe_schedule": probe_schedule,
+                    "summary_probes": get_probe_summary(probes)
+                })
+
+            if cfg.get("summary_dns"):
+                cfg["cnf_add_to_result"].update({
+                    "cnf_dns_pin_browser": cfg["cnf_dns_pin_browser"],
+                    "summary_dns": cfg["summary_dns"]
+                })
+
+            if cfg.get("summary_probe_campaign_file"):
+                cfg["cnf_add_to_result"]["summary_probe_campaign_file"] = cfg["summary_probe_campaign_file"]
+
+            if cfg.get("summary_schedule"):
+                cfg["cnf_add_to_result"]["summary_schedule"] = cfg["summary_schedule"]
+
+            if "cnf_ping_skip" in cfg and not cfg["cnf_ping_skip"]:
+                cfg["cnf_add_to_result"].update({
+                      "cnf_ping_count": cfg["cnf_ping_count"],
+                      "cnf_ping_target": cfg["cnf_ping_target"],
+                      "cnf_ping_timeout": cfg["cnf_ping_timeout"]
+                })
+            
+            if "cnf_traceroute_skip" in cfg and not cfg["cnf_traceroute_skip"]:
+                cfg["cnf_add_to_result"]["cnf_traceroute_target"] = cfg["cnf_traceroute_target"]
+
+            if "ICCID" in meta_info:
+                cfg["cnf_add_to_result"]["summary_iccid"] = meta_info["ICCID"]
+            if "Operator" in meta_info:
+                cfg["cnf_add_to_result"]["summary_operator"] = meta_info["Operator"]
+            if "IMSIMCCMNC" in meta_info:
+                cfg["cnf_add_to_result"]["summary_imsimccmnc"] = meta_info["IMSIMCCMNC"]
+            if "NWMCCMNC" in meta_info:
+                cfg["cnf_add_to_result"]["summary_nwmccmnc"] = meta_info["NWMCCMNC"]
+            if "CID" in meta_info:
+                cfg["cnf_add_to_result"]["summary_cid"] = meta_info["CID"]
+            if "LAC" in meta_info:
+                cfg["cnf_add_to_result"]["summary_lac"] = meta_info["LAC"]
+            if "DEVICEMODE" in meta_info:
+                cfg["cnf_add_to_result"]["summary_devicemode"] = meta_info["DEVICEMODE"]
+            if "DEVICESUBMODE" in meta_info:
+                cfg["cnf_add_to_result"]["summary_devicesubmode"] = meta_info["DEVICESUBMODE"]
+            if "LATITUDE" in meta_info:
+                cfg["cnf_add_to_result"]["summary_latitude"] = meta_info["LATITUDE"]
+            if "LONGITUDE" in meta_info:
+                cfg["cnf_add_to_result"]["summary_longitude"] = meta_info["LONGITUDE"]
+
+            ifname = meta_info[cfg["modeminterfacename"]]
+            cfg["cnf_add_to_result"]["summary_interface"] = ifname
+
+            # Modem state changes seen during the run
+            cfg["cnf_add_to_result"]["summary_meta_history"] = meta_info.history(since=time_run_start)
+
+            # Add metadata if requested
+            if cfg["cnf_add_modem_metadata_to_result"]:
+                for k,v in meta_info.items():
+                    cfg["cnf_add_to_result"]["info_meta_modem_" + k] = v
+
+            towrite_data = cfg["cnf_add_to_result"]
+
+        except Exception as e:
+            if cfg["cnf_verbosity"] > 0:
+                print (TAG + "[Exception #2] Execution or parsing failed for error: {}").format(e)
+        tracer.end(assemble_span)
+
+        if not DEBUG:
+            if cfg["cnf_verbosity"] > 1:
+                print("\n" + TAG + "Saving results")
+
+            # Have the metadata hub close the open segment, then take the
+            # segments written since the previous run
+            with tracer.span("metadata_rotation"):
+                if meta_rotation is not None and not meta_rotation.request():
+                    print(TAG + "Metadata hub did not close the metadata file in time")
+                segments = closed_segments(get_metadata_dir(cfg, ifname))
+            if not segments:
+                print(TAG + "No metadata, skipping metadata file")
+            elif cfg["cnf_verbosity"] > 2:
+                print("\n" + TAG + "Metadata files to be moved:")
+                for segment in segments:
+                    print(segment)
+
+            if cfg["cnf_result_format"] == "bundle":
+                # The spans of saving the bundle itself are only printed
+                towrite_data["summary_spans"] = tracer.summary()
+                with tracer.span("save_bundle"):
+                    save_bundle(cfg, timestamp_run, ifname, towrite_data, console_file.name,
+                                None if cfg["cnf_ping_skip"] else towrite_ping,
+                                None if cfg["cnf_traceroute_skip"] else towrite_traceroute,
+                                segments, tracer.trace() if cfg["cnf_trace_file"] else None)
+            else:
+                # Saving output file(s), the SUMMARY last so that it has the spans of the others
+                if not os.path.exists(cfg["cnf_resultdir"]):
+                    os.makedirs(cfg["cnf_resultdir"])
+                with tracer.span("save_output", file="CONSOLEOUTPUT"):
+                    move_file(console_file.name, os.path.join(cfg["cnf_resultdir"], get_filename(expconfig=cfg, postfix=("SESSION." + cfg["cnf_sessionid"] + "_CONSOLEOUTPUT"), ending="jsonl", tstamp=timestamp_run, interface=ifname)))
+
+                if not cfg["cnf_ping_skip"]:
+                    with tracer.span("save_output", file="PING"):
+                        save_output(expconfig=cfg, msg=json.dumps(towrite_ping), postfix=("SESSION." + cfg["cnf_sessionid"] + "_PING"), tstamp=timestamp_run, outdir=cfg["cnf_resultdir"], interface=ifname)
+
+                if not cfg["cnf_traceroute_skip"]:
+                    with tracer.span("save_output", file="TRACEROUTE"):
+                        save_output(expconfig=cfg, msg=json.dumps(towrite_traceroute), postfix=("SESSION." + cfg["cnf_sessionid"] + "_TRACEROUTE"), tstamp=timestamp_run, outdir=cfg["cnf_resultdir"], interface=ifname)
+
+                if segments:
+                    ending = "METADATA.jsonl" + (".gz" if cfg["cnf_save_metadata_compress"] else "")
+                    with tracer.span("save_output", file="METADATA"):
+                        collect_segments(segments, os.path.join(cfg["cnf_resultdir"], get_filename(expconfig=cfg, postfix=("SESSION." + cfg["cnf_sessionid"]), ending=ending, tstamp=timestamp_run, interface=ifname)))
+
+                towrite_data["summary_spans"] = tracer.summary()
+                with tracer.span("save_output", file="SUMMARY"):
+                    save_output(expconfig=cfg, msg=json.dumps(towrite_data), postfix=("SESSION." + cfg["cnf_sessionid"] + "_SUMMARY"), tstamp=timestamp_run, outdir=cfg["cnf_resultdir"], interface=ifname)
+
+                if cfg["cnf_trace_file"]:
+                    save_output(expconfig=cfg, msg=json.dumps(tracer.trace()), postfix=("SESSION." + cfg["cnf_sessionid"] + "_TRACE"), tstamp=timestamp_run, outdir=cfg["cnf_resultdir"], interface=ifname)
+
+        print("")
+
+    except Exception as e:
+        if cfg["cnf_verbosity"] > 0:
+            print (TAG + "[Exception #1] Execution or parsing failed for error: {}").format(e)
+
+    finally:
+        if sampler is not None and sampler.is_alive():
+            sampler.stop()
+        if resources is not None and resources.is_alive():
+            resources.stop()
+        counters.close()
+        if driver is not None and not browser:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        if console_file is not None and os.path.exists(console_file.name):
+            os.remove(console_file.name)
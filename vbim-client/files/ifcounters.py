@@ -0,0 +1,168 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Data usage accounting from the kernel interface counters.
+
+The byte and packet counters of an interface are read from sysfs
+(/sys/class/net/<ifname>/statistics, kept open and re-read from offset 0) or
+else from /proc/net/dev. DataUsage splits a run into phases by reading the
+counters at the phase boundaries, CounterSampler records the throughput at
+a fixed interval in a background thread. No packets are captured and no
+processes are started, a reading costs a few system calls.
+"""
+
+from collections import namedtuple, OrderedDict
+import os
+import threading
+import time
+
+FIELDS = ("rx_bytes", "tx_bytes", "rx_packets", "tx_packets")
+
+Counters = namedtuple("Counters", ("time",) + FIELDS)
+
+class CounterReader(object):
+    """Reads the counters of one interface; source is "sysfs", "proc" or None if unavailable."""
+
+    def __init__(self, ifname):
+        self.ifname = ifname
+        self.fds = []
+        self.source = None
+        try:
+            for field in FIELDS:
+                self.fds.append(os.open("/sys/class/net/{}/statistics/{}".format(ifname, field), os.O_RDONLY))
+            self.source = "sysfs"
+        except OSError:
+            self.close()
+            if self._read_proc() is not None:
+                self.source = "proc"
+
+    def _read_proc(self):
+        try:
+            with open("/proc/net/dev") as f:
+                for line in f:
+                    name, sep, values = line.partition(":")
+                    if sep and name.strip() == self.ifname:
+                        values = values.split()
+                        return Counters(time.time(), int(values[0]), int(values[8]), int(values[1]), int(values[9]))
+        except (IOError, OSError, ValueError, IndexError):
+            pass
+        return None
+
+    def read(self):
+        """Return the current Counters, or None."""
+        if self.source == "sysfs":
+            values = []
+            try:
+                for fd in self.fds:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    values.append(int(os.read(fd, 32)))
+            except (OSError, ValueError):
+                return None
+            return Counters(time.time(), *values)
+        if self.source == "proc":
+            return self._read_proc()
+        return None
+
+    def close(self):
+        for fd in self.fds:
+            os.close(fd)
+        self.fds = []
+
+def difference(start, end):
+    """Return the counter increase from start to end as dict (None if either reading is missing)."""
+    if start is None or end is None:
+        return None
+    usage = OrderedDict([("time_start", start.time), ("duration", end.time - start.time)])
+    for field in FIELDS:
+        usage[field] = getattr(end, field) - getattr(start, field)
+    return usage
+
+class DataUsage(object):
+    """Bytes and packets per phase of a run.
+
+       phase(name) ends the current phase and starts the next one at the
+       same reading, stop() ends the last phase.
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.phases = OrderedDict()
+        self.first = None
+        self.current = None
+        self.last = None
+
+    def phase(self, name):
+        now = self.reader.read()
+        self._close(now)
+        if self.first is None:
+            self.first = now
+        self.current = (name, now)
+
+    def stop(self):
+        self._close(self.reader.read())
+        self.current = None
+
+    def _close(self, now):
+        if self.current is not None:
+            name, start = self.current
+            self.phases[name] = difference(start, now)
+            self.last = now
+
+    def summary(self):
+        return OrderedDict([("source", self.reader.source),
+                            ("phases", self.phases),
+                            ("total", difference(self.first, self.last))])
+
+class CounterSampler(threading.Thread):
+    """Samples the counters every interval seconds until stop() is called."""
+
+    def __init__(self, reader, interval):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.reader = reader
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while True:
+            sample = self.reader.read()
+            if sample is not None:
+                self.samples.append(sample)
+            if self.stopped.wait(self.interval):
+                break
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        sample = self.reader.read()
+        if sample is not None:
+            self.samples.append(sample)
+
+    def series(self):
+        """Return the throughput (bit/s) between consecutive samples and its mean and maximum."""
+        series = OrderedDict([("interval", self.interval), ("time_start", None),
+                              ("time", []), ("rx_bps", []), ("tx_bps", [])])
+        if len(self.samples) < 2:
+            return series
+        series["time_start"] = self.samples[0].time
+        for previous, sample in zip(self.samples, self.samples[1:]):
+            elapsed = sample.time - previous.time
+            if elapsed <= 0:
+                continue
+            series["time"].append(round(sample.time - self.samples[0].time, 3))
+            series["rx_bps"].append(int((sample.rx_bytes - previous.rx_bytes) * 8 / elapsed))
+            series["tx_bps"].append(int((sample.tx_bytes - previous.tx_bytes) * 8 / elapsed))
+        for direction in ("rx_bps", "tx_bps"):
+            values = series[direction]
+            if values:
+                series[direction + "_max"] = max(values)
+        total = difference(self.samples[0], self.samples[-1])
+        if total["duration"] > 0:
+            series["rx_bps_mean"] = int(total["rx_bytes"] * 8 / total["duration"])
+            series["tx_bps_mean"] = int(total["tx_bytes"] * 8 / total["duration"])
+        return series
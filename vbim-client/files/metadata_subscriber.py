@@ -0,0 +1,190 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Metadata subscriber role of the VBIM client.
+
+The metadata hub is a process of its own that subscribes to the modem
+metadata of the node over ZeroMQ and fills one SharedMetaState per
+interface (see metastore.py), optionally saving the metadata stream. ZeroMQ
+is only imported by the hub process itself.
+"""
+
+from collections import OrderedDict
+import json
+from metadata_writer import MetadataWriter, SegmentRotation
+from metastore import SharedMetaState
+from multiprocessing import Process
+import os
+from results import get_filename
+from settings import DEBUG, TAG
+import signal
+import sys
+import time
+
+def preload():
+    """Import the modules this role loads lazily."""
+    import zmq
+
+def metadata_hub(meta_states, meta_rotations, expconfig):
+    """Seperate process that attach to the ZeroMQ socket as a subscriber.
+
+        Will listen forever to messages with topic defined in topic, decode
+        each message once and update the meta_states store (a
+        SharedMetaState) of the interface the message belongs to. Saved
+        messages are de-duplicated on their topic and sequence number and
+        appended to one MetadataWriter per interface, whose segment is
+        closed when requested through meta_rotations (SegmentRotation).
+    """
+    import zmq
+
+    context = zmq.Context()
+    socket = context.socket(zmq.SUB)
+    socket.connect(expconfig["zmqport"])
+    topic = expconfig["modem_metadata_topic"]
+    do_save = False
+    saved = OrderedDict()
+    writers = {}
+
+    if not DEBUG and "cnf_save_metadata_topic" in expconfig and "cnf_save_metadata_resultdir" in expconfig and expconfig["cnf_save_metadata_resultdir"]:
+        topic = expconfig["cnf_save_metadata_topic"]
+
+        resultdir_metadata = expconfig["cnf_save_metadata_resultdir"]
+        if not os.path.exists(resultdir_metadata):
+            os.makedirs(resultdir_metadata)
+
+        do_save = True
+
+    socket.setsockopt(zmq.SUBSCRIBE, topic.encode("ASCII"))
+    # End Attach
+
+    # Terminating the hub should still write out the buffered metadata
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        while True:
+            if socket.poll(1000):
+                receive_metadata(socket, meta_states, writers, saved, do_save, expconfig)
+            for ifname, writer in writers.items():
+                writer.maybe_flush()
+            for ifname, rotation in meta_rotations.items():
+                if rotation.pending():
+                    if ifname in writers:
+                        writers[ifname].rotate()
+                    rotation.complete()
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+def receive_metadata(socket, meta_states, writers, saved, do_save, expconfig):
+    """Receive one message for metadata_hub and dispatch it."""
+    data = socket.recv_string()
+    try:
+        (topic, msgdata) = data.split(" ", 1)
+        if not topic.startswith(expconfig["modem_metadata_topic"]):
+            return
+
+        msg = json.loads(msgdata)
+        ifname = msg.get(expconfig["modeminterfacename"])
+        if ifname not in meta_states:
+            return
+
+        meta_states[ifname].update(msg)
+
+        if not do_save:
+            return
+
+        key = (topic, msg.get("SequenceNumber", msgdata))
+        if key in saved:
+            return
+        saved[key] = True
+        if len(saved) > 1024:
+            saved.popitem(last=False)
+
+        msg["cnf_dataid"] = expconfig["cnf_dataid"]
+        msg["cnf_player"] = expconfig["cnf_player"]
+        msg["nodeid"] = expconfig["nodeid"]
+
+        if ifname not in writers:
+            writers[ifname] = create_metadata_writer(expconfig, ifname)
+        writers[ifname].write(json.dumps(msg))
+
+    except Exception as e:
+        if expconfig["cnf_verbosity"] > 0:
+            print (TAG + "Cannot get metadata in container: {}"
+                   ", {}").format(e, expconfig["guid"])
+        pass
+
+def get_metadata_dir(expconfig, ifname):
+    return os.path.join(expconfig["cnf_save_metadata_resultdir"], ifname)
+
+def create_metadata_writer(expconfig, ifname):
+    return MetadataWriter(directory=get_metadata_dir(expconfig, ifname),
+                          prefix=get_filename(expconfig, None, "METADATA", time.strftime("%Y%m%d-%H%M%S", time.gmtime()), ifname),
+                          compress=expconfig["cnf_save_metadata_compress"],
+                          flush_size=expconfig["cnf_save_metadata_flush_size"],
+                          flush_interval=expconfig["cnf_save_metadata_flush_interval"],
+                          segment_size=expconfig["cnf_save_metadata_segment_size"])
+
+def check_meta(info, graceperiod, expconfig):
+    """Check if we have recieved required information within graceperiod."""
+    if not (expconfig["modeminterfacename"] in info and
+            "Operator" in info and
+            "Timestamp" in info and
+            time.time() - info["Timestamp"] < graceperiod):
+        return False
+    if not "require_modem_metadata" in expconfig:
+        return True
+    for k,v in expconfig["require_modem_metadata"].items():
+        if k not in info:
+            if expconfig["cnf_verbosity"] > 0:
+                print(TAG + "Got metadata but key '{}' is missing".format(k))
+            return False
+        if not info[k] == v:
+            if expconfig["cnf_verbosity"] > 0:
+                print(TAG + "Got metadata but '{}'='{}'; expected: '{}'".format(k, info[k], v))
+            return False
+    return True
+
+def add_manual_metadata_information(info, ifname, expconfig):
+    """Only used for local interfaces that do not have any metadata information.
+
+       Normally eth0 and wlan0.
+    """
+    info[expconfig["modeminterfacename"]] = ifname
+    info["Operator"] = "localOperator"
+    info["ICCID"] = "localIccid"
+    info["Timestamp"] = time.time()
+
+class MetadataHub(object):
+    """The metadata hub process together with the stores of all interfaces.
+
+       Only the process that created the hub can (re)start and stop it.
+    """
+
+    def __init__(self, interfaces, expconfig):
+        self.expconfig = expconfig
+        self.states = dict((ifname, SharedMetaState(history_keys=expconfig["cnf_meta_history_keys"]))
+                           for ifname in interfaces)
+        self.rotations = dict((ifname, SegmentRotation()) for ifname in interfaces)
+        self.process = None
+        self.owner = os.getpid()
+
+    def ensure_running(self):
+        """Start the hub process, or restart it if it died."""
+        if os.getpid() != self.owner:
+            return
+        if self.process is None or not self.process.is_alive():
+            if self.process is not None and self.expconfig["cnf_verbosity"] > 0:
+                print(TAG + "Metadata hub died, restarting it")
+            self.process = Process(target=metadata_hub,
+                                   args=(self.states, self.rotations, self.expconfig, ))
+            self.process.daemon = True
+            self.process.start()
+
+    def stop(self):
+        if os.getpid() == self.owner and self.process is not None and self.process.is_alive():
+            self.process.terminate()
+
@@ -0,0 +1,156 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Buffered persistence of the metadata stream.
+
+Messages are appended to a JSON-lines segment file per interface (optionally
+gzip-compressed while streaming) and flushed on size/time thresholds. A
+segment is written as *.part and renamed once it is closed, so the closed
+segments of a run can be moved to the results with a rename.
+"""
+
+import gzip
+import os
+import shutil
+import time
+from multiprocessing import Value
+
+PART = ".part"
+
+class MetadataWriter(object):
+    """Appends messages to rotating segments named prefix.<n>.jsonl[.gz] in directory.
+
+       Buffered messages are written once flush_size bytes are buffered or
+       flush_interval seconds passed (see maybe_flush); a segment is closed
+       when it reaches segment_size bytes or rotate() is called.
+    """
+
+    def __init__(self, directory, prefix, compress=False, flush_size=65536, flush_interval=10, segment_size=4194304):
+        self.directory = directory
+        self.prefix = prefix
+        self.compress = compress
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.segment_size = segment_size
+        self.buffer = []
+        self.buffered = 0
+        self.last_flush = time.time()
+        self.segment = 0
+        self.segment_written = 0
+        self.path = None
+        self.f = None
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def _open(self):
+        # A writer restarted within the same second has the same prefix: continue
+        # after the segments of its predecessor instead of overwriting them
+        while True:
+            self.segment += 1
+            name = "{}.{:06d}.jsonl{}".format(self.prefix, self.segment, ".gz" if self.compress else "")
+            self.path = os.path.join(self.directory, name)
+            if not os.path.exists(self.path) and not os.path.exists(self.path + PART):
+                break
+        if self.compress:
+            self.f = gzip.open(self.path + PART, "wb")
+        else:
+            self.f = open(self.path + PART, "wb")
+        self.segment_written = 0
+
+    def write(self, line):
+        """Buffer one JSON-encoded message."""
+        data = (line + "\n").encode("utf-8")
+        self.buffer.append(data)
+        self.buffered += len(data)
+        if self.buffered >= self.flush_size:
+            self.flush()
+
+    def maybe_flush(self):
+        if self.buffer and time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.time()
+        if not self.buffer:
+            return
+        if self.f is None:
+            self._open()
+        data = b"".join(self.buffer)
+        self.f.write(data)
+        self.f.flush()
+        self.segment_written += len(data)
+        self.buffer = []
+        self.buffered = 0
+        if self.segment_written >= self.segment_size:
+            self.rotate()
+
+    def rotate(self):
+        """Flush and close the open segment; return its final path or None."""
+        if self.buffer:
+            self.flush()
+        if self.f is None:
+            return None
+        self.f.close()
+        self.f = None
+        os.rename(self.path + PART, self.path)
+        os.chmod(self.path, 0o644)
+        return self.path
+
+    def close(self):
+        return self.rotate()
+
+class SegmentRotation(object):
+    """Lets an experiment process ask the writer process to close the open segment."""
+
+    def __init__(self):
+        self.requested = Value("i", 0)
+        self.completed = Value("i", 0)
+
+    def request(self, timeout=10, poll_interval=0.1):
+        """Ask for a rotation; return False if it was not done within timeout."""
+        with self.requested.get_lock():
+            self.requested.value += 1
+            target = self.requested.value
+        deadline = time.time() + timeout
+        while self.completed.value < target:
+            if time.time() >= deadline:
+                return False
+            time.sleep(poll_interval)
+        return True
+
+    def pending(self):
+        return self.completed.value < self.requested.value
+
+    def complete(self):
+        self.completed.value = self.requested.value
+
+def closed_segments(directory):
+    """Return the closed segments in directory, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if not name.endswith(PART)]
+
+def collect_segments(segments, target):
+    """Move the segments to target: a rename for a single segment, else a concatenation.
+
+       Concatenated gzip segments form a valid multi-member gzip file.
+    """
+    if not segments:
+        return False
+    if len(segments) == 1:
+        shutil.move(segments[0], target)
+    else:
+        with open(target + PART, "wb") as out:
+            for segment in segments:
+                with open(segment, "rb") as f:
+                    shutil.copyfileobj(f, out)
+        os.rename(target + PART, target)
+        for segment in segments:
+            os.remove(segment)
+    os.chmod(target, 0o644)
+    return True
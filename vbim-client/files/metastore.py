@@ -0,0 +1,153 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Interface metadata shared between the metadata subscriber and the experiment
+processes without a Manager server process.
+
+The latest values are published as a JSON snapshot in shared memory together
+with a version counter. Readers keep a decoded local copy and only decode the
+snapshot again when the version changed, so lookups are plain dict reads.
+Changes of selected keys are appended to a second shared buffer as a
+timestamped history. Every update is also signalled on a pipe, so a process
+can wait for new metadata with select() on fileno().
+"""
+
+import ctypes
+import errno
+import fcntl
+import json
+import os
+from multiprocessing import Array, Lock, Value
+import time
+
+# Modem state changes worth keeping in the history
+HISTORY_KEYS = ["DEVICEMODE", "DEVICESUBMODE", "DEVICESTATE", "Operator",
+                "NWMCCMNC", "CID", "LAC", "PCI", "FREQUENCY", "IPADDRESS"]
+
+class SharedMetaState(object):
+    """Dict-like latest metadata of one interface, readable from any process.
+
+       Must be created before the processes that use it are started.
+    """
+
+    def __init__(self, size=65536, history_size=262144, history_keys=HISTORY_KEYS):
+        self.history_keys = history_keys
+        self._lock = Lock()
+        self._snapshot = Array(ctypes.c_char, size, lock=False)
+        self._snapshot_length = Value("i", 0, lock=False)
+        self._version = Value("L", 0, lock=False)
+        self._history = Array(ctypes.c_char, history_size, lock=False)
+        self._history_length = Value("i", 0, lock=False)
+        self._history_dropped = Value("i", 0, lock=False)
+        self._local = {}
+        self._local_version = 0
+        self._local_history = []
+        self._local_history_length = 0
+        self._notify_r, self._notify_w = os.pipe()
+        for fd in (self._notify_r, self._notify_w):
+            fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+
+    def _refresh(self):
+        if self._version.value == self._local_version:
+            return
+        with self._lock:
+            data = ctypes.string_at(ctypes.addressof(self._snapshot), self._snapshot_length.value)
+            self._local_version = self._version.value
+        self._local = json.loads(data.decode("utf-8")) if data else {}
+
+    def update(self, msg):
+        """Merge msg into the shared values and record changes of the history keys."""
+        with self._lock:
+            if self._version.value != self._local_version:
+                data = ctypes.string_at(ctypes.addressof(self._snapshot), self._snapshot_length.value)
+                self._local = json.loads(data.decode("utf-8")) if data else {}
+
+            changes = {}
+            for key in self.history_keys:
+                if key in msg and self._local.get(key) != msg[key]:
+                    changes[key] = msg[key]
+            if changes:
+                changes["Timestamp"] = msg.get("Timestamp", time.time())
+                self._append_history(changes)
+
+            latest = dict(self._local)
+            latest.update(msg)
+            data = json.dumps(latest).encode("utf-8")
+            if len(data) > len(self._snapshot):
+                raise ValueError("metadata snapshot of {} bytes does not fit".format(len(data)))
+            ctypes.memmove(ctypes.addressof(self._snapshot), data, len(data))
+            self._snapshot_length.value = len(data)
+            self._version.value += 1
+            self._local = latest
+            self._local_version = self._version.value
+        try:
+            os.write(self._notify_w, b"\0")
+        except OSError as e:
+            # A full pipe already signals pending updates
+            if e.errno != errno.EAGAIN:
+                raise
+
+    def _append_history(self, entry):
+        data = (json.dumps(entry) + "\n").encode("utf-8")
+        offset = self._history_length.value
+        if offset + len(data) > len(self._history):
+            self._history_dropped.value += 1
+            return
+        ctypes.memmove(ctypes.addressof(self._history) + offset, data, len(data))
+        self._history_length.value = offset + len(data)
+
+    def history(self, since=None):
+        """Return the recorded changes, optionally only those from since on."""
+        with self._lock:
+            length = self._history_length.value
+            if length > self._local_history_length:
+                data = ctypes.string_at(ctypes.addressof(self._history) + self._local_history_length,
+                                        length - self._local_history_length)
+                self._local_history.extend(json.loads(line) for line in data.decode("utf-8").splitlines())
+                self._local_history_length = length
+        if since is None:
+            return list(self._local_history)
+        return [entry for entry in self._local_history if entry["Timestamp"] >= since]
+
+    def fileno(self):
+        """Readable after an update; meant for a single waiting process."""
+        return self._notify_r
+
+    def drain(self):
+        """Clear the update signal."""
+        try:
+            while os.read(self._notify_r, 4096):
+                pass
+        except OSError as e:
+            if e.errno != errno.EAGAIN:
+                raise
+
+    def history_dropped(self):
+        return self._history_dropped.value
+
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def __getitem__(self, key):
+        self._refresh()
+        return self._local[key]
+
+    def __contains__(self, key):
+        self._refresh()
+        return key in self._local
+
+    def get(self, key, default=None):
+        self._refresh()
+        return self._local.get(key, default)
+
+    def items(self):
+        self._refresh()
+        return list(self._local.items())
+
+    def keys(self):
+        self._refresh()
+        return list(self._local.keys())
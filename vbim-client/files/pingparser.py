@@ -8,12 +8,16 @@ Parses the output of the system ping command.
 """
 __version__ = '0.5'
 
+from array import array
 from optparse import OptionGroup, OptionParser
 
 import re
 import sys
 
 __all__ = ["parse",
+           "parse_lines",
+           "parse_stream",
+           "RttSeries",
            "format_ping_result",
            ]
 
@@ -30,11 +34,17 @@ host_matcher = re.compile(r'PING ([a-zA-Z0-9.\-]+) *\(')
 
 # This one works on OS X output which includes the percentage in 0.0% format
 # https://regex101.com/r/nmjQzI/2
-rslt_matcher = re.compile(r'(\d+) packets transmitted, (\d+) (?:packets )?received, (\d+\.?\d*)% packet loss')
+# Linux inserts "+N duplicates, " and/or "+N errors, " before the packet loss
+rslt_matcher = re.compile(r'(\d+) packets transmitted, (\d+) (?:packets )?received,(?: \+\d+ \w+,)* (\d+\.?\d*)% packet loss')
 
 # Pull out round-trip min/avg/max/stddev = 49.042/49.042/49.042/0.000 ms
 minmax_matcher = re.compile(r'(\d+.\d+)/(\d+.\d+)/(\d+.\d+)/(\d+.\d+)')
 
+# Reply lines are split with str.find() instead of a regex, e.g.
+# [1499244443.424323] 64 bytes from 1.2.3.4: icmp_seq=1 ttl=56 time=12.3 ms (DUP!)
+seq_token = 'icmp_seq='
+time_token = 'time='
+
 # Available replacements
 format_replacements = [('%h', 'host'),
                        ('%s', 'sent'),
@@ -96,6 +106,174 @@ def parse(ping_output):
             }
 
 
+class RttSeries(object):
+    """
+    Per-reply round trip times in the order the replies arrived, backed by
+    arrays: `seq` (icmp_seq), `rtt` (milliseconds) and `time` (the receive
+    timestamp printed by ping -D, NaN if not available). Duplicate replies are
+    counted but not added to the series.
+    """
+    __slots__ = ('seq', 'rtt', 'time', 'duplicates', 'reordered', '_seen', '_max_seq')
+
+    def __init__(self):
+        self.seq = array('l')
+        self.rtt = array('d')
+        self.time = array('d')
+        self.duplicates = 0
+        self.reordered = 0
+        self._seen = set()
+        self._max_seq = -1
+
+    def __len__(self):
+        return len(self.rtt)
+
+    def add(self, seq, rtt, timestamp=float('nan'), dup=False):
+        if dup or seq in self._seen:
+            self.duplicates += 1
+            return
+        if seq < self._max_seq:
+            self.reordered += 1
+        else:
+            self._max_seq = seq
+        self._seen.add(seq)
+        self.seq.append(seq)
+        self.rtt.append(rtt)
+        self.time.append(timestamp)
+
+    def percentile(self, p, ordered=None):
+        """Return the p-th percentile (0-100) of the RTTs, linearly interpolated."""
+        if not self.rtt:
+            return None
+        if ordered is None:
+            ordered = sorted(self.rtt)
+        k = (len(ordered) - 1) * p / 100.0
+        lower = int(k)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+    def interval_loss(self, sent, interval_size=10, first_seq=None):
+        """
+        Return the packet loss percentage for consecutive intervals of
+        `interval_size` requests out of the `sent` requests starting at
+        `first_seq` (default: 1, or 0 if that was received as on OS X).
+        """
+        if first_seq is None:
+            first_seq = min(min(self.seq), 1) if self.seq else 1
+        received = [0] * ((sent + interval_size - 1) // interval_size)
+        for seq in self._seen:
+            index = (seq - first_seq) // interval_size
+            if 0 <= index < len(received):
+                received[index] += 1
+        loss = []
+        for index, count in enumerate(received):
+            size = min(interval_size, sent - index * interval_size)
+            loss.append(100.0 * (size - count) / size)
+        return loss
+
+    def stats(self, sent=None, interval_size=10):
+        """Return the percentiles, duplicate/reorder counts and per-interval loss."""
+        if sent is None:
+            sent = (self._max_seq - min(self.seq) + 1) if self.seq else 0
+        ordered = sorted(self.rtt)
+        return {'p50'          : self.percentile(50, ordered),
+                'p90'          : self.percentile(90, ordered),
+                'p99'          : self.percentile(99, ordered),
+                'duplicates'   : self.duplicates,
+                'reordered'    : self.reordered,
+                'interval_size': interval_size,
+                'interval_loss': self.interval_loss(sent, interval_size)}
+
+    def to_dict(self):
+        """Return the series as lists, for JSON output."""
+        return {'seq' : self.seq.tolist(),
+                'rtt' : self.rtt.tolist(),
+                'time': [t if t == t else None for t in self.time]}
+
+
+def _parse_reply(line, series):
+    """
+    Add the reply in `line` to `series`; return False if it is not a reply.
+    """
+    i = line.find(seq_token)
+    if i < 0:
+        return False
+    j = line.find(time_token, i)
+    if j < 0:
+        # e.g. "Destination Host Unreachable" lines carry a sequence number
+        return False
+    i += len(seq_token)
+    seq = int(line[i:line.index(' ', i)])
+    j += len(time_token)
+    rtt = float(line[j:line.index(' ', j)])
+    timestamp = float('nan')
+    if line.startswith('['):
+        timestamp = float(line[1:line.index(']')])
+    series.add(seq, rtt, timestamp, line.endswith('(DUP!)'))
+    return True
+
+
+def parse_lines(lines, interval_size=10, keep_raw=True):
+    """
+    Parse the output of ping in a single pass over `lines` (an iterable of
+    str or bytes) into the dictionary returned by `parse`, extended with:
+
+        `series`: *RttSeries*; the per-reply RTT series
+        `p50`, `p90`, `p99`: *float*; RTT percentiles in milliseconds
+        `duplicates`: *int*; the number of duplicate replies
+        `reordered`: *int*; the number of replies received out of order
+        `interval_loss`: *list*; packet loss percentage for each interval of
+                    `interval_size` requests
+        `raw`: *string*; the complete output, if `keep_raw` is set
+
+    Only the non-reply lines are kept for the summary regexes.
+    """
+    series = RttSeries()
+    other = []
+    raw = []
+    for line in lines:
+        if not isinstance(line, str):
+            line = line.decode('ascii', 'replace')
+        if keep_raw:
+            raw.append(line)
+        line = line.rstrip()
+        try:
+            if _parse_reply(line, series):
+                continue
+        except ValueError:
+            pass
+        other.append(line)
+
+    summary = '\n'.join(other)
+    try:
+        result = parse(summary)
+    except Exception:
+        result = {'error': 'no ping summary'}
+
+    try:
+        sent = int(result['sent'])
+    except (KeyError, ValueError):
+        sent = None
+    result.update(series.stats(sent, interval_size))
+    result['series'] = series
+    if keep_raw:
+        result['raw'] = ''.join(raw)
+    return result
+
+
+def parse_stream(stream, interval_size=10, keep_raw=True):
+    """
+    Like `parse_lines`, but reads `stream` (e.g. the stdout of a ping
+    subprocess) line by line as the replies arrive.
+    """
+    def lines():
+        while True:
+            line = stream.readline()
+            if not line:
+                return
+            yield line
+    return parse_lines(lines(), interval_size, keep_raw)
+
+
 def format_ping_result(ping_result, format_string=default_format):
     """Use format_string to format the ping_result dictionary."""
     output = format_string
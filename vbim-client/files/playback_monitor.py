@@ -0,0 +1,148 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Polls the player state exposed by the landing pages (window.vbim, see
+vbim-server/players/*.php) until the streaming duration is over or the run
+can be ended early.
+"""
+
+import time
+
+# Returns the events recorded since index arguments[0] and the current state
+STATE_SCRIPT = """
+if (typeof vbim === 'undefined') {
+    return null;
+}
+return {events: vbim.events.slice(arguments[0]),
+        firstFrame: vbim.firstFrame,
+        navigationStart: vbim.navigationStart,
+        played: vbim.played,
+        fatal: vbim.fatal};
+"""
+
+END_DURATION = "duration"
+END_TARGET_PLAYED = "target_played"
+END_FATAL_ERROR = "fatal_error"
+END_STARTUP_TIMEOUT = "startup_timeout"
+END_STALL_TIMEOUT = "stall_timeout"
+
+def get_stalls(events):
+    """Return the stall timeline as a list of {start, end, duration} (seconds since epoch).
+
+       A stall is a "waiting" event after the first "playing" event, ended by
+       the next "playing" event; a stall still ongoing has end None.
+    """
+    stalls = []
+    started = False
+    stall_start = None
+    for e in events:
+        if e["type"] == "playing":
+            if stall_start is not None:
+                end = e["time"] / 1000.0
+                stalls.append({"start": stall_start, "end": end, "duration": end - stall_start})
+                stall_start = None
+            started = True
+        elif e["type"] == "waiting" and started and stall_start is None:
+            stall_start = e["time"] / 1000.0
+    if stall_start is not None:
+        stalls.append({"start": stall_start, "end": None, "duration": None})
+    return stalls
+
+class PlaybackMonitor(object):
+    """Waits for the end of a playback session.
+
+       The session ends after duration seconds, or earlier if the player
+       reports a fatal error, target_played seconds of media have been played,
+       playback did not start within startup_timeout seconds or a single stall
+       lasts longer than stall_timeout seconds (0 disables a condition).
+       If the page does not expose its state, this degrades to a plain sleep.
+       Driver calls are made under lock if one is given.
+    """
+
+    def __init__(self, driver, duration, poll_interval=1, target_played=0, startup_timeout=0, stall_timeout=0, lock=None):
+        self.driver = driver
+        self.duration = duration
+        self.poll_interval = poll_interval
+        self.target_played = target_played
+        self.startup_timeout = startup_timeout
+        self.stall_timeout = stall_timeout
+        self.lock = lock
+        self.events = []
+        self.state = None
+
+    def _poll(self):
+        if self.lock is not None:
+            with self.lock:
+                state = self.driver.execute_script(STATE_SCRIPT, len(self.events))
+        else:
+            state = self.driver.execute_script(STATE_SCRIPT, len(self.events))
+        if state is not None:
+            self.events.extend(state["events"])
+            self.state = state
+        return state
+
+    def _end_reason(self, now, time_start):
+        state = self.state
+        if state is None:
+            return None
+        if state["fatal"] is not None:
+            return END_FATAL_ERROR
+        if self.target_played and state["played"] >= self.target_played:
+            return END_TARGET_PLAYED
+        if self.startup_timeout and state["firstFrame"] is None and now - time_start >= self.startup_timeout:
+            return END_STARTUP_TIMEOUT
+        if self.stall_timeout:
+            stalls = get_stalls(self.events)
+            if stalls and stalls[-1]["end"] is None and time.time() - stalls[-1]["start"] >= self.stall_timeout:
+                return END_STALL_TIMEOUT
+        return None
+
+    def run(self):
+        """Block until the session ends and return the playback result."""
+        time_start = time.time()
+        deadline = time_start + self.duration
+        end_reason = END_DURATION
+        while True:
+            now = time.time()
+            if now >= deadline:
+                break
+            try:
+                self._poll()
+            except Exception:
+                # Page is navigating or not ready yet, try again next interval
+                pass
+            reason = self._end_reason(time.time(), time_start)
+            if reason is not None:
+                end_reason = reason
+                break
+            time.sleep(max(0, min(self.poll_interval, deadline - time.time())))
+        time_end = time.time()
+
+        try:
+            self._poll()
+        except Exception:
+            pass
+        return self.result(time_start, time_end, end_reason)
+
+    def result(self, time_start, time_end, end_reason):
+        state = self.state or {}
+        stalls = get_stalls(self.events)
+        ttff = None
+        if state.get("firstFrame") is not None:
+            ttff = (state["firstFrame"] - state["navigationStart"]) / 1000.0
+        return {"end_reason": end_reason,
+                "time_start": time_start,
+                "time_end": time_end,
+                "duration": time_end - time_start,
+                "instrumented": self.state is not None,
+                "time_to_first_frame": ttff,
+                "played": state.get("played"),
+                "fatal_error": state.get("fatal"),
+                "stall_count": len(stalls),
+                "stall_duration": sum(s["duration"] for s in stalls if s["duration"] is not None),
+                "stalls": stalls,
+                "events": self.events}
@@ -0,0 +1,301 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Probe runner role of the VBIM client.
+
+Runs ping and traceroute bound to an interface, around the runs (see
+start_probes) or once for all targets of a batch (see run_probe_campaign).
+The parsers, and with traceroute_parser the DNS based ASN lookup, are
+imported on first use.
+"""
+
+from collections import OrderedDict
+try:
+    from Queue import Queue, Empty
+except ImportError:
+    from queue import Queue, Empty
+from settings import EXPCONFIG, TAG
+from subprocess import Popen, PIPE
+import threading
+import time
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+def preload():
+    """Import the modules this role loads lazily."""
+    import pingparser
+    import traceroute_parser
+
+def create_asn_resolver(expconfig):
+    """Return the ASN resolver for traceroute, None to use the default one."""
+    try:
+        from asn_lookup import AsnResolver, PrefixTable
+    except Exception as e:
+        return None
+    prefix_table = None
+    if expconfig["cnf_asn_prefix_table"]:
+        try:
+            prefix_table = PrefixTable().load(expconfig["cnf_asn_prefix_table"])
+        except Exception as e:
+            if expconfig["cnf_verbosity"] > 0:
+                print(TAG + "Cannot load ASN prefix table: {}".format(e))
+    return AsnResolver(cache_file=expconfig["cnf_asn_cache_file"] or None,
+                       ttl=expconfig["cnf_asn_cache_ttl"],
+                       prefix_table=prefix_table,
+                       workers=expconfig["cnf_asn_lookup_workers"])
+
+def traceroute(target, interface, asn_resolver=None, save_asns=True):
+
+    cmd = ["traceroute", "-A"]
+    if (interface):
+        cmd.extend(["-i", interface])  
+    cmd.append(target)
+    
+    if EXPCONFIG["cnf_verbosity"] > 1:
+        print("\n" + TAG + "Running traceroute against..." + target)
+
+    def on_hop(hop):
+        if EXPCONFIG["cnf_verbosity"] > 2:
+            print(TAG + "Traceroute hop {}: {}".format(hop.hop, " ".join(str(probe.ip or "*") for probe in hop.probes)))
+
+    # Hops are parsed as traceroute prints them
+    raw = []
+    def lines():
+        for line in iter(p.stdout.readline, b""):
+            raw.append(line)
+            yield line
+
+    from traceroute_parser import parse_lines as parse_traceroute_lines
+
+    time_start = time.time()
+    p = Popen(cmd, stdout=PIPE)
+    try:
+        traceroute = parse_traceroute_lines(lines(), resolver=asn_resolver, on_hop=on_hop)
+        if asn_resolver is not None and save_asns:
+            asn_resolver.save()
+    except Exception as e:
+        traceroute = {"error": "could not parse traceroute"}
+    finally:
+        # Read what is left in case parsing failed, traceroute would block on the full pipe
+        raw.append(p.communicate()[0])
+    time_end = time.time()
+
+    if EXPCONFIG["cnf_verbosity"] > 1:
+        print(TAG + "Traceroute finished.")
+
+    if not traceroute:
+        traceroute = {"error": "no traceroute output"}
+
+    traceroute["time_start"] = time_start
+    traceroute["time_end"] = time_end
+    traceroute["raw"] = b"".join(raw).decode("ascii", "replace")
+    return traceroute
+
+def ping(target, num_pings, interface, ping_timeout, numeric=False):
+
+    cmd = ["ping", "-c", str(num_pings), "-a", "-D", "-W", str(ping_timeout)]
+    if numeric:
+        # No reverse lookups of the replies
+        cmd.append("-n")
+
+    if (interface):
+        cmd.extend(["-I", interface])
+    cmd.append(target)
+
+    if EXPCONFIG["cnf_verbosity"] > 1:
+        print("\n" + TAG + "Running {} pings to {} ...".format(num_pings, target))
+
+    import pingparser
+
+    # The replies are parsed as they arrive
+    time_start = time.time()
+    p = Popen(cmd, stdout=PIPE)
+    try:
+        ping = pingparser.parse_stream(p.stdout)
+    except Exception as e:
+        ping = {"error": "could not parse ping"}
+    finally:
+        # Read what is left in case parsing failed, ping would block on the full pipe
+        p.communicate()
+    time_end = time.time()
+
+    if EXPCONFIG["cnf_verbosity"] > 1:
+        print(TAG + "Ping finished.")
+
+    if EXPCONFIG["cnf_verbosity"] > 2:
+        print(TAG + "Ping result: \n{}".format(ping.get("raw")))
+
+    if "series" in ping:
+        ping["rtt_series"] = ping.pop("series").to_dict()
+
+    ping["time_start"] = time_start
+    ping["time_end"] = time_end
+
+    return ping
+
+class ProbeThread(threading.Thread):
+    """Runs ping or traceroute in the background and keeps its result."""
+
+    def __init__(self, kind, phase, func, args, host=None):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.kind = kind
+        self.phase = phase
+        self.func = func
+        self.args = args
+        self.host = host
+        self.result = None
+
+    def run(self):
+        try:
+            self.result = self.func(*self.args)
+        except Exception as e:
+            self.result = {"error": "{} failed: {}".format(self.kind, e)}
+        self.result["phase"] = self.phase
+        if self.host is not None:
+            self.result["target_host"] = self.host
+
+def start_probes(cfg, ifname, phase, asn_resolver=None):
+    """Start the ping and traceroute requested by cfg concurrently.
+
+       Targets resolved by the batch DNS cache are probed at their pinned
+       address. asn_resolver is the ASN resolver of the interface batch, a
+       new one is created without it.
+    """
+    pinned = cfg.get("cnf_dns_pinned") or {}
+    probes = []
+    if not cfg["cnf_ping_skip"]:
+        target = cfg["cnf_ping_target"]
+        probes.append(ProbeThread("ping", phase, ping, (pinned.get(target, target), cfg["cnf_ping_count"], ifname, cfg["cnf_ping_timeout"], target in pinned),
+                                  target if target in pinned else None))
+    if not cfg["cnf_traceroute_skip"]:
+        target = cfg["cnf_traceroute_target"]
+        probes.append(ProbeThread("traceroute", phase, traceroute, (pinned.get(target, target), ifname, asn_resolver or create_asn_resolver(cfg)),
+                                  target if target in pinned else None))
+    for probe in probes:
+        probe.start()
+    return probes
+
+def finish_probes(probes):
+    """Wait for the probes and return them."""
+    for probe in probes:
+        probe.join()
+    return probes
+
+def get_probe_results(probes, kind):
+    """Return the result of the given kind, or a list of results if there are several phases."""
+    results = [probe.result for probe in probes if probe.kind == kind]
+    if len(results) == 1:
+        return results[0]
+    return results
+
+def get_probe_summary(probes):
+    """Return the probe results without raw output and RTT series, for the SUMMARY."""
+    summary = []
+    for probe in probes:
+        entry = OrderedDict([("type", probe.kind)])
+        entry.update((k, v) for k, v in probe.result.items() if k not in ("raw", "rtt_series"))
+        summary.append(entry)
+    return summary
+
+def get_batch_hosts(configurations):
+    """Return the host names the configurations use: landing page, probe and CDN hosts."""
+    hosts = []
+    for cfg in configurations:
+        names = [urlparse(cfg["cnf_stub"]).hostname] + list(cfg.get("cnf_probe_targets") or [])
+        if not cfg["cnf_ping_skip"]:
+            names.append(cfg["cnf_ping_target"])
+        if not cfg["cnf_traceroute_skip"]:
+            names.append(cfg["cnf_traceroute_target"])
+        hosts.extend(name for name in names if name and name not in hosts)
+    return hosts
+
+def get_campaign_targets(configurations):
+    """Return the unique targets of the configurations as target -> {"kinds", "configurations"}.
+
+       The cnf_probe_targets of a configuration are pinged and tracerouted
+       (unless skipped), its cnf_ping_target only pinged and its
+       cnf_traceroute_target only tracerouted.
+    """
+    targets = OrderedDict()
+    for i, cfg in enumerate(configurations):
+        extra = cfg.get("cnf_probe_targets") or []
+        probes = []
+        if not cfg["cnf_ping_skip"]:
+            probes.extend(("ping", target) for target in [cfg["cnf_ping_target"]] + extra)
+        if not cfg["cnf_traceroute_skip"]:
+            probes.extend(("traceroute", target) for target in [cfg["cnf_traceroute_target"]] + extra)
+        for kind, target in probes:
+            entry = targets.setdefault(target, {"kinds": [], "configurations": []})
+            if kind not in entry["kinds"]:
+                entry["kinds"].append(kind)
+            if i + 1 not in entry["configurations"]:
+                entry["configurations"].append(i + 1)
+    return targets
+
+def run_probe_campaign(expconfig, ifname, configurations, pinned=None, asn_resolver=None):
+    """Ping and traceroute the targets of all configurations once, bound to ifname.
+
+       At most cnf_probe_campaign_workers probes run at the same time.
+       Targets in pinned (host -> address) are probed at that address, the
+       traceroutes share asn_resolver (a new one if None).
+    """
+    pinned = pinned or {}
+    targets = get_campaign_targets(configurations)
+    tasks = Queue()
+    for target, entry in targets.items():
+        for kind in entry["kinds"]:
+            tasks.put((kind, target))
+    if asn_resolver is None and any("traceroute" in entry["kinds"] for entry in targets.values()):
+        asn_resolver = create_asn_resolver(expconfig)
+    results = dict((target, {}) for target in targets)
+
+    def worker():
+        while True:
+            try:
+                kind, target = tasks.get_nowait()
+            except Empty:
+                return
+            try:
+                if kind == "ping":
+                    result = ping(pinned.get(target, target), expconfig["cnf_ping_count"], ifname, expconfig["cnf_ping_timeout"], target in pinned)
+                else:
+                    # The workers share the resolver, its cache is saved once they are done
+                    result = traceroute(pinned.get(target, target), ifname, asn_resolver, save_asns=False)
+            except Exception as e:
+                result = {"error": "{} failed: {}".format(kind, e)}
+            results[target][kind] = result
+
+    if expconfig["cnf_verbosity"] > 1:
+        print(TAG + "Probe campaign on {}: {} targets, {} probes".format(ifname, len(targets), tasks.qsize()))
+
+    time_start = time.time()
+    threads = [threading.Thread(target=worker) for i in range(min(expconfig["cnf_probe_campaign_workers"], tasks.qsize()))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    time_end = time.time()
+    if asn_resolver is not None:
+        asn_resolver.save()
+
+    campaign = OrderedDict()
+    campaign["cnf_dataid"] = expconfig["cnf_dataid"]
+    campaign["monroe_nodeid"] = expconfig["nodeid"]
+    campaign["summary_interface"] = ifname
+    campaign["summary_time_batch"] = time.strftime("%Y%m%d-%H%M%S", expconfig["timestamp"])
+    campaign["time_start"] = time_start
+    campaign["time_end"] = time_end
+    campaign["targets"] = []
+    for target, entry in targets.items():
+        result = OrderedDict([("target", target), ("address", pinned.get(target)), ("configurations", entry["configurations"])])
+        for kind in entry["kinds"]:
+            result[kind] = results[target].get(kind)
+        campaign["targets"].append(result)
+    return campaign
@@ -0,0 +1,253 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+CPU and memory usage of the experiment process tree.
+
+ProcessTreeSampler follows the processes below a set of root processes (the
+experiment process and the ChromeDriver of a pooled browser session, and so
+ChromeDriver, the Chrome browser, renderer and GPU processes and the probes)
+and samples their CPU time, resident memory and context switches from /proc
+at a fixed interval, together with the CPU utilization of the whole node.
+The result is a compact time series per kind of process and summary
+statistics, so that runs in which the client device rather than the network
+was the bottleneck can be recognized.
+"""
+
+from collections import OrderedDict
+import os
+import threading
+import time
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE_KB = os.sysconf("SC_PAGE_SIZE") // 1024
+
+def read_stat(pid):
+    """Return (name, ppid, cpu seconds, rss KiB, start time) of pid from /proc/<pid>/stat, or None."""
+    try:
+        with open("/proc/{}/stat".format(pid), "rb") as f:
+            data = f.read().decode("utf-8", "replace")
+    except (IOError, OSError):
+        return None
+    end = data.rfind(")")
+    fields = data[end + 2:].split()
+    try:
+        return (data[data.find("(") + 1:end], int(fields[1]),
+                float(int(fields[11]) + int(fields[12])) / CLOCK_TICKS,
+                int(fields[21]) * PAGE_SIZE_KB, int(fields[19]))
+    except (IndexError, ValueError):
+        return None
+
+def read_context_switches(pid):
+    """Return the (voluntary, involuntary) context switches of pid, or None."""
+    switches = {}
+    try:
+        with open("/proc/{}/status".format(pid)) as f:
+            for line in f:
+                if line.startswith(("voluntary_ctxt_switches:", "nonvoluntary_ctxt_switches:")):
+                    key, value = line.split(":", 1)
+                    switches[key] = int(value)
+    except (IOError, OSError, ValueError):
+        return None
+    return (switches.get("voluntary_ctxt_switches", 0), switches.get("nonvoluntary_ctxt_switches", 0))
+
+def read_system_cpu():
+    """Return the (busy, total) CPU time of the node in clock ticks from /proc/stat, or None."""
+    try:
+        with open("/proc/stat") as f:
+            values = [int(value) for value in f.readline().split()[1:]]
+    except (IOError, OSError, ValueError):
+        return None
+    # idle and iowait
+    idle = values[3] + (values[4] if len(values) > 4 else 0)
+    return sum(values) - idle, sum(values)
+
+def process_kind(pid, name):
+    """Classify a process, Chrome processes by their --type (renderer, gpu-process, ...)."""
+    if "chrom" not in name or "chromedriver" in name:
+        return name
+    try:
+        with open("/proc/{}/cmdline".format(pid), "rb") as f:
+            cmdline = f.read().decode("utf-8", "replace").split("\0")
+    except (IOError, OSError):
+        return name
+    for arg in cmdline:
+        if arg.startswith("--type="):
+            return "chrome-" + arg[len("--type="):]
+    return "chrome"
+
+class ProcessTreeSampler(threading.Thread):
+    """Samples the processes below roots every interval seconds until stop() is called.
+
+       The CPU time and context switches of processes that already run at
+       the first sample are counted from there, so a pooled browser is only
+       charged for the current run. saturation is the node CPU utilization
+       (percent) above which a sample counts as saturated.
+    """
+
+    def __init__(self, roots, interval, saturation=90):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.roots = set(roots)
+        self.interval = interval
+        self.saturation = saturation
+        self.cpus = os.sysconf("SC_NPROCESSORS_ONLN")
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.processes = OrderedDict()
+        self.times = []
+        self.system_cpu = []
+        self.tree_cpu = []
+        self.tree_rss = []
+        self.tree_switches = ([], [])
+        self.kinds = OrderedDict()
+        self._previous_system = None
+
+    def add_root(self, pid):
+        with self.lock:
+            self.roots.add(pid)
+
+    def tree(self):
+        """Return pid -> stat of the roots and all their descendants."""
+        stats = {}
+        children = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            stat = read_stat(entry)
+            if stat is not None:
+                stats[int(entry)] = stat
+                children.setdefault(stat[1], []).append(int(entry))
+        with self.lock:
+            pending = [pid for pid in self.roots if pid in stats]
+        tree = {}
+        while pending:
+            pid = pending.pop()
+            if pid not in tree:
+                tree[pid] = stats[pid]
+                pending.extend(children.get(pid, []))
+        return tree
+
+    def sample(self):
+        now = time.time()
+        tree = self.tree()
+        system = read_system_cpu()
+
+        cpu_total = 0.0
+        rss_total = 0
+        switches_total = [0, 0]
+        kinds = {}
+        for pid, (name, ppid, cpu, rss, start) in tree.items():
+            key = (pid, start)
+            switches = read_context_switches(pid)
+            process = self.processes.get(key)
+            if process is None:
+                # Processes started since the previous sample are charged from their start
+                baseline = cpu if not self.times else 0.0
+                baseline_switches = switches if not self.times else (0, 0)
+                process = self.processes[key] = {"pid": pid, "ppid": ppid, "name": name, "kind": process_kind(pid, name),
+                                                 "time_first": now, "time_last": now, "cpu_first": baseline, "cpu": baseline,
+                                                 "rss_kb_max": rss, "switches_first": baseline_switches,
+                                                 "switches": baseline_switches}
+            previous_cpu = process["cpu"]
+            previous_switches = process["switches"]
+            process.update({"time_last": now, "cpu": cpu, "rss_kb_max": max(rss, process["rss_kb_max"]),
+                            "switches": switches})
+            used = cpu - previous_cpu
+            if switches is not None and previous_switches is not None:
+                switched = (switches[0] - previous_switches[0], switches[1] - previous_switches[1])
+            else:
+                switched = (0, 0)
+            cpu_total += used
+            rss_total += rss
+            switches_total[0] += switched[0]
+            switches_total[1] += switched[1]
+            kind = kinds.setdefault(process["kind"], [0.0, 0, 0, 0])
+            kind[0] += used
+            kind[1] += rss
+            kind[2] += switched[0]
+            kind[3] += switched[1]
+
+        # The first sample is the baseline of the CPU times
+        elapsed = now - self.times[-1] if self.times else None
+        previous_system, self._previous_system = self._previous_system, system
+        self.times.append(now)
+        if elapsed is None:
+            return
+        if system is not None and previous_system is not None and system[1] > previous_system[1]:
+            self.system_cpu.append(round(100.0 * (system[0] - previous_system[0]) / (system[1] - previous_system[1]), 1))
+        else:
+            self.system_cpu.append(None)
+        self.tree_cpu.append(round(100.0 * cpu_total / elapsed, 1))
+        self.tree_rss.append(rss_total)
+        self.tree_switches[0].append(switches_total[0])
+        self.tree_switches[1].append(switches_total[1])
+        index = len(self.tree_cpu) - 1
+        for name, (used, rss, voluntary, nonvoluntary) in kinds.items():
+            series = self.kinds.get(name)
+            if series is None:
+                series = self.kinds[name] = OrderedDict((key, [None] * index) for key in (
+                    "cpu", "rss_kb", "voluntary_ctxt_switches", "nonvoluntary_ctxt_switches"))
+            series["cpu"].append(round(100.0 * used / elapsed, 1))
+            series["rss_kb"].append(rss)
+            series["voluntary_ctxt_switches"].append(voluntary)
+            series["nonvoluntary_ctxt_switches"].append(nonvoluntary)
+        for series in self.kinds.values():
+            for values in series.values():
+                values.extend([None] * (index + 1 - len(values)))
+
+    def run(self):
+        while True:
+            try:
+                self.sample()
+            except Exception:
+                pass
+            if self.stopped.wait(self.interval):
+                break
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.sample()
+
+    def result(self):
+        """Return the time series (CPU in percent of one CPU, memory in KiB, context switches since the
+           previous sample), the processes and statistics."""
+        processes = []
+        for process in self.processes.values():
+            entry = OrderedDict((key, process[key]) for key in ("pid", "ppid", "name", "kind", "time_first", "time_last", "rss_kb_max"))
+            entry["cpu_time"] = round(process["cpu"] - process["cpu_first"], 3)
+            if process["switches_first"] is not None and process["switches"] is not None:
+                entry["voluntary_ctxt_switches"] = process["switches"][0] - process["switches_first"][0]
+                entry["nonvoluntary_ctxt_switches"] = process["switches"][1] - process["switches_first"][1]
+            processes.append(entry)
+
+        system = [value for value in self.system_cpu if value is not None]
+        stats = OrderedDict([
+            ("samples", len(self.tree_cpu)),
+            ("tree_cpu_time", round(sum(process["cpu_time"] for process in processes), 3)),
+            ("tree_cpu_mean", round(sum(self.tree_cpu) / len(self.tree_cpu), 1) if self.tree_cpu else None),
+            ("tree_cpu_max", max(self.tree_cpu) if self.tree_cpu else None),
+            ("tree_rss_kb_max", max(self.tree_rss) if self.tree_rss else None),
+            ("system_cpu_mean", round(sum(system) / len(system), 1) if system else None),
+            ("system_cpu_max", max(system) if system else None),
+            ("saturated_fraction", round(float(sum(1 for value in system if value >= self.saturation)) / len(system), 3) if system else None),
+            ("nonvoluntary_ctxt_switches", sum(process.get("nonvoluntary_ctxt_switches", 0) for process in processes)),
+            ("voluntary_ctxt_switches", sum(process.get("voluntary_ctxt_switches", 0) for process in processes))])
+
+        start = self.times[0] if self.times else None
+        return OrderedDict([("interval", self.interval),
+                            ("cpus", self.cpus),
+                            ("time_start", start),
+                            ("time", [round(t - start, 3) for t in self.times[1:]]),
+                            ("system_cpu", self.system_cpu),
+                            ("tree_cpu", self.tree_cpu),
+                            ("tree_rss_kb", self.tree_rss),
+                            ("tree_voluntary_ctxt_switches", self.tree_switches[0]),
+                            ("tree_nonvoluntary_ctxt_switches", self.tree_switches[1]),
+                            ("kinds", self.kinds),
+                            ("processes", processes),
+                            ("stats", stats)])
@@ -0,0 +1,270 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+QoE events and KPIs from the browser console log.
+
+The player pages log their playback events as "LABEL --->" followed by the
+values (e.g. console.log("QUALITY --->", bitrate, width, height)), which
+Chrome reports as
+
+    https://.../dashjs.php?... 140:24 "QUALITY --->" 1200000 1280 720
+
+extract_events() turns the entries of driver.get_log("browser") (or of a
+saved CONSOLEOUTPUT file) into typed, timestamped events in one pass, with
+the labels and patterns of the player compiled once. compute_kpis() then
+derives startup delay, stalls, bitrate, quality switches and buffer level
+from the event columns.
+
+Run as a script to extract the KPIs of archived CONSOLEOUTPUT files or
+result bundles in bulk, e.g.
+
+    ./qoe_events.py -j 4 results/*_CONSOLEOUTPUT.jsonl > kpis.jsonl
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import namedtuple, OrderedDict
+import json
+import re
+
+# An event; time in seconds since the epoch, value a number or None, detail a string or None
+Event = namedtuple("Event", ["time", "type", "value", "detail"])
+
+LABEL_RE = re.compile(r'"([A-Za-z][A-Za-z ]*?) --->" ?(.*)$')
+ARG_RE = re.compile(r'"((?:[^"\\]|\\.)*)"|(\S+)')
+PLAYER_RE = re.compile(r'_PLAYER\.([^_]+)_')
+
+# Labels logged by all player pages: label -> event type
+COMMON_LABELS = {
+    "FIRST FRAME": "first_frame",
+    "STALL START": "stall_start",
+    "STALL END": "stall_end",
+    "QUALITY": "quality",
+    "BUFFER": "buffer",
+    "FATAL": "fatal",
+}
+
+# Labels and message patterns of the individual pages; a pattern's first
+# group becomes the detail of the event
+PLAYER_LABELS = {
+    "bitmovin": {"PLAY": "play", "STALL": "stall_start", "adaptation": "switch", "TITLE": "title"},
+    "dashjs": {"ERROR": "error"},
+    "shaka": {},
+}
+PLAYER_PATTERNS = {
+    "bitmovin": [("error", r"player setup failed (.*)")],
+    "dashjs": [("abr", r'"ABR logic = " "([^"]*)"')],
+    "shaka": [("loaded", r"The video has now been loaded!()"),
+              ("error", r'"Error code" (\d+)')],
+}
+COMMON_PATTERNS = [("session", r'"sessionID = " "([^"]*)"')]
+
+class Matcher(object):
+    """The compiled labels and patterns of one player."""
+    __slots__ = ("labels", "patterns")
+
+    def __init__(self, player=None):
+        self.labels = dict(COMMON_LABELS)
+        self.labels.update(PLAYER_LABELS.get(player, {}))
+        self.patterns = [(kind, re.compile(pattern)) for kind, pattern in PLAYER_PATTERNS.get(player, []) + COMMON_PATTERNS]
+
+    def match(self, entry):
+        """Return the Event of a console log entry, or None."""
+        message = entry.get("message") or ""
+        timestamp = entry.get("timestamp")
+        when = timestamp / 1000.0 if isinstance(timestamp, (int, float)) else None
+        if " --->" in message:
+            m = LABEL_RE.search(message)
+            if m and m.group(1) in self.labels:
+                args = [bare or quoted for quoted, bare in ARG_RE.findall(m.group(2))]
+                value = None
+                detail = None
+                if args:
+                    try:
+                        value = float(args[0])
+                    except ValueError:
+                        detail = args[0]
+                    if len(args) > 1:
+                        detail = " ".join(args[1:] if value is not None else args)
+                return Event(when, self.labels[m.group(1)], value, detail)
+        for kind, pattern in self.patterns:
+            m = pattern.search(message)
+            if m:
+                return Event(when, kind, None, m.group(1) or None)
+        if entry.get("level") == "SEVERE":
+            return Event(when, "error", None, message)
+        return None
+
+_matchers = {}
+
+def get_matcher(player):
+    matcher = _matchers.get(player)
+    if matcher is None:
+        matcher = _matchers[player] = Matcher(player)
+    return matcher
+
+def extract_events(entries, player=None):
+    """Return the list of Events in the console log entries (dicts with level, message and timestamp)."""
+    match = get_matcher(player).match
+    events = []
+    for entry in entries:
+        event = match(entry)
+        if event is not None:
+            events.append(event)
+    return events
+
+def _mean(values):
+    return sum(values) / len(values) if values else None
+
+def compute_kpis(events, time_start=None, time_end=None):
+    """Return the QoE KPIs of the events (times in seconds, bitrates in bit/s).
+
+       time_start is the time the page was requested (default: the first
+       event), time_end the end of the playback (default: the last event).
+       Stalls before the first frame belong to the startup delay.
+    """
+    columns = {}
+    counts = OrderedDict()
+    for event in events:
+        counts[event.type] = counts.get(event.type, 0) + 1
+        if event.time is None:
+            continue
+        column = columns.get(event.type)
+        if column is None:
+            column = columns[event.type] = (array("d"), array("d"))
+        column[0].append(event.time)
+        column[1].append(event.value if event.value is not None else float("nan"))
+
+    times = [event.time for event in events if event.time is not None]
+    if time_start is None:
+        time_start = times[0] if times else None
+    if time_end is None:
+        time_end = times[-1] if times else None
+
+    kpis = OrderedDict()
+    first = columns.get("first_frame") or columns.get("play")
+    first_frame = first[0][0] if first else None
+    kpis["startup_delay"] = first_frame - time_start if first_frame is not None and time_start is not None else None
+
+    # Pair the stall starts and ends in time order; a stall still open at the end lasts until time_end.
+    # Players that log no stall ends (older bitmovin pages) end a stall with the next play event
+    stalls = []
+    starts = columns.get("stall_start", (array("d"), None))[0]
+    ends = columns.get("stall_end", (array("d"), None))[0]
+    plays = columns.get("play", (array("d"), None))[0]
+    i = j = 0
+    while i < len(starts):
+        start = starts[i]
+        i += 1
+        if first_frame is not None and start < first_frame:
+            continue
+        if ends:
+            while j < len(ends) and ends[j] < start:
+                j += 1
+            end = ends[j] if j < len(ends) else time_end
+        else:
+            k = bisect_left(plays, start)
+            end = plays[k] if k < len(plays) else time_end
+        stalls.append(max(0.0, end - start) if end is not None else 0.0)
+        # Repeated starts while stalled (e.g. "STALL" and "STALL START") belong to the same stall
+        while i < len(starts) and (end is None or starts[i] <= end):
+            i += 1
+    kpis["stall_count"] = len(stalls)
+    kpis["stall_duration"] = sum(stalls)
+
+    quality = columns.get("quality")
+    if quality:
+        qtimes, bitrates = quality
+        bounds = list(qtimes[1:]) + [max(time_end, qtimes[-1]) if time_end is not None else qtimes[-1]]
+        durations = [b - a for a, b in zip(qtimes, bounds)]
+        valid = [(bitrate, duration) for bitrate, duration in zip(bitrates, durations) if bitrate == bitrate]
+        total = sum(duration for bitrate, duration in valid)
+        kpis["bitrate_mean"] = (sum(bitrate * duration for bitrate, duration in valid) / total if total > 0 else
+                                _mean([bitrate for bitrate, duration in valid]))
+        kpis["bitrate_min"] = min(bitrate for bitrate, duration in valid) if valid else None
+        kpis["bitrate_max"] = max(bitrate for bitrate, duration in valid) if valid else None
+        kpis["switch_count"] = sum(1 for a, b in zip(bitrates, bitrates[1:]) if a != b)
+    else:
+        kpis["bitrate_mean"] = kpis["bitrate_min"] = kpis["bitrate_max"] = None
+        # Older bitmovin pages only log the number of quality switches
+        switches = columns.get("switch")
+        kpis["switch_count"] = int(max(switches[1])) if switches else None
+
+    levels = [level for level in columns["buffer"][1] if level == level] if "buffer" in columns else []
+    kpis["buffer_mean"] = _mean(levels)
+    kpis["buffer_min"] = min(levels) if levels else None
+
+    kpis["error_count"] = counts.get("error", 0)
+    kpis["fatal"] = next((event.detail for event in events if event.type == "fatal"), None)
+    kpis["event_counts"] = counts
+    return kpis
+
+def iter_console_entries(path):
+    """Yield the console log entries of a CONSOLEOUTPUT file (JSON lines or a JSON list) or result bundle."""
+    if path.endswith(".bundle"):
+        from result_bundle import BundleReader
+        with BundleReader(path) as bundle:
+            if "CONSOLEOUTPUT" in bundle:
+                for entry in bundle.iter_lines("CONSOLEOUTPUT"):
+                    yield entry
+        return
+    with open(path) as f:
+        first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            for entry in json.load(f):
+                yield entry
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def process_file(args):
+    path, player, with_events = args
+    if player is None:
+        m = PLAYER_RE.search(path)
+        player = m.group(1) if m else None
+    result = OrderedDict([("file", path), ("player", player)])
+    try:
+        events = extract_events(iter_console_entries(path), player)
+        result["kpis"] = compute_kpis(events)
+        if with_events:
+            result["events"] = [event._asdict() for event in events]
+    except Exception as e:
+        result["error"] = "{}: {}".format(type(e).__name__, e)
+    return result
+
+def main():
+    import argparse
+    import sys
+    from multiprocessing import Pool
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("files", nargs="+", help="CONSOLEOUTPUT files (.jsonl, .json) or result bundles")
+    parser.add_argument("--player", choices=sorted(PLAYER_LABELS), help="player of all files (default: from the file name)")
+    parser.add_argument("--events", action="store_true", help="also output the events")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="number of worker processes")
+    args = parser.parse_args()
+
+    tasks = [(path, args.player, args.events) for path in args.files]
+    if args.workers > 1:
+        pool = Pool(args.workers)
+        results = pool.imap(process_file, tasks, chunksize=16)
+    else:
+        pool = None
+        results = (process_file(task) for task in tasks)
+    failed = 0
+    for result in results:
+        failed += "error" in result
+        sys.stdout.write(json.dumps(result) + "\n")
+    if pool is not None:
+        pool.close()
+        pool.join()
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Single-file container for the results of one session.
+
+Layout:
+
+    MAGIC | section data ... | index (JSON) | index offset (8 bytes) | MAGIC
+
+Every section is stored as one contiguous, independently gzip-compressed (or
+uncompressed) byte range. The index lists name, type, encoding, offset and
+length of each section, so a reader seeks to the sections it needs and leaves
+the others untouched. The bundle is written to a temporary file next to the
+target and renamed once it is complete.
+"""
+
+import gzip
+import json
+import os
+import shutil
+import struct
+from tempfile import NamedTemporaryFile
+
+MAGIC = b"VBIMBNDL"
+VERSION = 1
+TRAILER = struct.Struct(">Q8s")
+
+class BundleError(Exception):
+    pass
+
+class BundleWriter(object):
+    """Writes sections to path; nothing is visible at path before close().
+
+       Sections of type "json" hold one JSON document, sections of type
+       "jsonl" one JSON document per line.
+    """
+
+    def __init__(self, path, meta=None, compress=True):
+        self.path = path
+        self.compress = compress
+        self.meta = meta or {}
+        self.sections = []
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.f = NamedTemporaryFile(mode="wb", delete=False, dir=directory)
+        self.f.write(MAGIC)
+
+    def _add(self, name, content_type, write, compress, encoding):
+        if name in self.names():
+            raise BundleError("duplicate section {}".format(name))
+        offset = self.f.tell()
+        if compress:
+            gz = gzip.GzipFile(filename="", mode="wb", fileobj=self.f)
+            size = write(gz)
+            gz.close()
+        else:
+            size = write(self.f)
+        self.sections.append({"name": name,
+                              "type": content_type,
+                              "encoding": encoding,
+                              "offset": offset,
+                              "length": self.f.tell() - offset,
+                              "size": size})
+
+    def names(self):
+        return [section["name"] for section in self.sections]
+
+    def add_bytes(self, name, data, content_type="json"):
+        def write(out):
+            out.write(data)
+            return len(data)
+        self._add(name, content_type, write, self.compress, "gzip" if self.compress else "identity")
+
+    def add_json(self, name, obj):
+        self.add_bytes(name, json.dumps(obj).encode("utf-8"), "json")
+
+    def add_files(self, name, paths, content_type="jsonl", compressed=False):
+        """Add the concatenated contents of paths as one section.
+
+           Already gzip-compressed files (compressed=True) are stored as they
+           are; concatenated gzip files form a valid multi-member stream.
+        """
+        def copy(out):
+            size = 0
+            for path in paths:
+                with open(path, "rb") as f:
+                    while True:
+                        data = f.read(65536)
+                        if not data:
+                            break
+                        out.write(data)
+                        size += len(data)
+            return size
+
+        if compressed:
+            self._add(name, content_type, copy, False, "gzip")
+            self.sections[-1]["size"] = None
+        else:
+            self._add(name, content_type, copy, self.compress, "gzip" if self.compress else "identity")
+
+    def add_file(self, name, path, content_type="jsonl", compressed=False):
+        self.add_files(name, [path], content_type, compressed)
+
+    def close(self):
+        """Write the index and move the bundle to its final path."""
+        index = json.dumps({"version": VERSION, "meta": self.meta, "sections": self.sections}).encode("utf-8")
+        index_offset = self.f.tell()
+        self.f.write(index)
+        self.f.write(TRAILER.pack(index_offset, MAGIC))
+        self.f.close()
+        os.chmod(self.f.name, 0o644)
+        shutil.move(self.f.name, self.path)
+        return self.path
+
+    def abort(self):
+        self.f.close()
+        if os.path.exists(self.f.name):
+            os.remove(self.f.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+class _Region(object):
+    """Read-only file object for length bytes of f starting at offset."""
+
+    def __init__(self, f, offset, length):
+        self.f = f
+        self.offset = offset
+        self.length = length
+        self.pos = 0
+
+    def read(self, size=-1):
+        remaining = self.length - self.pos
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        self.f.seek(self.offset + self.pos)
+        data = self.f.read(size)
+        self.pos += len(data)
+        return data
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, pos, whence=0):
+        if whence == 1:
+            pos += self.pos
+        elif whence == 2:
+            pos += self.length
+        self.pos = max(0, min(pos, self.length))
+        return self.pos
+
+    def close(self):
+        pass
+
+class BundleReader(object):
+    """Reads single sections of a bundle; only the requested ranges are read."""
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "rb")
+        try:
+            if self.f.read(len(MAGIC)) != MAGIC:
+                raise BundleError("{} is not a result bundle".format(path))
+            self.f.seek(-TRAILER.size, 2)
+            index_offset, magic = TRAILER.unpack(self.f.read(TRAILER.size))
+            if magic != MAGIC:
+                raise BundleError("{} is incomplete".format(path))
+            end = self.f.tell() - TRAILER.size
+            self.f.seek(index_offset)
+            index = json.loads(self.f.read(end - index_offset).decode("utf-8"))
+        except Exception:
+            self.f.close()
+            raise
+        self.version = index["version"]
+        self.meta = index["meta"]
+        self.sections = [section["name"] for section in index["sections"]]
+        self.index = dict((section["name"], section) for section in index["sections"])
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def open(self, name):
+        """Return a file object with the decoded contents of section name."""
+        section = self.index[name]
+        region = _Region(self.f, section["offset"], section["length"])
+        if section["encoding"] == "gzip":
+            return gzip.GzipFile(filename="", mode="rb", fileobj=region)
+        return region
+
+    def read(self, name):
+        return self.open(name).read()
+
+    def iter_lines(self, name):
+        """Yield the decoded JSON documents of a "jsonl" section one by one."""
+        f = self.open(name)
+        rest = b""
+        while True:
+            data = f.read(65536)
+            if not data:
+                break
+            lines = (rest + data).split(b"\n")
+            rest = lines.pop()
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line.decode("utf-8"))
+        if rest.strip():
+            yield json.loads(rest.decode("utf-8"))
+
+    def load(self, name):
+        """Return a "json" section as object, a "jsonl" section as list."""
+        if self.index[name]["type"] == "jsonl":
+            return list(self.iter_lines(name))
+        return json.loads(self.read(name).decode("utf-8"))
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+
+if __name__ == "__main__":
+    import sys
+    with BundleReader(sys.argv[1]) as bundle:
+        if len(sys.argv) > 2:
+            for name in sys.argv[2:]:
+                print(json.dumps(bundle.load(name), indent=2))
+        else:
+            print(json.dumps(bundle.meta, indent=2))
+            for name in bundle.sections:
+                print("{name} {type} {encoding} {length}".format(**bundle.index[name]))
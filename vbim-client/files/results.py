@@ -0,0 +1,143 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Saving of the results of the VBIM client.
+
+Results are written to a temporary file and moved to the results directory
+once complete, as one file per result type or as result bundle (see
+result_bundle.py), depending on cnf_result_format.
+"""
+
+from collections import OrderedDict
+import json
+import os
+from result_bundle import BundleWriter
+from settings import CONTAINER_VERSION, TAG
+import shutil
+from tempfile import NamedTemporaryFile
+import time
+import traceback
+
+def get_filename(expconfig, postfix, ending, tstamp, interface):
+
+    return "{}_NODE.{}_INTERFACE.{}_PLAYER.{}_TIME.{}{}.{}".format(expconfig["cnf_dataid"], expconfig["nodeid"], interface, expconfig["cnf_player"], tstamp, ("_" + postfix) if postfix else "", ending)
+
+def open_output(outdir):
+    """Return a new temporary file in outdir, creating the folder if needed."""
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+        print(TAG + "save_output function is creating a new folder")
+    return NamedTemporaryFile(mode="w+", delete=False, dir=outdir)
+
+def save_output(expconfig, msg, postfix=None, ending="json", tstamp=time.time(), outdir="/monroe/results/", interface="interface"):
+    f = open_output(outdir)
+    f.write(msg)
+    f.close()
+    outfile = os.path.join(outdir, get_filename(expconfig, postfix, ending, tstamp, interface))
+    move_file(f.name, outfile)
+
+def save_bundle(expconfig, tstamp, interface, summary, console_path, ping=None, traceroute=None, metadata_segments=None, trace=None):
+    """Write all results of a session into one bundle and remove the source files."""
+    path = os.path.join(expconfig["cnf_resultdir"], get_filename(expconfig, "SESSION." + expconfig["cnf_sessionid"], "bundle", tstamp, interface))
+    meta = {"cnf_dataid": expconfig["cnf_dataid"],
+            "cnf_sessionid": expconfig["cnf_sessionid"],
+            "cnf_tag": expconfig["cnf_tag"],
+            "cnf_player": expconfig["cnf_player"],
+            "nodeid": expconfig["nodeid"],
+            "interface": interface,
+            "timestamp": tstamp}
+    with BundleWriter(path, meta=meta) as bundle:
+        bundle.add_json("SUMMARY", summary)
+        bundle.add_file("CONSOLEOUTPUT", console_path, "jsonl")
+        if ping is not None:
+            bundle.add_json("PING", ping)
+        if traceroute is not None:
+            bundle.add_json("TRACEROUTE", traceroute)
+        if metadata_segments:
+            bundle.add_files("METADATA", metadata_segments, "jsonl", compressed=expconfig["cnf_save_metadata_compress"])
+        if trace is not None:
+            bundle.add_json("TRACE", trace)
+    os.remove(console_path)
+    for segment in metadata_segments or []:
+        os.remove(segment)
+    return path
+
+def move_file(f, t):
+    try:
+        shutil.move(f, t)
+        os.chmod(t, 0o644)
+    except:
+        traceback.print_exc()
+
+def copy_file(f, t):
+    try:
+        shutil.copyfile(f, t)
+        os.chmod(t, 0o644)
+    except:
+        traceback.print_exc()
+
+def save_batch_result(expconfig, ifname, name, result):
+    """Save a result of the whole batch as BATCH.<time>_<name> file (or bundle section); return the file name."""
+    postfix = "BATCH." + result["summary_time_batch"] + "_" + name
+    tstamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime(result["time_start"]))
+    if expconfig["cnf_result_format"] == "bundle":
+        filename = get_filename(expconfig, postfix, "bundle", tstamp, ifname)
+        with BundleWriter(os.path.join(expconfig["cnf_resultdir"], filename), meta={"interface": ifname}) as bundle:
+            bundle.add_json(name, result)
+    else:
+        filename = get_filename(expconfig, postfix, "json", tstamp, ifname)
+        save_output(expconfig=expconfig, msg=json.dumps(result), postfix=postfix, tstamp=tstamp, outdir=expconfig["cnf_resultdir"], interface=ifname)
+    return filename
+
+def save_probe_campaign(expconfig, ifname, campaign):
+    """Save the campaign as PROBES file (or bundle section); return the file name."""
+    return save_batch_result(expconfig, ifname, "PROBES", campaign)
+
+def save_schedule(expconfig, ifname, schedule):
+    """Save the decisions of the adaptive scheduler as SCHEDULE file (or bundle section); return the file name."""
+    result = OrderedDict()
+    result["cnf_dataid"] = expconfig["cnf_dataid"]
+    result["monroe_nodeid"] = expconfig["nodeid"]
+    result["summary_interface"] = ifname
+    result["summary_time_batch"] = time.strftime("%Y%m%d-%H%M%S", expconfig["timestamp"])
+    result["time_start"] = schedule.time_start
+    result["time_end"] = time.time()
+    result.update(schedule.summary())
+    return save_batch_result(expconfig, ifname, "SCHEDULE", result)
+
+def save_spans(expconfig, ifname, tracer):
+    """Save the phase timings of an interface batch as SPANS file (or bundle section) and as TRACE, as requested.
+
+       Return the name of the SPANS file, or None.
+    """
+    result = OrderedDict()
+    result["cnf_dataid"] = expconfig["cnf_dataid"]
+    result["monroe_nodeid"] = expconfig["nodeid"]
+    result["summary_interface"] = ifname
+    result["summary_time_batch"] = time.strftime("%Y%m%d-%H%M%S", expconfig["timestamp"])
+    result["time_start"] = tracer.time_start
+    result["time_end"] = time.time()
+    result.update(tracer.summary())
+    filename = save_batch_result(expconfig, ifname, "SPANS", result) if expconfig["cnf_spans_report"] else None
+    if expconfig["cnf_trace_file"]:
+        trace = tracer.trace()
+        trace["summary_time_batch"] = result["summary_time_batch"]
+        trace["time_start"] = result["time_start"]
+        save_batch_result(expconfig, ifname, "TRACE", trace)
+    return filename
+
+def save_startup(expconfig, tracer):
+    """Save the startup timings of the container as STARTUP file (or bundle section); return the file name."""
+    result = OrderedDict()
+    result["cnf_dataid"] = expconfig["cnf_dataid"]
+    result["monroe_nodeid"] = expconfig["nodeid"]
+    result["summary_containerversion"] = CONTAINER_VERSION
+    result["summary_time_batch"] = time.strftime("%Y%m%d-%H%M%S", expconfig["timestamp"])
+    result["time_start"] = tracer.time_start
+    result["time_end"] = time.time()
+    result.update(tracer.summary())
+    return save_batch_result(expconfig, "all", "STARTUP", result)
@@ -0,0 +1,238 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Adaptive scheduling of the configurations of an interface batch.
+
+Before each run the state of the link is assessed from the latest modem
+metadata (DEVICEMODE, DEVICESUBMODE and the signal fields of the
+MONROE.META.DEVICE.MODEM stream) and an optional quick pre-flight ping.
+Depending on it a configuration is
+
+  - run as configured,
+  - shortened (poor link, or not enough time or data budget left for the
+    full duration),
+  - deferred to the end of the queue (no usable link); the scheduler then
+    waits for new metadata before continuing, or
+  - skipped (deferred too often, or the budgets are used up).
+
+The time budget covers the whole batch, the data budget the bytes
+transferred on the interface during the runs (see ifcounters.py). Every
+decision is recorded with the link state it was based on.
+"""
+
+from collections import deque
+from ifcounters import CounterReader, difference
+import time
+
+# DEVICEMODE values of the MONROE modem metadata
+DEVICEMODE_NAMES = {0: "unknown", 1: "no service", 2: "2G", 3: "3G", 4: "LTE", 5: "5G"}
+SIGNAL_KEYS = ["RSSI", "RSRP", "RSRQ", "RSCP", "ECIO", "SINR"]
+
+def _number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value == value else None
+
+class Scheduler(object):
+    """Yields the configurations of a batch in the order they should run.
+
+       Iterate over it instead of the configuration list; the run of a
+       configuration is measured from the time it is yielded until the next
+       one is requested. With adaptive=False the configurations are yielded
+       unchanged and in order, only the time and data used are recorded.
+
+       meta_info is the (dict-like) metadata of the interface, preflight an
+       optional function(cfg) returning a ping result and wait_for_metadata
+       a function(timeout) that returns when new metadata arrived.
+    """
+
+    def __init__(self, configurations, expconfig, ifname, meta_info, adaptive=True,
+                 preflight=None, wait_for_metadata=None, verbosity=0, tag=""):
+        self.queue = deque((index + 1, cfg, 0) for index, cfg in enumerate(configurations))
+        self.total = len(configurations)
+        self.ifname = ifname
+        self.meta_info = meta_info
+        self.adaptive = adaptive
+        self.preflight = preflight if expconfig["cnf_schedule_preflight"] else None
+        self.wait_for_metadata = wait_for_metadata
+        self.verbosity = verbosity
+        self.tag = tag
+
+        self.min_devicemode = expconfig["cnf_schedule_min_devicemode"]
+        self.poor_devicemode = expconfig["cnf_schedule_poor_devicemode"]
+        self.poor_rsrp = expconfig["cnf_schedule_poor_rsrp"]
+        self.max_loss = expconfig["cnf_schedule_preflight_max_loss"]
+        self.poor_rtt = expconfig["cnf_schedule_preflight_poor_rtt"]
+        self.shorten_factor = expconfig["cnf_schedule_shorten_factor"]
+        self.min_duration = expconfig["cnf_schedule_min_duration"]
+        self.max_deferrals = expconfig["cnf_schedule_max_deferrals"]
+        self.defer_wait = expconfig["cnf_schedule_defer_wait"]
+        self.run_overhead = expconfig["cnf_schedule_run_overhead"]
+        self.time_budget = expconfig["cnf_schedule_time_budget"]
+        self.data_budget = expconfig["cnf_schedule_data_budget"]
+
+        self.counters = CounterReader(ifname)
+        self.time_start = time.time()
+        self.bytes_used = 0
+        self.runs = []
+        self.skipped = []
+        self.started = 0
+
+    @property
+    def pending(self):
+        """Number of configurations that may still be yielded."""
+        return len(self.queue)
+
+    def log(self, msg):
+        if self.verbosity > 1:
+            print(self.tag + msg)
+
+    def link_state(self, cfg):
+        """Return the current link state of the interface and the pre-flight result for cfg."""
+        state = {"time": time.time(), "devicemode": None, "devicesubmode": None}
+        devicemode = _number(self.meta_info.get("DEVICEMODE"))
+        if devicemode is not None:
+            state["devicemode"] = int(devicemode)
+            state["devicemode_name"] = DEVICEMODE_NAMES.get(int(devicemode), str(int(devicemode)))
+        state["devicesubmode"] = self.meta_info.get("DEVICESUBMODE")
+        for key in SIGNAL_KEYS:
+            value = _number(self.meta_info.get(key))
+            if value is not None:
+                state[key.lower()] = value
+        if self.preflight is not None:
+            ping = self.preflight(cfg)
+            state["preflight_loss"] = _number(ping.get("packet_loss"))
+            state["preflight_rtt"] = _number(ping.get("avgping"))
+            state["preflight_target"] = ping.get("host")
+        return state
+
+    def assess(self, state):
+        """Return ("unusable" | "poor" | "good", reasons) for a link state."""
+        reasons = []
+        devicemode = state["devicemode"]
+        if devicemode is not None and 0 < devicemode < self.min_devicemode:
+            reasons.append("DEVICEMODE {}".format(state["devicemode_name"]))
+        loss = state.get("preflight_loss")
+        if loss is not None and loss >= self.max_loss:
+            reasons.append("pre-flight loss {:g}%".format(loss))
+        if reasons:
+            return "unusable", reasons
+
+        if devicemode is not None and 0 < devicemode < self.poor_devicemode:
+            reasons.append("DEVICEMODE {}".format(state["devicemode_name"]))
+        if state.get("rsrp") is not None and self.poor_rsrp is not None and state["rsrp"] < self.poor_rsrp:
+            reasons.append("RSRP {:g} dBm".format(state["rsrp"]))
+        rtt = state.get("preflight_rtt")
+        if rtt is not None and self.poor_rtt and rtt > self.poor_rtt:
+            reasons.append("pre-flight RTT {:.0f} ms".format(rtt))
+        return ("poor" if reasons else "good"), reasons
+
+    def data_rate(self):
+        """Return the average bytes per second of playback of the runs so far, or None."""
+        measured = [run for run in self.runs if run["bytes"] is not None and run["duration"]]
+        if not measured:
+            return None
+        return float(sum(run["bytes"] for run in measured)) / sum(run["duration"] for run in measured)
+
+    def overhead(self):
+        """Return the time a run takes in addition to its duration (probes, browser start, ...)."""
+        if not self.runs:
+            return self.run_overhead
+        return max(self.run_overhead, sum(run["elapsed"] - run["duration"] for run in self.runs) / len(self.runs))
+
+    def fit_budgets(self, duration, reasons):
+        """Return the duration that fits into the remaining budgets, or None if none does."""
+        limited = False
+        if self.time_budget:
+            remaining = self.time_budget - (time.time() - self.time_start) - self.overhead()
+            if remaining < duration:
+                duration = remaining
+                limited = True
+                reasons.append("time budget")
+        if self.data_budget:
+            rate = self.data_rate()
+            remaining = self.data_budget - self.bytes_used
+            if remaining <= 0:
+                return None
+            if rate and remaining < rate * duration:
+                duration = remaining / rate
+                limited = True
+                reasons.append("data budget")
+        if limited and duration < self.min_duration:
+            return None
+        return int(duration)
+
+    def skip(self, index, decision):
+        decision["decision"] = "skipped"
+        self.skipped.append(decision)
+        self.log("Skipping configuration {} of {} on {}: {}".format(index, self.total, self.ifname, ", ".join(decision["reasons"])))
+
+    def __iter__(self):
+        while self.queue:
+            index, cfg, deferrals = self.queue.popleft()
+            decision = {"configuration": index, "order": None, "deferrals": deferrals,
+                        "duration_configured": cfg["cnf_duration"], "duration": cfg["cnf_duration"],
+                        "decision": "run", "reasons": [], "link": None, "link_quality": None}
+            cfg = cfg.copy()
+
+            if self.adaptive:
+                state = self.link_state(cfg)
+                quality, reasons = self.assess(state)
+                decision.update({"link": state, "link_quality": quality})
+                if quality == "unusable":
+                    decision["reasons"] = reasons
+                    if deferrals >= self.max_deferrals:
+                        self.skip(index, decision)
+                        continue
+                    self.log("Deferring configuration {} of {} on {}: {}".format(index, self.total, self.ifname, ", ".join(reasons)))
+                    self.queue.append((index, cfg, deferrals + 1))
+                    # The next configuration would see the same link, wait for it to change
+                    if self.wait_for_metadata is not None:
+                        self.wait_for_metadata(self.defer_wait)
+                    continue
+
+                duration = cfg["cnf_duration"]
+                if quality == "poor":
+                    duration = min(duration, max(self.min_duration, int(duration * self.shorten_factor)))
+                    decision["reasons"].extend(reasons)
+                duration = self.fit_budgets(duration, decision["reasons"])
+                if duration is None:
+                    decision["reasons"].append("budget exhausted")
+                    self.skip(index, decision)
+                    continue
+                if duration < cfg["cnf_duration"]:
+                    decision["decision"] = "shortened"
+                    decision["duration"] = duration
+                    cfg["cnf_duration"] = duration
+                    self.log("Shortening configuration {} of {} on {} to {} s: {}".format(index, self.total, self.ifname, duration, ", ".join(decision["reasons"])))
+
+            self.started += 1
+            decision.update({"order": self.started, "time_used": time.time() - self.time_start, "bytes_used": self.bytes_used})
+            if self.adaptive:
+                cfg["summary_schedule"] = decision
+            start = self.counters.read()
+            time_run = time.time()
+            yield index, cfg
+
+            usage = difference(start, self.counters.read())
+            used = usage["rx_bytes"] + usage["tx_bytes"] if usage is not None else None
+            if used is not None:
+                self.bytes_used += used
+            self.runs.append({"configuration": index, "duration": cfg["cnf_duration"], "elapsed": time.time() - time_run, "bytes": used})
+        self.counters.close()
+
+    def summary(self):
+        """Return the budgets and what was used of them, and the skipped configurations."""
+        return {"adaptive": self.adaptive,
+                "time_budget": self.time_budget,
+                "data_budget": self.data_budget,
+                "time_used": time.time() - self.time_start,
+                "bytes_used": self.bytes_used,
+                "runs": self.runs,
+                "skipped": self.skipped}
@@ -0,0 +1,169 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Configuration of the VBIM client shared by all of its processes.
+
+EXPCONFIG holds the default values; the orchestrator (vbim.py) updates it in
+place with the configuration given by the scheduler before any other process
+is started, so the processes forked from it see the same values.
+"""
+
+import json
+from metastore import HISTORY_KEYS
+from random import shuffle
+import time
+
+CONFIGFILE = "/monroe/config"
+CONTAINER_VERSION = "v0.5"
+DEBUG = False
+TAG = "[vbim.py] "
+
+EXPCONFIG = {
+  # The following are relevant to the MONROE platform
+  "guid": "localGuid",                                                  # Should be overridden by scheduler
+  "nodeid": "localNode",                                                # Node ID
+  "ifup_interval_check": 5,                                             # Interval to check if interface is up
+  "interfaces_without_metadata": ["eth0","wlan0"],                      # Do not wait for metadata on these interfaces
+  "modeminterfacename": "InternalInterface",                            # Modem interface name
+  "modem_metadata_topic": "MONROE.META.DEVICE.MODEM",                   # Modem metadata topic string
+  "zmqport": "tcp://172.17.0.1:5556",                                   # ZeroMQ port
+  "cnf_add_modem_metadata_to_result": False,                            # Set to True to save one captured modem metadata
+  "cnf_browser_pool_enabled": False,                                    # Set to True to reuse pre-launched Chrome sessions across runs
+  "cnf_browser_pool_max_uses": 0,                                       # Number of runs a pooled session is reused for (0 = no limit)
+  "cnf_browser_pool_size": 1,                                           # Number of pre-launched Chrome sessions per interface
+  "cnf_chromedriver_path": "chromedriver",                              # ChromeDriver executable
+  "cnf_consolelog_interval": 5,                                         # Interval to drain the browser console log during playback
+  "cnf_enabled_interfaces": ["eth0","op0","op1","op2","nlw_1","nlw_2"], # Interfaces on which to run
+  "cnf_exp_grace": 10000,                                               # Grace period before killing experiment
+  "cnf_disabled_interfaces": ["lo","metadata","eth2","wlan0",           # Interfaces to NOT run on
+                                 "wwan0","wwan1","wwan2","docker0"],
+  "cnf_meta_grace": 120,                                                # Grace period to wait for interface metadata
+  "cnf_meta_history_keys": HISTORY_KEYS,                                # Modem metadata keys whose changes are recorded during a run
+  "cnf_parallel_interfaces": False,                                     # Set to True to run the batches of all interfaces concurrently
+  "cnf_parallel_max_interfaces": 0,                                     # Maximum number of interfaces running at the same time (0 = no limit)
+  "cnf_parallel_synchronized": False,                                   # If parallel, start the same configuration on all interfaces at the same time
+  "cnf_parallel_sync_timeout": 300,                                     # If synchronized, maximum time to wait for the other interfaces before starting anyway
+  "cnf_save_metadata_compress": True,                                   # Whether or not to gzip the saved metadata stream
+  "cnf_save_metadata_flush_interval": 10,                               # Maximum time saved metadata is buffered in memory
+  "cnf_save_metadata_flush_size": 65536,                                # Maximum number of bytes of saved metadata buffered in memory
+  "cnf_save_metadata_resultdir": "/monroe/tmp/metadata",                # Set to a directory to enable saving the metadata stream
+  "cnf_save_metadata_segment_size": 4194304,                            # Size after which a new metadata file is started
+  "cnf_save_metadata_topic": "MONROE.META",                             # Metadata topic to be saved as a complete stream, e.g., "MONROE.META.DEVICE.MODEM"
+
+  # The following are relevant to Bitmovin Analytics
+  "cnf_cdnprovider": "testCdnProvider",                                 # CDN provider string
+  "cnf_customdata1": "testCustomData1",                                 # Custom data string (1)
+  "cnf_customdata2": "testCustomData2",                                 # Custom data string (2)
+  "cnf_customdata3": "testCustomData3",                                 # Custom data string (3)
+  "cnf_customdata4": "testCustomData4",                                 # Custom data string (4)
+  "cnf_customdata5": "testCustomData5",                                 # Custom data string (5)
+  "cnf_experimentname": "testExperimentName",                           # Experiment name string
+  "cnf_sessionid": "testSessionId",                                     # Session ID string
+  "cnf_title": "testTitle",                                             # Title string
+  "cnf_userid": "testUserId",                                           # User ID string
+  "cnf_videoid": "testVideoId",                                         # Video ID string
+
+  # The following are generic parameters
+  "cnf_abr": "abrDynamic",                                              # ABR algorithm string
+  "cnf_asn_cache_file": "/monroe/tmp/asn_cache.json",                   # File to persist ASN lookups across runs ("" = memory only)
+  "cnf_asn_cache_ttl": 604800,                                          # Time an ASN lookup is kept in the cache file
+  "cnf_asn_lookup_workers": 4,                                          # Number of concurrent ASN lookups per traceroute
+  "cnf_asn_prefix_table": "",                                           # Prefix to ASN table (e.g., a pfx2as snapshot) resolved without DNS
+  "cnf_data_usage_sample_interval": 0,                                  # Interval to sample the interface counters during playback (0 = per phase only)
+  "cnf_dataid": "MONROE.EXP.VBIM",                                      # Identifier of experiment type
+  "cnf_dns_cache": False,                                               # Whether or not to resolve the hosts of the batch once per interface and probe the resolved addresses
+  "cnf_dns_pin_browser": False,                                         # Whether or not to make Chrome use the same addresses (--host-resolver-rules)
+  "cnf_dns_timeout": 5,                                                 # Timeout for resolving a host
+  "cnf_duration": 60,                                                   # Streaming duration
+  "cnf_player": "bitmovin",                                             # Video player string
+  "cnf_multiconfig_enabled": True,                                      # Whether or not multiple configuration is enabled
+  "cnf_multiconfig_randomize": True,                                    # If enabled, whether or not to randomize the order of multiple configurations
+  "cnf_multiconfig": [{"cnf_player": "bitmovin",                        # Multiple configurations as a JSON array
+  "cnf_ping_target": "cdn.bitmovin.com"}, 
+  {"cnf_player": "dashjs","cnf_abr": "abrBola", 
+  "cnf_ping_target": "cdnjs.cloudflare.com"}, 
+  {"cnf_player": "dashjs","cnf_abr": "abrDynamic", 
+  "cnf_ping_target": "cdnjs.cloudflare.com"}, 
+  {"cnf_player": "dashjs","cnf_abr": "abrThroughput", 
+  "cnf_ping_target": "cdnjs.cloudflare.com"}, 
+  {"cnf_player": "shaka", "cnf_ping_target": "cdnjs.cloudflare.com"}],
+  "cnf_playback_monitor": False,                                        # Set to True to watch the player state instead of sleeping for the whole duration
+  "cnf_playback_poll_interval": 1,                                      # Interval to poll the player state
+  "cnf_playback_stall_timeout": 0,                                      # End the run if a single stall lasts longer than this (0 = disabled)
+  "cnf_playback_startup_timeout": 0,                                    # End the run if playback did not start within this time (0 = disabled)
+  "cnf_playback_target_played": 0,                                      # End the run once this much media (in seconds) has been played (0 = disabled)
+  "cnf_ping_count": 11,                                                 # Number of pings
+  "cnf_ping_skip": False,                                               # Whether or not to skip ping
+  "cnf_ping_target": "orf.at",                                          # Ping target, examples: "orf.at", "194.232.104.149"
+  "cnf_ping_timeout": 2,                                                # Timeout setting for ping
+  "cnf_probe_campaign": False,                                          # Whether or not to probe all targets of the batch once per interface before the runs
+  "cnf_probe_campaign_workers": 4,                                      # Maximum number of concurrent ping/traceroute processes of the probe campaign
+  "cnf_probe_schedule": ["before"],                                     # When to run ping/traceroute: any of "before", "during", "after" the playback
+  "cnf_probe_targets": ["cdn.bitmovin.com", "cdnjs.cloudflare.com"],    # Additional targets to ping and traceroute in the probe campaign
+  "cnf_qoe_events": True,                                               # Whether or not to extract QoE events and KPIs from the console log into the summary
+  "cnf_resources_sample_interval": 0,                                   # Interval to sample CPU and memory of the experiment process tree and Chrome (0 = disabled)
+  "cnf_resources_saturation": 90,                                       # Node CPU utilization (%) above which a sample counts as CPU saturated
+  "cnf_result_format": "files",                                         # "files" for one file per result type, "bundle" for a single file per session (see result_bundle.py)
+  "cnf_resultdir": "/monroe/results/",                                  # Directory for saving results
+  "cnf_schedule_adaptive": False,                                       # Set to True to defer, shorten or skip configurations depending on the link state and budgets
+  "cnf_schedule_data_budget": 0,                                        # Maximum number of bytes transferred on the interface by the runs of a batch (0 = no limit)
+  "cnf_schedule_defer_wait": 60,                                        # Maximum time to wait for new metadata after deferring a configuration
+  "cnf_schedule_max_deferrals": 2,                                      # Number of times a configuration is deferred before it is skipped
+  "cnf_schedule_min_devicemode": 3,                                     # Defer runs while DEVICEMODE is below this (1 = no service, 2 = 2G, 3 = 3G, 4 = LTE)
+  "cnf_schedule_min_duration": 20,                                      # Shortest duration a configuration is shortened to
+  "cnf_schedule_poor_devicemode": 4,                                    # Shorten runs while DEVICEMODE is below this
+  "cnf_schedule_poor_rsrp": -110,                                       # Shorten runs while RSRP (dBm) is below this (None = ignore)
+  "cnf_schedule_preflight": True,                                       # If adaptive, whether or not to ping the ping target before each run
+  "cnf_schedule_preflight_count": 3,                                    # Number of pre-flight pings
+  "cnf_schedule_preflight_max_loss": 100,                               # Defer runs if the pre-flight packet loss (%) is at least this
+  "cnf_schedule_preflight_poor_rtt": 1000,                              # Shorten runs if the pre-flight average RTT (ms) is above this (0 = ignore)
+  "cnf_schedule_run_overhead": 30,                                      # Expected time a run takes in addition to its duration, until measured
+  "cnf_schedule_shorten_factor": 0.5,                                   # Factor the duration of a configuration is shortened by on a poor link
+  "cnf_schedule_time_budget": 0,                                        # Maximum time of the runs of a batch (0 = no limit)
+  "cnf_spans_report": False,                                            # Whether or not to save the phase timings of each interface batch as SPANS file
+  "cnf_startup_report": False,                                          # Whether or not to save the startup timings (interpreter, imports, initialization) of the container as STARTUP file
+  "cnf_stub": "",                                                       # URL stub for landing page
+  "cnf_tag": None,                                                      # Tag string for measurement
+  "cnf_time_between_runs": 5,                                           # Time to wait between different runs
+  "cnf_tmpdir": "/monroe/tmp",                                          # Directory for files that are still being written
+  "cnf_trace_file": False,                                              # Whether or not to also save the phase timings of runs and interfaces as Chrome trace (chrome://tracing, Perfetto)
+  "cnf_traceroute_skip": True,                                          # Whether or not to skip traceroute
+  "cnf_traceroute_target": "orf.at",                                    # Traceroute target
+  "cnf_verbosity": 3,                                                   # Verbosity level: 0=mute, 1=error, 2=information, 3=verbose
+  "timestamp": time.gmtime()                                            # Timestamp for the measurement (batch)
+}
+
+def load_config(expconfig, path=CONFIGFILE):
+    """Update expconfig with the configuration file of the scheduler, if there is one."""
+    try:
+        with open(path) as configfd:
+            expconfig.update(json.load(configfd))
+    except Exception as e:
+        print(TAG + "Cannot retrive expconfig {}".format(e))
+        # raise e
+        print(TAG + "Continuing with default configuration parameters")
+
+def get_config_combinations(expconfig):
+
+    if "cnf_multiconfig" not in expconfig or not expconfig["cnf_multiconfig_enabled"]:
+        expconfig.update({"summary_number_of_configurations":1})
+        yield expconfig.copy()
+        return
+
+    configurations = expconfig["cnf_multiconfig"]
+    
+    if type(configurations) is list:
+        do_rand = expconfig["cnf_multiconfig_randomize"] if "cnf_multiconfig_randomize" in expconfig else False
+        if do_rand:
+            shuffle(configurations)
+
+    expconfig.update({"summary_number_of_configurations":len(configurations)})
+
+    for configuration in configurations:
+        out = expconfig.copy()
+        out.update(configuration)
+        yield out
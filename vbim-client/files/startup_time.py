@@ -0,0 +1,134 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Startup time of the VBIM client.
+
+The start latency of the container is charged against the scheduled slot of
+the experiment. The orchestrator (vbim.py) records as startup spans the time
+from the start of the interpreter to its first line, its imports and its
+initialization until the first interface batch starts; they are printed with
+cnf_verbosity > 1 and saved as STARTUP file with cnf_startup_report.
+
+Run directly, the import cost of every role of the client is measured in
+fresh interpreters: importing its module, and then the modules it loads
+lazily (its preload()), e.g.
+
+    python /opt/monroe/startup_time.py --repeat 5
+"""
+
+import argparse
+from collections import OrderedDict
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROLES = OrderedDict([("orchestrator", "vbim"),
+                     ("metadata subscriber", "metadata_subscriber"),
+                     ("experiment worker", "experiment_worker"),
+                     ("probe runner", "probe_runner")])
+
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {directory!r})
+modules = len(sys.modules)
+time_start = time.time()
+import {module} as role
+time_imported = time.time()
+imported = len(sys.modules)
+error = None
+try:
+    role.preload()
+except Exception as e:
+    error = "{{}}: {{}}".format(type(e).__name__, e)
+time_preloaded = time.time()
+sys.stdout.write(json.dumps({{"import": time_imported - time_start, "preload": time_preloaded - time_imported,
+                              "modules_import": imported - modules, "modules_preload": len(sys.modules) - imported,
+                              "error": error}}) + "\\n")
+"""
+
+def process_age():
+    """Return the seconds since this process was started (from /proc), None if unknown."""
+    try:
+        with open("/proc/self/stat") as f:
+            # The command name may contain spaces, the fields after it do not
+            start_ticks = float(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (IOError, OSError, ValueError, IndexError):
+        return None
+
+def measure_interpreter(python):
+    """Return the seconds an interpreter takes to start and exit."""
+    time_start = time.time()
+    subprocess.check_call([python, "-c", "pass"])
+    return time.time() - time_start
+
+def measure_role(module, python, directory):
+    """Return the import cost of a role module and of its lazily loaded modules in a fresh interpreter."""
+    time_start = time.time()
+    p = subprocess.Popen([python, "-c", CHILD.format(directory=directory, module=module)],
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = p.communicate()
+    total = time.time() - time_start
+    if p.returncode != 0:
+        lines = err.decode("utf-8", "replace").strip().split("\n")
+        return {"error": lines[-1], "total": total}
+    result = json.loads(out.decode("utf-8").strip().split("\n")[-1])
+    result["total"] = total
+    return result
+
+def median(values):
+    values = sorted(values)
+    if not values:
+        return None
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2.0
+
+def measure(repeat=5, python=sys.executable, directory=os.path.dirname(os.path.abspath(__file__))):
+    """Return the median interpreter start and per role import costs of repeat measurements."""
+    report = OrderedDict()
+    report["python"] = python
+    report["repeat"] = repeat
+    report["interpreter"] = median([measure_interpreter(python) for i in range(repeat)])
+    report["roles"] = OrderedDict()
+    for role, module in ROLES.items():
+        results = [measure_role(module, python, directory) for i in range(repeat)]
+        entry = OrderedDict([("module", module)])
+        errors = [result["error"] for result in results if result.get("error")]
+        for key in ("import", "preload", "total", "modules_import", "modules_preload"):
+            entry[key] = median([result[key] for result in results if key in result])
+        entry["error"] = errors[0] if errors else None
+        report["roles"][role] = entry
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=5, help="measurements per role (the median is reported)")
+    parser.add_argument("--python", default=sys.executable, help="interpreter to measure")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = measure(args.repeat, args.python)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    def ms(seconds):
+        return "{:.1f}".format(seconds * 1000) if seconds is not None else "-"
+
+    print("Interpreter start: {} ms".format(ms(report["interpreter"])))
+    print("{:22s} {:>10s} {:>8s} {:>11s} {:>8s} {:>9s}".format("role", "import ms", "modules", "preload ms", "modules", "total ms"))
+    for role, entry in report["roles"].items():
+        print("{:22s} {:>10s} {:>8s} {:>11s} {:>8s} {:>9s}{}".format(
+            role, ms(entry["import"]), str(entry["modules_import"]), ms(entry["preload"]), str(entry["modules_preload"]),
+            ms(entry["total"]), ("  " + entry["error"]) if entry["error"] else ""))
+
+if __name__ == "__main__":
+    main()
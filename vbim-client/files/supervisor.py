@@ -0,0 +1,131 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Event sources for the supervision of the experiment processes.
+
+Instead of sleeping between checks, the orchestrator waits with select() on
+file descriptors that become readable when something happens: an experiment
+process exited (ExitWatch), the link or addresses of an interface changed
+(LinkMonitor, a netlink socket) or new metadata arrived
+(SharedMetaState.fileno()).
+"""
+
+import errno
+import fcntl
+import os
+import select
+import socket
+import struct
+
+NETLINK_ROUTE = 0
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+RTM_NEWLINK, RTM_DELLINK, RTM_NEWADDR, RTM_DELADDR = 16, 17, 20, 21
+NLMSGHDR = struct.Struct("=IHHII")
+IFINFOMSG = struct.Struct("=BBHiII")
+IFADDRMSG = struct.Struct("=BBBBI")
+
+def set_cloexec(fd):
+    fcntl.fcntl(fd, fcntl.F_SETFD, fcntl.fcntl(fd, fcntl.F_GETFD) | fcntl.FD_CLOEXEC)
+
+class ExitWatch(object):
+    """Starts a multiprocessing.Process; fileno() becomes readable when it exits.
+
+       Uses the process sentinel where available (Python 3), else a pipe
+       whose write end only the child holds. The write end is close-on-exec,
+       so programs started by the child do not keep it open.
+    """
+
+    def __init__(self, process):
+        self.process = process
+        self._fd = None
+        if hasattr(type(process), "sentinel"):
+            process.start()
+            return
+        r, w = os.pipe()
+        set_cloexec(r)
+        set_cloexec(w)
+        try:
+            process.start()
+        finally:
+            os.close(w)
+        self._fd = r
+
+    def fileno(self):
+        return self._fd if self._fd is not None else self.process.sentinel
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+class LinkMonitor(object):
+    """Netlink socket reporting link and address changes; available is False if it cannot be opened."""
+
+    def __init__(self):
+        self.sock = None
+        try:
+            self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+            self.sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR))
+            self.sock.setblocking(False)
+        except (AttributeError, socket.error):
+            if self.sock is not None:
+                self.sock.close()
+            self.sock = None
+
+    @property
+    def available(self):
+        return self.sock is not None
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def drain(self):
+        """Read the pending messages; return the indices of the interfaces they concern."""
+        indices = set()
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except socket.error as e:
+                if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return indices
+                raise
+            offset = 0
+            while offset + NLMSGHDR.size <= len(data):
+                length, msg_type = NLMSGHDR.unpack_from(data, offset)[:2]
+                if length < NLMSGHDR.size:
+                    break
+                body = offset + NLMSGHDR.size
+                if msg_type in (RTM_NEWLINK, RTM_DELLINK) and body + IFINFOMSG.size <= len(data):
+                    indices.add(IFINFOMSG.unpack_from(data, body)[3])
+                elif msg_type in (RTM_NEWADDR, RTM_DELADDR) and body + IFADDRMSG.size <= len(data):
+                    indices.add(IFADDRMSG.unpack_from(data, body)[4])
+                offset += (length + 3) & ~3
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+def get_ifindex(ifname):
+    try:
+        with open("/sys/class/net/{}/ifindex".format(ifname)) as f:
+            return int(f.read())
+    except (IOError, OSError, ValueError):
+        return None
+
+def wait(sources, timeout):
+    """Wait up to timeout seconds for any of sources (objects with fileno()); return the readable ones."""
+    sources = [source for source in sources if source is not None]
+    try:
+        readable = select.select(sources, [], [], max(0, timeout))[0]
+    except (select.error, OSError) as e:
+        if e.args[0] != errno.EINTR:
+            raise
+        return []
+    return readable
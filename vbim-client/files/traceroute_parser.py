@@ -7,13 +7,13 @@
 # Developed for use by the EU H2020 MONROE project
 
 import re
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 
 try:
-    from asn_lookup import get_asn
+    from asn_lookup import get_asns
 except Exception as e:
-    def get_asn(ip):
-        return None
+    def get_asns(ips):
+        return {}
 
 HEADER_RE = re.compile(r'^traceroute to (?P<target>\S+?)\s*(?:\((?P<target_ip>\S+)\))?[\s,]+' +
     '(?P<hops_max>\d+)\s+hops max[\s,]+(?P<pkt_size>\d+)\sbyte packets')
@@ -22,7 +22,157 @@ HOP_RE = re.compile(r'^\s*(?P<hop>\d+)\s+(?P<probes>.*)$', re.MULTILINE)
 
 PROBE_RE = re.compile(r'(?:(?P<name>[^\s*]+)?\s+)?(?:\(\s*(?P<ip>[^\s]+)\s*\)\s+)?(?:\[(?P<asn>[^\s]+)\]\s+)?(?:(?P<rtt>[\d.]+?)\s+ms(?:\s+(?P<annotation>![^\s]*))?|\s*(?P<star>\*)\s*)')
 
-def parse_traceroute(data, asnlookup=True):
+# One probe of a hop; rtt is None for a "*"
+Probe = namedtuple('Probe', ['name', 'ip', 'asn', 'rtt', 'annotation'])
+
+class Hop(object):
+    """A hop number and its probes (a list of Probe tuples)."""
+    __slots__ = ('hop', 'probes')
+
+    def __init__(self, hop, probes):
+        self.hop = hop
+        self.probes = probes
+
+    def to_dict(self):
+        hop = OrderedDict()
+        hop['hop'] = self.hop
+        hop['probes'] = [OrderedDict(zip(Probe._fields, probe)) for probe in self.probes]
+        return hop
+
+def parse_hop(line):
+    """Parse one hop line in a single pass over its tokens; return a Hop or None.
+
+       Like the regular expressions, name, ip and asn carry over from one
+       probe of a hop to the next.
+    """
+    tokens = line.split()
+    if not tokens or not tokens[0].isdigit():
+        return None
+    probes = []
+    name = None
+    ip = None
+    asn = None
+    i = 1
+    n = len(tokens)
+    while i < n:
+        token = tokens[i]
+        i += 1
+        if token == '*':
+            probes.append(Probe(name, ip, asn, None, None))
+        elif token[0] == '(' and token[-1] == ')':
+            ip = token[1:-1]
+        elif token[0] == '[' and token[-1] == ']':
+            asn = token[1:-1]
+            if asn == '*':
+                asn = None
+        elif i < n and tokens[i] == 'ms':
+            try:
+                rtt = float(token)
+            except ValueError:
+                name = token
+                continue
+            i += 1
+            annotation = None
+            if i < n and tokens[i][0] == '!':
+                annotation = tokens[i]
+                i += 1
+            probes.append(Probe(name, ip, asn, rtt, annotation))
+        else:
+            name = token
+    return Hop(int(tokens[0]), probes)
+
+def parse_header(line):
+    m = HEADER_RE.match(line)
+    if not m:
+        return None
+    result = OrderedDict()
+    result['target'] = m.group('target')
+    result['target_ip'] = m.group('target_ip')
+    result['hops_max'] = m.group('hops_max')
+    result['pkt_size'] = m.group('pkt_size')
+    return result
+
+def iter_hops(lines):
+    """Yield the header dict (or None) first, then a Hop per hop line of lines as they are read."""
+    lines = iter(lines)
+    header = None
+    for line in lines:
+        if not isinstance(line, str):
+            line = line.decode('ascii', 'replace')
+        header = parse_header(line)
+        if header is not None:
+            break
+    yield header
+    if header is None:
+        return
+    for line in lines:
+        if not isinstance(line, str):
+            line = line.decode('ascii', 'replace')
+        hop = parse_hop(line)
+        if hop is not None:
+            yield hop
+
+def lookup_asns(hops, resolver=None):
+    """Fill in missing ASNs of the probes in hops, looked up once per unique IP."""
+    ips = set(probe.ip for hop in hops for probe in hop.probes if probe.ip and not probe.asn)
+    if not ips:
+        return
+    asns = resolver.get_asns(ips) if resolver else get_asns(ips)
+    for hop in hops:
+        for i, probe in enumerate(hop.probes):
+            if probe.ip and not probe.asn and asns.get(probe.ip):
+                hop.probes[i] = probe._replace(asn="AS" + asns[probe.ip])
+
+def parse_lines(lines, asnlookup=True, resolver=None, on_hop=None, keep_raw=False):
+    """Parse traceroute output from lines (an iterable of str or bytes).
+
+       on_hop is called with every Hop as soon as its line was read. Returns
+       the same structure as parse_traceroute, with the complete output as
+       'raw' if keep_raw is set, or None if there is no traceroute header.
+    """
+    raw = []
+    if keep_raw:
+        def recorded(lines):
+            for line in lines:
+                if not isinstance(line, str):
+                    line = line.decode('ascii', 'replace')
+                raw.append(line)
+                yield line
+        lines = recorded(lines)
+    hops = iter_hops(lines)
+    result = next(hops)
+    if result is None:
+        return None
+    parsed = []
+    for hop in hops:
+        parsed.append(hop)
+        if on_hop is not None:
+            on_hop(hop)
+    if asnlookup:
+        lookup_asns(parsed, resolver)
+    result['hops'] = [hop.to_dict() for hop in parsed]
+    if keep_raw:
+        result['raw'] = ''.join(raw)
+    return result
+
+def parse_stream(stream, asnlookup=True, resolver=None, on_hop=None, keep_raw=True):
+    """Like parse_lines, but reads stream (e.g. the stdout of a traceroute
+       subprocess) line by line as the hops arrive."""
+    def lines():
+        while True:
+            line = stream.readline()
+            if not line:
+                return
+            yield line
+    return parse_lines(lines(), asnlookup, resolver, on_hop, keep_raw)
+
+def parse_traceroute(data, asnlookup=True, resolver=None):
+    """Parse traceroute output; missing ASNs are looked up once per unique IP,
+       with resolver (an asn_lookup.AsnResolver) or the default one."""
+    return parse_lines(data.splitlines(), asnlookup, resolver)
+
+def parse_traceroute_regex(data, asnlookup=True, resolver=None):
+    """Regular expression based parser, kept as reference for parse_lines."""
     m = HEADER_RE.match(data)
     if not m:
         return None
@@ -32,6 +182,7 @@ def parse_traceroute(data, asnlookup=True):
     result['hops_max'] = m.group('hops_max')
     result['pkt_size'] = m.group('pkt_size')
     result['hops'] = []
+    lookup = []
     for m in HOP_RE.finditer(data):
         probes = []
         name = None
@@ -46,10 +197,6 @@ def parse_traceroute(data, asnlookup=True):
                 asn = p.group('asn')
                 if asn == '*':
                     asn = None
-            if asnlookup and ip and not asn:
-                asn = get_asn(ip)
-                if asn:
-                    asn = "AS" + asn
             rtt = p.group('rtt')
             try:
                 rtt = float(rtt)
@@ -62,10 +209,19 @@ def parse_traceroute(data, asnlookup=True):
             probe['rtt'] = rtt
             probe['annotation'] = p.group('annotation')
             probes.append(probe)
+            if asnlookup and ip and not asn:
+                lookup.append(probe)
         hop = OrderedDict()
         hop['hop'] = int(m.group('hop'))
         hop['probes'] = probes
         result['hops'].append(hop)
+    if lookup:
+        ips = [probe['ip'] for probe in lookup]
+        asns = resolver.get_asns(ips) if resolver else get_asns(ips)
+        for probe in lookup:
+            asn = asns.get(probe['ip'])
+            if asn:
+                probe['asn'] = "AS" + asn
     return result
 
 if __name__ == '__main__':
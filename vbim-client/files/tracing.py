@@ -0,0 +1,223 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Nested timing spans of the phases of runs and interface batches.
+
+A Tracer records named spans on a monotonic clock (CLOCK_MONOTONIC, also on
+Python 2), nested per thread:
+
+    tracer = Tracer("run", verbosity, TAG)
+    with tracer.span("page_load"):
+        driver.get(url)
+
+summary() returns the spans (start relative to the tracer, duration and
+parent) for a SUMMARY, trace() the same spans as Chrome trace events that
+chrome://tracing or https://ui.perfetto.dev show as timeline. The clock is
+shared by all processes of a node, so the traces of the orchestrator and of
+its runs line up once merged, e.g.
+
+    ./tracing.py trace.json results/*_TRACE.json results/*.bundle
+"""
+
+from collections import OrderedDict
+import json
+import os
+import threading
+import time
+
+def _monotonic_clock():
+    """Return (name, function) of the best clock available."""
+    if hasattr(time, "monotonic"):
+        return "monotonic", time.monotonic
+    try:
+        import ctypes
+        import ctypes.util
+
+        class timespec(ctypes.Structure):
+            _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+        librt = ctypes.CDLL(ctypes.util.find_library("rt") or "librt.so.1", use_errno=True)
+        clock_gettime = librt.clock_gettime
+        clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+        CLOCK_MONOTONIC = 1
+        ts = timespec()
+
+        def monotonic():
+            # A private timespec per call keeps it thread safe
+            ts = timespec()
+            if clock_gettime(CLOCK_MONOTONIC, ctypes.pointer(ts)) != 0:
+                raise OSError(ctypes.get_errno(), "clock_gettime failed")
+            return ts.tv_sec + ts.tv_nsec * 1e-9
+
+        if clock_gettime(CLOCK_MONOTONIC, ctypes.pointer(ts)) == 0:
+            return "monotonic", monotonic
+    except Exception:
+        pass
+    return "time", time.time
+
+CLOCK_NAME, clock = _monotonic_clock()
+
+class Span(object):
+    """Context manager of one span; an exception leaving it is recorded as its error."""
+    __slots__ = ("tracer", "name", "args", "index")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.index = None
+
+    def __enter__(self):
+        self.index = self.tracer.begin(self.name, **self.args)
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is not None:
+            self.tracer.end(self.index, error=exc_type.__name__)
+        else:
+            self.tracer.end(self.index)
+        return False
+
+class Tracer(object):
+    """Records the spans of one process (a run or an interface batch).
+
+       Finished spans are printed with verbosity > 1 (top level spans) or
+       > 2 (all spans).
+    """
+
+    def __init__(self, name, verbosity=0, tag=""):
+        self.name = name
+        self.verbosity = verbosity
+        self.tag = tag
+        self.pid = os.getpid()
+        self.time_start = time.time()
+        self.clock_start = clock()
+        # [name, start, end, depth, parent, thread, args]
+        self.records = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name, **args):
+        return Span(self, name, args)
+
+    def begin(self, name, **args):
+        """Start a span; return its index for end()."""
+        stack = self._stack()
+        with self._lock:
+            index = len(self.records)
+            self.records.append([name, clock(), None, len(stack), stack[-1] if stack else None,
+                                 threading.current_thread().ident, args])
+        stack.append(index)
+        return index
+
+    def end(self, index, **args):
+        record = self.records[index]
+        record[2] = clock()
+        record[6].update(args)
+        stack = self._stack()
+        # Spans started inside and not ended end here as well
+        if index in stack:
+            del stack[stack.index(index):]
+        self._log(record[0], record[1], record[2], record[3])
+        return record[2] - record[1]
+
+    def record(self, name, start, end=None, **args):
+        """Add a span measured by the caller (start and end are clock() values); return its end."""
+        if end is None:
+            end = clock()
+        stack = self._stack()
+        with self._lock:
+            self.records.append([name, start, end, len(stack), stack[-1] if stack else None,
+                                 threading.current_thread().ident, args])
+        self._log(name, start, end, len(stack))
+        return end
+
+    def _log(self, name, start, end, depth):
+        if self.verbosity > (1 if depth == 0 else 2):
+            print(self.tag + "{}{} {} took {:.3f} s".format("  " * depth, self.name, name, end - start))
+
+    def summary(self):
+        """Return the spans, with start times in seconds since the tracer was created, and the total time per name."""
+        spans = []
+        totals = OrderedDict()
+        for name, start, end, depth, parent, thread, args in self.records:
+            span = OrderedDict([("name", name),
+                                ("start", round(start - self.clock_start, 6)),
+                                ("duration", round(end - start, 6) if end is not None else None),
+                                ("depth", depth),
+                                ("parent", parent)])
+            if args:
+                span["args"] = args
+            spans.append(span)
+            if end is not None:
+                totals[name] = round(totals.get(name, 0.0) + end - start, 6)
+        return OrderedDict([("name", self.name),
+                            ("clock", CLOCK_NAME),
+                            ("time_start", self.time_start),
+                            ("duration", round(clock() - self.clock_start, 6)),
+                            ("spans", spans),
+                            ("totals", totals)])
+
+    def trace_events(self):
+        """Return the spans as Chrome trace events ("X" events in microseconds of the clock)."""
+        events = [{"name": "process_name", "ph": "M", "pid": self.pid, "tid": 0,
+                   "args": {"name": "{} {}".format(self.name, self.pid)}}]
+        now = clock()
+        for name, start, end, depth, parent, thread, args in self.records:
+            event = {"name": name, "cat": self.name, "ph": "X", "pid": self.pid, "tid": thread,
+                     "ts": int(start * 1e6), "dur": int(((end if end is not None else now) - start) * 1e6)}
+            if args:
+                event["args"] = args
+            events.append(event)
+        return events
+
+    def trace(self):
+        """Return a Chrome trace (JSON object format) of the spans."""
+        return OrderedDict([("traceEvents", self.trace_events()),
+                            ("displayTimeUnit", "ms"),
+                            ("otherData", {"name": self.name, "clock": CLOCK_NAME, "time_start": self.time_start,
+                                           "clock_start": self.clock_start})])
+
+def load_trace_events(path):
+    """Return the trace events of a trace file or of the TRACE section of a result bundle."""
+    if path.endswith(".bundle"):
+        from result_bundle import BundleReader
+        with BundleReader(path) as bundle:
+            if "TRACE" not in bundle:
+                return []
+            trace = bundle.load("TRACE")
+    else:
+        with open(path) as f:
+            trace = json.load(f)
+    return trace["traceEvents"] if isinstance(trace, dict) else trace
+
+def main():
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("output", help="merged Chrome trace file")
+    parser.add_argument("files", nargs="+", help="trace files (.json) or result bundles")
+    args = parser.parse_args()
+
+    events = []
+    for path in args.files:
+        try:
+            events.extend(load_trace_events(path))
+        except (IOError, OSError, ValueError, KeyError) as e:
+            sys.stderr.write("Skipping {}: {}\n".format(path, e))
+    with open(args.output, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "files"))
+try:
+    from asn_lookup import AsnResolver
+except ImportError:
+    AsnResolver = None
+
+class FakeQuery(object):
+    """Answers from asns (ip -> asn or None), fails for all other addresses."""
+
+    def __init__(self, asns):
+        self.asns = asns
+        self.queries = []
+
+    def __call__(self, ip):
+        self.queries.append(ip)
+        if ip not in self.asns:
+            raise IOError("timeout")
+        return self.asns[ip]
+
+@unittest.skipIf(AsnResolver is None, "dnspython or IPy is not installed")
+class AsnResolverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="vbim-test-")
+        self.cache_file = os.path.join(self.directory, "asn_cache.json")
+        self.query = FakeQuery({"8.8.8.8": "15169", "192.0.0.1": None})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def resolver(self):
+        return AsnResolver(cache_file=self.cache_file, query=self.query)
+
+    def test_failed_lookups_are_not_cached(self):
+        resolver = self.resolver()
+        self.assertEqual(resolver.get_asns(["8.8.8.8", "192.0.0.1", "9.9.9.9"]),
+                         {"8.8.8.8": "15169", "192.0.0.1": None, "9.9.9.9": None})
+        resolver.save()
+        self.assertEqual(sorted(self.resolver().disk), ["192.0.0.1", "8.8.8.8"])
+        self.assertIsNone(resolver.get_asn("9.9.9.9"))
+        self.assertEqual(self.query.queries.count("9.9.9.9"), 2)
+
+    def test_refresh_adds_the_lookups_of_other_processes(self):
+        resolver = self.resolver()
+        other = self.resolver()
+        other.get_asn("8.8.8.8")
+        other.save()
+        resolver.refresh()
+        self.assertEqual(resolver.get_asn("8.8.8.8"), "15169")
+        self.assertEqual(self.query.queries, ["8.8.8.8"])
+
+if __name__ == "__main__":
+    unittest.main()
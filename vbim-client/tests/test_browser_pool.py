@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "files"))
+try:
+    import browser_pool
+except ImportError:
+    browser_pool = None
+
+class FakeConnection(object):
+    """Like the Chrome remote connection of Selenium 3: only registered commands can be executed."""
+
+    def __init__(self):
+        self._commands = {"getCurrentUrl": ("GET", "/session/$sessionId/url")}
+
+class FakeProcess(object):
+    pid = 1
+
+    def poll(self):
+        return None
+
+class FakeService(object):
+    service_url = "http://127.0.0.1:9515"
+    process = FakeProcess()
+
+    def stop(self):
+        pass
+
+class FakeDriver(object):
+    session_id = "session"
+    capabilities = {}
+    w3c = False
+    current_url = "https://example.net/dashjs/index.php"
+
+    def __init__(self):
+        self.command_executor = FakeConnection()
+        self.executed = []
+
+    def execute(self, command, params=None):
+        # Selenium 3 looks the command up and fails for unknown ones
+        self.command_executor._commands[command]
+        self.executed.append(params["cmd"])
+        return {}
+
+    def execute_script(self, script):
+        return 1
+
+    def get(self, url):
+        self.current_url = url
+
+    def get_log(self, kind):
+        return []
+
+    def quit(self):
+        pass
+
+def fake_session():
+    session = browser_pool.BrowserSession.__new__(browser_pool.BrowserSession)
+    session.profile_dir = "/nonexistent/vbim-chrome-test"
+    session.uses = 0
+    session.service = FakeService()
+    session.driver = FakeDriver()
+    session.startup_latency = 0.0
+    return session
+
+@unittest.skipIf(browser_pool is None, "selenium is not installed")
+class BrowserPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.launched = []
+        self.pool = browser_pool.BrowserPool(size=1, options_factory=None, desired_capabilities={}, max_uses=0)
+        self.pool._launch = self.launch
+
+    def launch(self):
+        session = fake_session()
+        self.launched.append(session)
+        return session
+
+    def test_reset_clears_the_session_state(self):
+        session = fake_session()
+        self.assertTrue(session.reset())
+        self.assertEqual(session.driver.executed, ["Network.clearBrowserCache", "Network.clearBrowserCookies",
+                                                   "Storage.clearDataForOrigin"])
+        self.assertEqual(session.driver.current_url, "about:blank")
+
+    def test_released_session_is_acquired_again(self):
+        self.pool.fill()
+        first = self.pool.acquire()
+        self.pool.release(first, refill=False)
+        second = self.pool.acquire()
+        self.assertIs(second, first)
+        self.assertEqual(second.uses, 2)
+        self.assertEqual(len(self.launched), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+import gzip
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "files"))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "..", "vbim-utilities", "benchmarks"))
+from fixtures import synthetic_modem_messages
+from metadata_writer import MetadataWriter, closed_segments, collect_segments
+
+class MetadataWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="vbim-test-")
+        self.lines = [message.split(" ", 1)[1] for message in synthetic_modem_messages(random.Random(1), 300)]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, lines, **kwargs):
+        writer = MetadataWriter(self.directory, "METADATA_op0", flush_size=4096, **kwargs)
+        for line in lines:
+            writer.write(line)
+        return writer.close()
+
+    def test_collected_segments_have_all_messages(self):
+        self.write(self.lines, compress=True, segment_size=16384)
+        segments = closed_segments(self.directory)
+        self.assertGreater(len(segments), 1)
+        target = os.path.join(self.directory, "METADATA.jsonl.gz")
+        self.assertTrue(collect_segments(segments, target))
+        with gzip.open(target, "rb") as f:
+            self.assertEqual(f.read().decode("utf-8").splitlines(), self.lines)
+        self.assertEqual(closed_segments(self.directory), [target])
+
+    def test_restarted_writer_keeps_the_segments_of_its_predecessor(self):
+        first = self.write(self.lines[:100])
+        second = self.write(self.lines[100:])
+        self.assertNotEqual(first, second)
+        lines = []
+        for segment in closed_segments(self.directory):
+            with open(segment, "rb") as f:
+                lines.extend(f.read().decode("utf-8").splitlines())
+        self.assertEqual(lines, self.lines)
+
+if __name__ == "__main__":
+    unittest.main()
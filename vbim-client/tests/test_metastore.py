@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+import json
+import os
+import random
+import select
+import sys
+import unittest
+from multiprocessing import Process
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "files"))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "..", "vbim-utilities", "benchmarks"))
+from fixtures import synthetic_modem_messages
+from metastore import SharedMetaState
+
+def publish(state, messages):
+    for message in messages:
+        state.update(message)
+
+class SharedMetaStateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.messages = [json.loads(message.split(" ", 1)[1])
+                         for message in synthetic_modem_messages(random.Random(1), 120, interfaces=("op0",))]
+
+    def test_updates_of_another_process(self):
+        state = SharedMetaState()
+        self.assertIsNone(state.get("DEVICEMODE"))
+        process = Process(target=publish, args=(state, self.messages))
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+
+        self.assertEqual(select.select([state], [], [], 0)[0], [state])
+        state.drain()
+        self.assertEqual(select.select([state], [], [], 0)[0], [])
+        last = self.messages[-1]
+        self.assertEqual(state["SequenceNumber"], last["SequenceNumber"])
+        self.assertEqual(dict(state.items())["RSRP"], last["RSRP"])
+        self.assertIn("ICCID", state)
+
+    def test_history_of_changes(self):
+        state = SharedMetaState()
+        publish(state, self.messages)
+        # DEVICEMODE changes every 20 messages, CID with every message
+        history = state.history()
+        self.assertEqual(len(history), len(self.messages))
+        self.assertEqual([entry["DEVICEMODE"] for entry in history if "DEVICEMODE" in entry], [4, 3, 4, 3, 4, 3, 4])
+        since = self.messages[100]["Timestamp"]
+        self.assertEqual(state.history(since), [entry for entry in history if entry["Timestamp"] >= since])
+        self.assertEqual(state.history_dropped(), 0)
+
+    def test_full_history_is_counted(self):
+        state = SharedMetaState(history_size=256)
+        publish(state, self.messages)
+        self.assertGreater(state.history_dropped(), 0)
+        self.assertEqual(state["SequenceNumber"], self.messages[-1]["SequenceNumber"])
+
+if __name__ == "__main__":
+    unittest.main()
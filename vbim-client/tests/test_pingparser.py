@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+import io
+import os
+import random
+import subprocess
+import sys
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "files"))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "..", "vbim-utilities", "benchmarks"))
+from fixtures import synthetic_ping
+import pingparser
+import probe_runner
+
+class ParseStreamTest(unittest.TestCase):
+
+    def test_summary_matches_parse(self):
+        rng = random.Random(1)
+        for i in range(20):
+            output = synthetic_ping(rng, replies=50, loss=0.1, duplicates=0.05)
+            result = pingparser.parse_stream(io.BytesIO(output.encode("ascii")))
+            expected = pingparser.parse(output)
+            for key in expected:
+                self.assertEqual(result[key], expected[key])
+            self.assertEqual(result["raw"], output)
+            series = result["series"]
+            self.assertEqual(len(series), int(expected["received"]))
+            self.assertEqual(series.duplicates, output.count("(DUP!)"))
+            self.assertEqual(len(result["interval_loss"]), 5)
+
+    def test_series(self):
+        series = pingparser.RttSeries()
+        for seq, rtt in ((1, 10.0), (3, 30.0), (2, 20.0), (3, 30.0)):
+            series.add(seq, rtt)
+        self.assertEqual(len(series), 3)
+        self.assertEqual((series.duplicates, series.reordered), (1, 1))
+        self.assertEqual(series.percentile(50), 20.0)
+        self.assertEqual(series.interval_loss(4, interval_size=2), [0.0, 50.0])
+        self.assertEqual(series.to_dict(), {"seq": [1, 3, 2], "rtt": [10.0, 30.0, 20.0], "time": [None, None, None]})
+
+class PingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.patched = (probe_runner.Popen, pingparser.parse_stream)
+
+    def tearDown(self):
+        probe_runner.Popen, pingparser.parse_stream = self.patched
+
+    def test_failed_parse_does_not_block_on_the_output(self):
+        # More output than fits into the pipe, which nobody reads once parsing failed
+        command = [sys.executable, "-c", "import sys; sys.stdout.write('x' * 1000000)"]
+        probe_runner.Popen = lambda cmd, stdout=None: subprocess.Popen(command, stdout=stdout)
+
+        def parse_stream(stream):
+            raise ValueError("unexpected output")
+        pingparser.parse_stream = parse_stream
+        result = probe_runner.ping("127.0.0.1", 1, None, 1)
+        self.assertEqual(result["error"], "could not parse ping")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "files"))
+import probe_runner
+from settings import EXPCONFIG
+
+class FakeResolver(object):
+
+    def __init__(self):
+        self.saves = 0
+
+    def get_asn(self, ip):
+        return None
+
+    def save(self):
+        self.saves += 1
+
+class FakePopen(object):
+    """A traceroute without output."""
+
+    def __init__(self, cmd, stdout=None):
+        self.stdout = self
+
+    def readline(self):
+        return b""
+
+    def communicate(self):
+        return b"", None
+
+class ProbeCampaignTest(unittest.TestCase):
+
+    def setUp(self):
+        self.resolver = FakeResolver()
+        self.patched = {"Popen": probe_runner.Popen, "create_asn_resolver": probe_runner.create_asn_resolver}
+        probe_runner.Popen = FakePopen
+        probe_runner.create_asn_resolver = lambda expconfig: self.resolver
+
+    def tearDown(self):
+        for name, value in self.patched.items():
+            setattr(probe_runner, name, value)
+
+    def test_shared_resolver_is_saved_once(self):
+        configurations = [dict(EXPCONFIG, cnf_ping_skip=True, cnf_traceroute_skip=False,
+                               cnf_probe_targets=["a.example.net", "b.example.net", "c.example.net"])]
+        expconfig = dict(EXPCONFIG, cnf_probe_campaign_workers=3, nodeid="1", timestamp=time.gmtime())
+        campaign = probe_runner.run_probe_campaign(expconfig, "lo", configurations)
+        self.assertEqual(len(campaign["targets"]), 4)
+        self.assertEqual(self.resolver.saves, 1)
+
+if __name__ == "__main__":
+    unittest.main()
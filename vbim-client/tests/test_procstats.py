@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "files"))
+import procstats
+
+@unittest.skipIf(not os.path.exists("/proc/self/status"), "needs /proc")
+class ProcessTreeSamplerTest(unittest.TestCase):
+
+    def test_context_switches_per_sample(self):
+        sampler = procstats.ProcessTreeSampler([os.getpid()], interval=0.01)
+        for i in range(4):
+            sampler.sample()
+            time.sleep(0.01)
+        result = sampler.result()
+        samples = result["stats"]["samples"]
+        self.assertEqual(samples, 3)
+        self.assertEqual(len(result["tree_voluntary_ctxt_switches"]), samples)
+        self.assertEqual(len(result["tree_nonvoluntary_ctxt_switches"]), samples)
+        # The deltas of the samples add up to the totals of the run
+        self.assertEqual(sum(result["tree_voluntary_ctxt_switches"]), result["stats"]["voluntary_ctxt_switches"])
+        self.assertEqual(sum(result["tree_nonvoluntary_ctxt_switches"]), result["stats"]["nonvoluntary_ctxt_switches"])
+        self.assertGreater(sum(result["tree_voluntary_ctxt_switches"]), 0)
+        series = list(result["kinds"].values())[0]
+        self.assertEqual(len(series["voluntary_ctxt_switches"]), samples)
+
+if __name__ == "__main__":
+    unittest.main()
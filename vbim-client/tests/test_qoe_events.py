@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "files"))
+import qoe_events
+
+def entry(seconds, message, level="INFO"):
+    return {"timestamp": int(seconds * 1000), "level": level,
+            "message": "https://example.net/player.php 140:24 " + message}
+
+class MatcherTest(unittest.TestCase):
+
+    def test_numeric_event(self):
+        event = qoe_events.Matcher("dashjs").match(entry(10, '"QUALITY --->" 1200000 1280 720'))
+        self.assertEqual(event.type, "quality")
+        self.assertEqual(event.value, 1200000.0)
+        self.assertEqual(event.detail, "1280 720")
+
+    def test_non_numeric_event(self):
+        event = qoe_events.Matcher("dashjs").match(entry(10, '"ERROR --->" "dashjs download" "content"'))
+        self.assertEqual(event.type, "error")
+        self.assertIsNone(event.value)
+        self.assertEqual(event.detail, "dashjs download content")
+
+class StallTest(unittest.TestCase):
+
+    def kpis(self, messages, player):
+        return qoe_events.compute_kpis(qoe_events.extract_events(
+            [entry(seconds, message) for seconds, message in messages], player))
+
+    def test_repeated_starts_until_the_end_are_one_stall(self):
+        kpis = self.kpis([(1, '"FIRST FRAME --->" 1'), (5, '"STALL START --->" 5'), (5, '"STALL --->" 1'),
+                          (7, '"STALL END --->" 7'), (20, '"BUFFER --->" 10')], "bitmovin")
+        self.assertEqual(kpis["stall_count"], 1)
+        self.assertEqual(kpis["stall_duration"], 2.0)
+
+    def test_starts_without_ends_last_until_the_next_play(self):
+        # Older bitmovin pages log "STALL" and "PLAY" only; the last stall is open until the end
+        kpis = self.kpis([(1, '"PLAY --->" 1'), (5, '"STALL --->" 1'), (5.5, '"STALL --->" 1'), (6, '"PLAY --->" 6'),
+                          (9, '"STALL --->" 6'), (20, '"BUFFER --->" 10')], "bitmovin")
+        self.assertEqual(kpis["stall_count"], 2)
+        self.assertEqual(kpis["stall_duration"], 12.0)
+
+if __name__ == "__main__":
+    unittest.main()
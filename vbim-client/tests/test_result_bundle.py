@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+import gzip
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "files"))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "..", "vbim-utilities", "benchmarks"))
+from fixtures import synthetic_console_log, synthetic_summary
+from result_bundle import BundleError, BundleReader, BundleWriter
+
+class ResultBundleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="vbim-test-")
+        self.path = os.path.join(self.directory, "results", "session.bundle")
+        rng = random.Random(1)
+        self.summary = synthetic_summary(rng)
+        self.console = synthetic_console_log(rng, 500)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_jsonl(self, name, entries, compress=False):
+        path = os.path.join(self.directory, name)
+        with (gzip.open(path, "wb") if compress else open(path, "wb")) as f:
+            for entry in entries:
+                f.write((json.dumps(entry) + "\n").encode("utf-8"))
+        return path
+
+    def test_round_trip(self):
+        plain = self.write_jsonl("console.jsonl", self.console)
+        segments = [self.write_jsonl("metadata.1.jsonl.gz", self.console[:200], True),
+                    self.write_jsonl("metadata.2.jsonl.gz", self.console[200:], True)]
+        for compress in (True, False):
+            with BundleWriter(self.path, meta={"nodeid": "1"}, compress=compress) as bundle:
+                bundle.add_json("SUMMARY", self.summary)
+                bundle.add_file("CONSOLEOUTPUT", plain)
+                bundle.add_files("METADATA", segments, compressed=True)
+                self.assertRaises(BundleError, bundle.add_json, "SUMMARY", {})
+            with BundleReader(self.path) as reader:
+                self.assertEqual(reader.meta, {"nodeid": "1"})
+                self.assertEqual(reader.sections, ["SUMMARY", "CONSOLEOUTPUT", "METADATA"])
+                self.assertEqual(reader.load("SUMMARY"), json.loads(json.dumps(self.summary)))
+                self.assertEqual(list(reader.iter_lines("CONSOLEOUTPUT")), self.console)
+                self.assertEqual(reader.load("METADATA"), self.console)
+                self.assertNotIn("TRACEROUTE", reader)
+
+    def test_aborted_bundle_leaves_nothing(self):
+        try:
+            with BundleWriter(self.path) as bundle:
+                bundle.add_json("SUMMARY", self.summary)
+                raise ValueError("run failed")
+        except ValueError:
+            pass
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), [])
+
+    def test_incomplete_bundle_is_rejected(self):
+        with BundleWriter(self.path) as bundle:
+            bundle.add_json("SUMMARY", self.summary)
+        with open(self.path, "rb") as f:
+            data = f.read()
+        with open(self.path, "wb") as f:
+            f.write(data[:-4])
+        self.assertRaises(BundleError, BundleReader, self.path)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "files"))
+from scheduler import Scheduler
+from settings import EXPCONFIG
+
+class SchedulerTest(unittest.TestCase):
+
+    def schedule(self, adaptive):
+        configurations = [{"cnf_duration": 30}, {"cnf_duration": 60}]
+        expconfig = dict(EXPCONFIG, cnf_schedule_preflight=False)
+        return list(Scheduler(configurations, expconfig, "lo", {}, adaptive))
+
+    def test_decisions_are_only_attached_when_adaptive(self):
+        for index, cfg in self.schedule(adaptive=False):
+            self.assertNotIn("summary_schedule", cfg)
+        for index, cfg in self.schedule(adaptive=True):
+            self.assertEqual(cfg["summary_schedule"]["configuration"], index)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+import io
+import os
+import random
+import sys
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "files"))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "..", "vbim-utilities", "benchmarks"))
+from fixtures import synthetic_traceroute
+import traceroute_parser
+
+OUTPUT = """traceroute to orf.at (194.232.104.3), 30 hops max, 60 byte packets
+ 1  gateway (10.0.0.1) [*]  0.512 ms  0.480 ms  0.470 ms
+ 2  * r2.example.net (192.0.2.2) [AS64500]  10.1 ms !H  192.0.2.3 (192.0.2.3) [AS64501]  11.2 ms
+ 3  194.232.104.3 (194.232.104.3) [AS1901]  20.000 ms  *  21.5 ms
+"""
+
+class TracerouteParserTest(unittest.TestCase):
+
+    def test_parse_hop(self):
+        hop = traceroute_parser.parse_hop(OUTPUT.splitlines()[2])
+        self.assertEqual(hop.hop, 2)
+        self.assertEqual(hop.probes, [
+            traceroute_parser.Probe(None, None, None, None, None),
+            traceroute_parser.Probe("r2.example.net", "192.0.2.2", "AS64500", 10.1, "!H"),
+            traceroute_parser.Probe("192.0.2.3", "192.0.2.3", "AS64501", 11.2, None)])
+        self.assertIsNone(traceroute_parser.parse_hop("traceroute to orf.at"))
+
+    def test_iter_hops_of_a_stream(self):
+        hops = list(traceroute_parser.iter_hops(io.BytesIO(OUTPUT.encode("ascii"))))
+        self.assertEqual(hops[0]["target_ip"], "194.232.104.3")
+        self.assertEqual([hop.hop for hop in hops[1:]], [1, 2, 3])
+        # The ASN carries over to the following probes of the hop
+        self.assertEqual([probe.asn for probe in hops[3].probes], ["AS1901", "AS1901", "AS1901"])
+        self.assertEqual(list(traceroute_parser.iter_hops(["no traceroute"])), [None])
+
+    def test_same_result_as_the_regex_parser(self):
+        outputs = [OUTPUT] + [synthetic_traceroute(random.Random(seed)) for seed in range(50)]
+        for output in outputs:
+            self.assertEqual(traceroute_parser.parse_traceroute(output, asnlookup=False),
+                             traceroute_parser.parse_traceroute_regex(output, asnlookup=False))
+
+    def test_parse_stream_reports_every_hop(self):
+        seen = []
+        result = traceroute_parser.parse_stream(io.BytesIO(OUTPUT.encode("ascii")), asnlookup=False, on_hop=seen.append)
+        self.assertEqual([hop.hop for hop in seen], [1, 2, 3])
+        self.assertEqual(result["raw"], OUTPUT)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -50,6 +50,7 @@
         <script type="text/javascript">
           var sessionID = document.getElementById("sessionID");
         </script>
+        <script type="text/javascript" src="../vbim-instrumentation.js"></script>
 <!- ************************************************************************** ->
 
 
@@ -94,6 +95,10 @@ const conf = {
                 console.log("adaptation --->", qualitySwitches);
         },
 
+        videoplaybackqualitychanged : function(e) {
+                vbimLog("QUALITY", e.targetQuality.bitrate, e.targetQuality.width, e.targetQuality.height);
+        },
+
         play : function(e) {
                 initTime = new Date().getTime();
                 console.log("PLAY --->", initTime);
@@ -103,6 +108,10 @@ const conf = {
 
                 console.log("STALL --->", initTime);
         },
+
+        error : function(e) {
+                vbimFatal("bitmovin " + e.code + " " + e.name);
+        },
 	}
 };
 
@@ -119,6 +128,7 @@ player.load(source).then(() => {
   //player.play();
 }).catch((reason) => {
   console.error('player setup failed', reason);
+  vbimFatal('player setup failed ' + reason);
 });
 
 </script>
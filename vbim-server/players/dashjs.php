@@ -53,6 +53,7 @@
         <script type="text/javascript">
           var sessionID = document.getElementById("sessionID");
         </script>
+        <script type="text/javascript" src="../vbim-instrumentation.js"></script>
 <!- ************************************************************************** ->
 
 
@@ -80,6 +81,33 @@
                     var time = new Date().getTime();
                     var dashjsPlayer = dashjs.MediaPlayer().create();
                     myAdapter = new bitmovin.analytics.adapters.DashjsAdapter(analyticsConfig, dashjsPlayer, {starttime: time});
+                    // dash.js recovers from download and append errors; manifest, codec and
+                    // MediaSource errors end the playback. dash.js 3 reports {code, message}
+                    // (codes of Errors.js), dash.js 2 a name and the failed download in e.event.id
+                    var dashjsFatalCodes = [10, 11, 23, 25, 30, 31, 32, 34, 35];
+                    var dashjsFatalNames = ["manifestError", "mediasource", "capability"];
+                    dashjsPlayer.on(dashjs.MediaPlayer.events.ERROR, function(e) {
+                        var fatal, detail;
+                        if (e.error && e.error.code !== undefined) {
+                            fatal = dashjsFatalCodes.indexOf(e.error.code) >= 0;
+                            detail = e.error.code + " " + e.error.message;
+                        } else {
+                            fatal = dashjsFatalNames.indexOf(e.error) >= 0 ||
+                                    (e.error == "download" && e.event && e.event.id == "manifest");
+                            detail = e.error + (e.event && e.event.id ? " " + e.event.id : "");
+                        }
+                        if (fatal) {
+                            vbimFatal("dashjs " + detail);
+                        } else {
+                            vbimLog("ERROR", "dashjs " + detail);
+                        }
+                    });
+                    dashjsPlayer.on(dashjs.MediaPlayer.events.QUALITY_CHANGE_RENDERED, function(e) {
+                        if (e.mediaType == "video") {
+                            var info = dashjsPlayer.getBitrateInfoListFor("video")[e.newQuality];
+                            vbimLog("QUALITY", info.bitrate, info.width, info.height);
+                        }
+                    });
                     dashjsPlayer.initialize(video, url, false);
                     sID = myAdapter.getCurrentImpressionId()
                     console.log("sessionID = ", sID)
@@ -47,6 +47,7 @@
         <script type="text/javascript">
           var sessionID = document.getElementById("sessionID");
         </script>
+        <script type="text/javascript" src="../vbim-instrumentation.js"></script>
 <!- ************************************************************************** ->
 
     <video id="video"
@@ -69,6 +70,7 @@
   } else {
     // This browser does not have the minimum set of APIs we need.
     console.error('Browser not supported!');
+    vbimFatal('Browser not supported!');
   }
 }
 
@@ -99,11 +101,22 @@ function initPlayer() {
   // Listen for error events.
   player.addEventListener('error', onErrorEvent);
 
+  // Log the variant played after each (automatic or manual) change
+  function logQuality() {
+    var track = player.getVariantTracks().filter(function(t) { return t.active; })[0];
+    if (track) {
+      vbimLog("QUALITY", track.bandwidth, track.width, track.height);
+    }
+  }
+  player.addEventListener('adaptation', logQuality);
+  player.addEventListener('variantchanged', logQuality);
+
   // Try to load a manifest.
   // This is an asynchronous process.
   player.load(manifestUri).then(function() {
     // This runs if the asynchronous load is successful.
     console.log('The video has now been loaded!');
+    logQuality();
   }).catch(onError);  // onError is executed if the asynchronous load fails.
 
    sID = myAdapter.getCurrentImpressionId()
@@ -119,6 +132,9 @@ function onErrorEvent(event) {
 function onError(error) {
   // Log the error.
   console.error('Error code', error.code, 'object', error);
+  if (error.severity == shaka.util.Error.Severity.CRITICAL) {
+    vbimFatal('shaka ' + error.code);
+  }
 }
 
 document.addEventListener('DOMContentLoaded', initApp);
@@ -0,0 +1,73 @@
+// Instrumentation shared by the VBIM player pages, loaded before the player
+// scripts. The pages only bind the events of their player: they report
+// QUALITY and ERROR with vbimLog() and errors that end the playback with
+// vbimFatal(); the media element events, stalls and buffer level are tracked
+// here for all players alike. Served next to the player directories, i.e. at
+// ../vbim-instrumentation.js of <player>/index.php.
+
+// Playback state polled by the VBIM client (playback_monitor.py)
+var vbim = {events: [], firstFrame: null, stalled: false, played: 0, fatal: null,
+            navigationStart: window.performance ? performance.timing.navigationStart : new Date().getTime()};
+
+// Playback events in the console log as "LABEL --->" values (see qoe_events.py)
+function vbimLog(label) {
+  console.log.apply(console, [label + " --->"].concat(Array.prototype.slice.call(arguments, 1)));
+}
+
+function vbimEvent(type, detail) {
+  var e = {type: type, time: new Date().getTime()};
+  if (detail !== undefined) {
+    e.detail = String(detail);
+  }
+  vbim.events.push(e);
+  if (type == "playing" && vbim.firstFrame === null) {
+    vbim.firstFrame = e.time;
+    vbimLog("FIRST FRAME", e.time);
+  } else if (type == "waiting" && vbim.firstFrame !== null && !vbim.stalled) {
+    vbim.stalled = true;
+    vbimLog("STALL START", e.time);
+  } else if (type == "playing" && vbim.stalled) {
+    vbim.stalled = false;
+    vbimLog("STALL END", e.time);
+  }
+}
+
+function vbimFatal(detail) {
+  if (vbim.fatal === null) {
+    vbim.fatal = String(detail);
+    vbimLog("FATAL", vbim.fatal);
+  }
+  vbimEvent("error", detail);
+}
+
+// Media events do not bubble, so listen in the capture phase on the document
+["playing", "waiting", "stalled", "pause", "ended"].forEach(function(type) {
+  document.addEventListener(type, function(ev) { vbimEvent(type); }, true);
+});
+document.addEventListener("error", function(ev) {
+  if (ev.target && ev.target.error) {
+    vbimFatal("media error " + ev.target.error.code);
+  }
+}, true);
+document.addEventListener("timeupdate", function(ev) {
+  var played = 0;
+  for (var i = 0; i < ev.target.played.length; i++) {
+    played += ev.target.played.end(i) - ev.target.played.start(i);
+  }
+  vbim.played = played;
+}, true);
+
+// Seconds of media buffered ahead of the playback position
+setInterval(function() {
+  var video = document.querySelector("video");
+  if (!video || vbim.firstFrame === null) {
+    return;
+  }
+  var level = 0;
+  for (var i = 0; i < video.buffered.length; i++) {
+    if (video.buffered.start(i) <= video.currentTime && video.currentTime <= video.buffered.end(i)) {
+      level = video.buffered.end(i) - video.currentTime;
+    }
+  }
+  vbimLog("BUFFER", Number(level.toFixed(3)));
+}, 1000);
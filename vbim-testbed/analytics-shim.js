@@ -0,0 +1,43 @@
+// Offline stand-in for the Bitmovin Analytics library of the VBIM player pages.
+//
+// Provides the adapters the pages construct and a session (impression) ID,
+// so that the pages run without the analytics service. Nothing is sent.
+
+(function () {
+    function impressionId() {
+        var id = "";
+        for (var i = 0; i < 32; i++) {
+            id += Math.floor(Math.random() * 16).toString(16);
+            if (i == 7 || i == 11 || i == 15 || i == 19) {
+                id += "-";
+            }
+        }
+        return id;
+    }
+
+    function Adapter() {
+        this.impressionId = impressionId();
+    }
+    Adapter.prototype.getCurrentImpressionId = function () {
+        return this.impressionId;
+    };
+    Adapter.prototype.setCustomData = function () {};
+    Adapter.prototype.setCustomDataOnce = function () {};
+
+    function Bitmovin8Adapter(player) {
+        Adapter.call(this);
+        // The Bitmovin player exposes the session of its analytics module
+        if (player && !player.analytics) {
+            player.analytics = this;
+        }
+    }
+    Bitmovin8Adapter.prototype = Object.create(Adapter.prototype);
+
+    window.bitmovin = window.bitmovin || {};
+    window.bitmovin.analytics = window.bitmovin.analytics || {};
+    window.bitmovin.analytics.adapters = {
+        DashjsAdapter: Adapter,
+        ShakaAdapter: Adapter,
+        Bitmovin8Adapter: Bitmovin8Adapter
+    };
+})();
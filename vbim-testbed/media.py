@@ -0,0 +1,110 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Generation of the DASH content of the VBIM testbed.
+
+Encodes a synthetic test pattern (with a tone) with ffmpeg into a bitrate
+ladder of H.264 representations and one AAC representation, cut into
+segments of a fixed duration with aligned key frames, and writes stream.mpd
+with a SegmentTemplate. The encoding is single threaded and bit exact, so the
+same parameters give the same segments on every machine; the parameters are
+stored next to the manifest and nothing is regenerated while they match, e.g.
+
+    python media.py --duration 300 --ladder 426x240:300,1280x720:2500 media
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+DEFAULT_LADDER = "426x240:300,640x360:700,854x480:1200,1280x720:2500,1920x1080:5000"
+PARAMETERS_FILE = "media.json"
+
+def parse_ladder(ladder):
+    """Return [(width, height, kbit), ...] of "WxH:kbit,..."."""
+    representations = []
+    for entry in ladder.split(","):
+        size, kbit = entry.strip().split(":")
+        width, height = size.split("x")
+        representations.append((int(width), int(height), int(kbit)))
+    return sorted(representations, key=lambda representation: representation[2])
+
+def ffmpeg_command(ffmpeg, directory, duration, segment, ladder, fps, audio_kbit):
+    gop = int(round(segment * fps))
+    width, height = max((w, h) for w, h, kbit in ladder)
+    command = [ffmpeg, "-nostdin", "-loglevel", "error", "-y",
+               "-f", "lavfi", "-i", "testsrc2=size={}x{}:rate={}:duration={}".format(width, height, fps, duration),
+               "-f", "lavfi", "-i", "sine=frequency=440:beep_factor=4:duration={}".format(duration)]
+    for i in range(len(ladder)):
+        command += ["-map", "0:v"]
+    command += ["-map", "1:a"]
+    for i, (w, h, kbit) in enumerate(ladder):
+        command += ["-filter:v:{}".format(i), "scale={}:{}".format(w, h),
+                    "-b:v:{}".format(i), "{}k".format(kbit),
+                    "-maxrate:v:{}".format(i), "{}k".format(int(kbit * 1.1)),
+                    "-bufsize:v:{}".format(i), "{}k".format(kbit * 2)]
+    command += ["-c:v", "libx264", "-preset", "veryfast", "-profile:v", "main", "-pix_fmt", "yuv420p",
+                "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+                "-c:a", "aac", "-b:a", "{}k".format(audio_kbit), "-ac", "2",
+                "-threads", "1", "-fflags", "+bitexact", "-flags:v", "+bitexact", "-flags:a", "+bitexact",
+                "-f", "dash", "-seg_duration", str(segment), "-use_template", "1", "-use_timeline", "0",
+                "-adaptation_sets", "id=0,streams=v id=1,streams=a",
+                "-init_seg_name", "init-$RepresentationID$.m4s",
+                "-media_seg_name", "chunk-$RepresentationID$-$Number%05d$.m4s",
+                os.path.join(directory, "stream.mpd")]
+    return command
+
+def generate(directory, duration=120, segment=2, ladder=DEFAULT_LADDER, fps=30, audio_kbit=128, ffmpeg="ffmpeg", force=False):
+    """Generate the content into directory unless it is there with the same parameters; return the parameters."""
+    parameters = {"duration": duration, "segment": segment, "ladder": parse_ladder(ladder), "fps": fps, "audio_kbit": audio_kbit}
+    stamp = os.path.join(directory, PARAMETERS_FILE)
+    if not force and os.path.exists(stamp) and os.path.exists(os.path.join(directory, "stream.mpd")):
+        with open(stamp) as f:
+            # JSON has no tuples
+            if json.load(f) == json.loads(json.dumps(parameters)):
+                return parameters
+
+    # Encode into a new directory, so that an interrupted run leaves no partial content
+    parent = os.path.dirname(os.path.abspath(directory))
+    if not os.path.exists(parent):
+        os.makedirs(parent)
+    work = tempfile.mkdtemp(prefix=".media-", dir=parent)
+    try:
+        subprocess.check_call(ffmpeg_command(ffmpeg, work, duration, segment, parameters["ladder"], fps, audio_kbit))
+        with open(os.path.join(work, PARAMETERS_FILE), "w") as f:
+            json.dump(parameters, f)
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.rename(work, directory)
+    except BaseException:
+        shutil.rmtree(work, ignore_errors=True)
+        raise
+    return parameters
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("directory", nargs="?", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "media"))
+    parser.add_argument("--duration", type=int, default=120, help="length of the stream in seconds")
+    parser.add_argument("--segment", type=int, default=2, help="segment duration in seconds")
+    parser.add_argument("--ladder", default=DEFAULT_LADDER, help="video representations as WIDTHxHEIGHT:kbit,...")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--audio-kbit", type=int, default=128)
+    parser.add_argument("--ffmpeg", default="ffmpeg", help="ffmpeg executable (with libx264)")
+    parser.add_argument("--force", action="store_true", help="regenerate even if the parameters match")
+    args = parser.parse_args()
+
+    try:
+        generate(args.directory, args.duration, args.segment, args.ladder, args.fps, args.audio_kbit, args.ffmpeg, args.force)
+    except (OSError, subprocess.CalledProcessError) as e:
+        sys.exit("Cannot generate the content: {}".format(e))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Emulated network of the VBIM testbed.
+
+The testbed server runs in its own network namespace, connected to the host
+by a veth pair. The host end is an ordinary interface with an address that
+the client can be run on like on a modem interface; everything it sends to
+the server crosses the pair. Both ends get a tc netem qdisc: the one in the
+namespace shapes the downlink, the host end the uplink.
+
+A shaping profile (see profiles.json) gives per direction the delay, jitter,
+loss and either a fixed rate or a bandwidth trace of (seconds, kbit/s)
+steps, inline or from a file with two columns. TracePlayer replays the
+traces by changing the rate of the qdiscs at every step.
+"""
+
+import json
+import os
+import subprocess
+import threading
+import time
+
+NETNS = "vbim-testbed"
+HOST_IF = "vbimtb0"
+NETNS_IF = "vbimtb1"
+HOST_IP = "10.77.0.2"
+SERVER_IP = "10.77.0.1"
+PREFIX_LENGTH = 30
+PROFILES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles.json")
+
+def run(command, netns=None, check=True):
+    if netns is not None:
+        command = ["ip", "netns", "exec", netns] + command
+    if check:
+        subprocess.check_call(command)
+        return 0
+    with open(os.devnull, "w") as devnull:
+        try:
+            return subprocess.call(command, stdout=devnull, stderr=devnull)
+        except OSError:
+            # Optional tools like ethtool may be missing
+            return -1
+
+def exists(netns=NETNS):
+    with open(os.devnull, "w") as devnull:
+        return subprocess.call(["ip", "netns", "exec", netns, "true"], stdout=devnull, stderr=devnull) == 0
+
+def setup(netns=NETNS, host_if=HOST_IF, netns_if=NETNS_IF, host_ip=HOST_IP, server_ip=SERVER_IP):
+    """Create the namespace and the veth pair (again, if it already exists)."""
+    teardown(netns, host_if)
+    run(["ip", "netns", "add", netns])
+    run(["ip", "link", "add", host_if, "type", "veth", "peer", "name", netns_if])
+    run(["ip", "link", "set", netns_if, "netns", netns])
+    run(["ip", "addr", "add", "{}/{}".format(host_ip, PREFIX_LENGTH), "dev", host_if])
+    run(["ip", "link", "set", host_if, "up"])
+    run(["ip", "addr", "add", "{}/{}".format(server_ip, PREFIX_LENGTH), "dev", netns_if], netns)
+    run(["ip", "link", "set", netns_if, "up"], netns)
+    run(["ip", "link", "set", "lo", "up"], netns)
+    # Offloads would let netem see 64 KiB super packets instead of the real ones
+    for ifname, ns in ((host_if, None), (netns_if, netns)):
+        run(["ethtool", "-K", ifname, "tso", "off", "gso", "off", "gro", "off"], ns, check=False)
+
+def teardown(netns=NETNS, host_if=HOST_IF):
+    """Remove the veth pair and the namespace, if they exist."""
+    run(["ip", "link", "del", host_if], check=False)
+    run(["ip", "netns", "del", netns], check=False)
+
+def load_profiles(path=PROFILES_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+def load_trace(path):
+    """Return the [seconds, kbit/s] steps of a trace file (two columns, separated by white space or commas)."""
+    steps = []
+    with open(path) as f:
+        for line in f:
+            line = line.split("#")[0].replace(",", " ").split()
+            if len(line) >= 2:
+                steps.append([float(line[0]), float(line[1])])
+    return steps
+
+def netem_args(direction, rate_kbit):
+    """Return the netem parameters of one direction of a profile at the given rate."""
+    args = ["limit", str(direction.get("limit", 1000))]
+    if direction.get("delay_ms"):
+        args += ["delay", "{}ms".format(direction["delay_ms"])]
+        if direction.get("jitter_ms"):
+            args += ["{}ms".format(direction["jitter_ms"]), "distribution", "normal"]
+    if direction.get("loss"):
+        args += ["loss", "{}%".format(direction["loss"])]
+    if rate_kbit:
+        args += ["rate", "{}kbit".format(int(rate_kbit))]
+    return args
+
+def shape(ifname, direction, rate_kbit=None, netns=None):
+    """Set the netem qdisc of ifname; rate_kbit overrides the rate of the direction."""
+    if rate_kbit is None:
+        rate_kbit = direction.get("rate_kbit")
+    run(["tc", "qdisc", "replace", "dev", ifname, "root", "netem"] + netem_args(direction, rate_kbit), netns)
+
+def clear(ifname, netns=None):
+    run(["tc", "qdisc", "del", "dev", ifname, "root"], netns, check=False)
+
+class Link(object):
+    """One shaped direction: the interface (and namespace) whose egress it is and its profile part."""
+
+    def __init__(self, ifname, netns, direction, base_dir="."):
+        self.ifname = ifname
+        self.netns = netns
+        self.direction = direction
+        self.trace = direction.get("trace")
+        if direction.get("trace_file"):
+            self.trace = load_trace(os.path.join(base_dir, direction["trace_file"]))
+        self.period = None
+        if self.trace:
+            # The last step lasts as long as the one before it, unless the period is given
+            last = self.trace[-1][0]
+            self.period = direction.get("trace_period") or (2 * last - self.trace[-2][0] if len(self.trace) > 1 else last + 1)
+
+    def apply(self, rate_kbit=None):
+        shape(self.ifname, self.direction, rate_kbit, self.netns)
+
+class TracePlayer(threading.Thread):
+    """Replays the bandwidth traces of links until stop(); with loop each trace starts over after its period."""
+
+    def __init__(self, links, loop=True, on_step=None):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.links = [link for link in links if link.trace]
+        self.loop = loop
+        self.on_step = on_step
+        self.stopped = threading.Event()
+
+    def run(self):
+        threads = [threading.Thread(target=self.replay, args=(link,)) for link in self.links]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def replay(self, link):
+        start = time.time()
+        while True:
+            for t, kbit in link.trace:
+                if self.stopped.wait(max(0, start + t - time.time())):
+                    return
+                link.apply(kbit)
+                if self.on_step is not None:
+                    self.on_step(link, kbit)
+            if not self.loop:
+                return
+            start += link.period
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+def apply_profile(profile, netns=NETNS, host_if=HOST_IF, netns_if=NETNS_IF, base_dir=None):
+    """Shape both directions as given by the profile; return the links (start a TracePlayer for their traces)."""
+    if base_dir is None:
+        base_dir = os.path.dirname(PROFILES_FILE)
+    links = [Link(netns_if, netns, profile.get("downlink", {}), base_dir),
+             Link(host_if, None, profile.get("uplink", {}), base_dir)]
+    for link in links:
+        if link.direction:
+            link.apply(link.trace[0][1] if link.trace else None)
+        else:
+            clear(link.ifname, link.netns)
+    return links
@@ -0,0 +1,99 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Rendering of the VBIM player landing pages without PHP.
+
+The pages in vbim-server/players only use PHP to echo string literals and
+query parameters ($_GET["..."]), which render() evaluates the same way PHP
+does (unescaped, missing parameters as empty strings). rewrite() then points
+the remote dependencies of a page to the testbed: the DASH manifest to the
+locally generated one, the analytics library to an offline shim and the
+player libraries to local copies where available.
+"""
+
+import os
+import re
+
+PHP_RE = re.compile(r"<\?php(.*?)\?>", re.S)
+TERM_RE = re.compile(r"""\s*(?:"((?:[^"\\]|\\.)*)"|'((?:[^'\\]|\\.)*)'|\$_GET\[\s*["']([^"']*)["']\s*\])\s*""")
+ECHO_RE = re.compile(r"\s*echo\b")
+MANIFEST_RE = re.compile(r"""https?://[^'"\s]+\.mpd""")
+SCRIPT_RE = re.compile(r"""(<script[^>]*\ssrc=")(https?://[^"]+)(")""")
+
+PHP_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", '"': '"', "$": "$"}
+
+class PageError(Exception):
+    pass
+
+def _unescape(literal, double_quoted):
+    if double_quoted:
+        return re.sub(r"\\(.)", lambda m: PHP_ESCAPES.get(m.group(1), m.group(0)), literal)
+    return re.sub(r"\\([\\'])", r"\1", literal)
+
+def evaluate(code, query):
+    """Return the output of a block of PHP echo statements."""
+    output = []
+    pos = 0
+    while code[pos:].strip():
+        m = ECHO_RE.match(code, pos)
+        if not m:
+            raise PageError("unsupported PHP: " + code[pos:].strip()[:60])
+        pos = m.end()
+        while True:
+            m = TERM_RE.match(code, pos)
+            if not m:
+                raise PageError("unsupported PHP expression: " + code[pos:].strip()[:60])
+            double, single, key = m.groups()
+            if key is not None:
+                output.append(query.get(key, ""))
+            elif double is not None:
+                output.append(_unescape(double, True))
+            else:
+                output.append(_unescape(single, False))
+            pos = m.end()
+            if code.startswith(".", pos):
+                pos += 1
+                continue
+            break
+        # The closing tag ends the last statement as well
+        if code.startswith(";", pos):
+            pos += 1
+        elif code[pos:].strip():
+            raise PageError("unsupported PHP: " + code[pos:].strip()[:60])
+    return "".join(output)
+
+def render(source, query):
+    """Render a page; query maps parameter names to (the last of their) values."""
+    return PHP_RE.sub(lambda m: evaluate(m.group(1), query), source)
+
+def rewrite(html, manifest_url, analytics_url=None, lib_dir=None, lib_url="/lib/"):
+    """Point the manifest, the analytics library and the player libraries available in lib_dir to the testbed."""
+    html = MANIFEST_RE.sub(manifest_url, html)
+
+    def script(m):
+        url = m.group(2)
+        if analytics_url and "bitmovinanalytics" in url:
+            url = analytics_url
+        elif lib_dir and os.path.isfile(os.path.join(lib_dir, lib_name(url))):
+            url = lib_url + lib_name(url)
+        return m.group(1) + url + m.group(3)
+    return SCRIPT_RE.sub(script, html)
+
+def lib_name(url):
+    """Return the local file name of a remote library, e.g. dashjs-2.9.3-dash.all.min.js."""
+    parts = [part for part in url.split("?")[0].split("/") if part]
+    # The name and version directories of cdnjs and Bitmovin URLs keep versions apart
+    return "-".join(parts[-3:]) if len(parts) > 3 else parts[-1]
+
+def remote_libraries(players_dir):
+    """Return the URLs of the player libraries (not the analytics library) used by the pages."""
+    urls = set()
+    for name in sorted(os.listdir(players_dir)):
+        if name.endswith(".php"):
+            with open(os.path.join(players_dir, name)) as f:
+                urls.update(m.group(2) for m in SCRIPT_RE.finditer(f.read()) if "bitmovinanalytics" not in m.group(2))
+    return sorted(urls)
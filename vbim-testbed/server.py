@@ -0,0 +1,202 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Local HTTP server of the VBIM testbed.
+
+Serves the player landing pages of vbim-server/players, rendered without PHP
+(see pages.py), under the URLs the client requests (<stub>/<player>/index.php)
+and the locally generated DASH content (see media.py) under /media/. Player
+libraries found in the library directory are served under /lib/ instead of
+from their CDNs (--fetch-libs downloads them once), the analytics library is
+replaced by an offline shim. Every request can be logged as JSON line with
+its size and duration, e.g.
+
+    python server.py --media-dir media --lib-dir lib --access-log access.jsonl
+"""
+
+import argparse
+import json
+import os
+import posixpath
+import shutil
+import sys
+import threading
+import time
+try:
+    from BaseHTTPServer import HTTPServer
+    from SimpleHTTPServer import SimpleHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+    from urllib import unquote
+    from urllib2 import urlopen
+    from urlparse import urlparse, parse_qsl
+except ImportError:
+    from http.server import HTTPServer, SimpleHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+    from urllib.parse import unquote, urlparse, parse_qsl
+    from urllib.request import urlopen
+
+import pages
+
+TESTBED_DIR = os.path.dirname(os.path.abspath(__file__))
+PLAYERS_DIR = os.path.join(TESTBED_DIR, "..", "vbim-server", "players")
+# Script shared by the pages, at ../vbim-instrumentation.js of <player>/index.php
+INSTRUMENTATION = "vbim-instrumentation.js"
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+class TestbedHandler(SimpleHTTPRequestHandler):
+    """Serves the rendered pages, /media/, /lib/, /analytics.js and the shared page instrumentation."""
+
+    protocol_version = "HTTP/1.1"
+    players_dir = PLAYERS_DIR
+    media_dir = "media"
+    lib_dir = "lib"
+    access_log = None
+    access_lock = threading.Lock()
+
+    extensions_map = dict(SimpleHTTPRequestHandler.extensions_map)
+    extensions_map.update({".mpd": "application/dash+xml", ".m4s": "video/iso.segment",
+                           ".mp4": "video/mp4", ".m4a": "audio/mp4", ".js": "application/javascript"})
+
+    def page(self, path):
+        """Return the player of a landing page path, or None."""
+        parts = [part for part in path.split("/") if part]
+        if len(parts) >= 2 and parts[-1] == "index.php":
+            player = parts[-2]
+        elif len(parts) >= 1 and parts[-1].endswith(".php"):
+            player = parts[-1][:-len(".php")]
+        else:
+            return None
+        if not os.path.isfile(os.path.join(self.players_dir, player + ".php")):
+            return None
+        return player
+
+    def translate_path(self, path):
+        path = posixpath.normpath(unquote(urlparse(path).path))
+        for prefix, directory in (("/media/", self.media_dir), ("/lib/", self.lib_dir)):
+            if path.startswith(prefix):
+                return os.path.join(directory, *[part for part in path[len(prefix):].split("/") if part not in ("", ".", "..")])
+        if path == "/analytics.js":
+            return os.path.join(TESTBED_DIR, "analytics-shim.js")
+        if path == "/" + INSTRUMENTATION:
+            return os.path.join(self.players_dir, INSTRUMENTATION)
+        # Nothing else is served from the file system
+        return None
+
+    def do_GET(self):
+        self.time_start = time.time()
+        self.response_status = None
+        self.response_bytes = None
+        try:
+            self.serve()
+        finally:
+            self.log_access()
+
+    def serve(self):
+        url = urlparse(self.path)
+        player = self.page(url.path)
+        if player is None:
+            if self.translate_path(self.path) is None:
+                self.send_error(404)
+                return
+            f = self.send_head()
+            if f:
+                try:
+                    shutil.copyfileobj(f, self.wfile, 65536)
+                finally:
+                    f.close()
+            return
+        with open(os.path.join(self.players_dir, player + ".php")) as f:
+            source = f.read()
+        try:
+            html = pages.rewrite(pages.render(source, dict(parse_qsl(url.query, keep_blank_values=True))),
+                                 "/media/stream.mpd", "/analytics.js", self.lib_dir)
+        except pages.PageError as e:
+            self.send_error(500, str(e))
+            return
+        data = html.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_response(self, code, message=None):
+        self.response_status = code
+        SimpleHTTPRequestHandler.send_response(self, code, message)
+
+    def send_header(self, keyword, value):
+        if keyword.lower() == "content-length":
+            self.response_bytes = int(value)
+        SimpleHTTPRequestHandler.send_header(self, keyword, value)
+
+    def end_headers(self):
+        self.send_header("Access-Control-Allow-Origin", "*")
+        SimpleHTTPRequestHandler.end_headers(self)
+
+    def log_access(self):
+        """Append the request with the time it took until the response was written."""
+        if self.access_log is None:
+            return
+        entry = {"time": self.time_start, "duration": time.time() - self.time_start, "path": self.path,
+                 "status": self.response_status, "bytes": self.response_bytes, "client": self.client_address[0]}
+        with self.access_lock:
+            self.access_log.write(json.dumps(entry) + "\n")
+            self.access_log.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+def fetch_libs(players_dir, lib_dir):
+    """Download the player libraries of the pages into lib_dir (needs network access once)."""
+    if not os.path.exists(lib_dir):
+        os.makedirs(lib_dir)
+    for url in pages.remote_libraries(players_dir):
+        path = os.path.join(lib_dir, pages.lib_name(url))
+        if os.path.exists(path):
+            continue
+        print("Fetching {}".format(url))
+        response = urlopen(url, timeout=60)
+        with open(path + ".part", "wb") as f:
+            shutil.copyfileobj(response, f)
+        os.rename(path + ".part", path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--bind", default="0.0.0.0", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--players-dir", default=PLAYERS_DIR, help="directory of the <player>.php pages")
+    parser.add_argument("--media-dir", default=os.path.join(TESTBED_DIR, "media"), help="directory of stream.mpd and its segments")
+    parser.add_argument("--lib-dir", default=os.path.join(TESTBED_DIR, "lib"), help="directory of local copies of the player libraries")
+    parser.add_argument("--fetch-libs", action="store_true", help="download the player libraries into --lib-dir and exit")
+    parser.add_argument("--access-log", help="append a JSON line per request to this file")
+    args = parser.parse_args()
+
+    if args.fetch_libs:
+        fetch_libs(args.players_dir, args.lib_dir)
+        return
+    if not os.path.isfile(os.path.join(args.media_dir, "stream.mpd")):
+        sys.stderr.write("No stream.mpd in {}, generate it with media.py\n".format(args.media_dir))
+
+    TestbedHandler.players_dir = args.players_dir
+    TestbedHandler.media_dir = args.media_dir
+    TestbedHandler.lib_dir = args.lib_dir
+    if args.access_log:
+        TestbedHandler.access_log = open(args.access_log, "a")
+    server = ThreadingHTTPServer((args.bind, args.port), TestbedHandler)
+    print("Serving the VBIM testbed on http://{}:{}/".format(args.bind, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Local streaming testbed for the VBIM client.
+
+"up" generates the DASH content (media.py), creates the network namespace
+and veth pair (netem.py), starts the testbed server (server.py) in the
+namespace, shapes the link with a profile of profiles.json, optionally
+publishes modem metadata for the host interface, writes a client
+configuration that runs on that interface against the server and keeps
+everything up (and the bandwidth traces playing) until interrupted:
+
+    sudo python testbed.py up --profile lte-variable --config testbed-config.json
+    sudo python testbed.py down
+
+Needs root (or CAP_NET_ADMIN), iproute2 with tc netem and ffmpeg.
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import media
+import netem
+
+TESTBED_DIR = os.path.dirname(os.path.abspath(__file__))
+CLIENT_DIR = os.path.join(TESTBED_DIR, "..", "vbim-client", "files")
+
+def client_config(profile_name, port, metadata_endpoint=None):
+    """Return the client configuration for runs on the testbed interface.
+
+       The configurations of the client's default cnf_multiconfig are kept,
+       with the probes of every one directed at the testbed server.
+    """
+    sys.path.insert(0, CLIENT_DIR)
+    from settings import EXPCONFIG
+    multiconfig = [dict(configuration, cnf_ping_target=netem.SERVER_IP, cnf_traceroute_target=netem.SERVER_IP)
+                   for configuration in EXPCONFIG["cnf_multiconfig"]]
+    config = {"cnf_stub": "http://{}:{}".format(netem.SERVER_IP, port),
+              "cnf_enabled_interfaces": [netem.HOST_IF],
+              "cnf_disabled_interfaces": [],
+              "interfaces_without_metadata": [] if metadata_endpoint else [netem.HOST_IF],
+              "cnf_ping_target": netem.SERVER_IP,
+              "cnf_traceroute_target": netem.SERVER_IP,
+              "cnf_probe_targets": [],
+              "cnf_multiconfig": multiconfig,
+              "cnf_experimentname": "testbed-" + profile_name}
+    if metadata_endpoint:
+        config["zmqport"] = metadata_endpoint
+    return config
+
+class MetadataPublisher(threading.Thread):
+    """Publishes modem metadata of the host interface with the values of the profile every interval seconds."""
+
+    def __init__(self, endpoint, values, interval=1.0):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        sys.path.insert(0, os.path.join(TESTBED_DIR, "..", "vbim-utilities"))
+        import zmq
+        from meta_publisher import TOPIC, modem_message
+        self.topic = TOPIC
+        self.modem_message = modem_message
+        self.socket = zmq.Context().socket(zmq.PUB)
+        self.socket.bind(endpoint)
+        self.values = values
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        sequence_number = 0
+        while not self.stopped.is_set():
+            sequence_number += 1
+            msg = self.modem_message(netem.HOST_IF, sequence_number, self.values.get("DEVICEMODE", 4))
+            msg.update(self.values)
+            self.socket.send_string("{}.{}.UPDATE {}".format(self.topic, msg["ICCID"], json.dumps(msg)))
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.socket.close()
+
+def up(args):
+    profiles = netem.load_profiles(args.profiles)
+    if args.profile not in profiles:
+        sys.exit("Unknown profile {}, see {}".format(args.profile, args.profiles))
+    profile = profiles[args.profile]
+
+    if not args.no_media:
+        print("Generating the DASH content in {} (if needed)".format(args.media_dir))
+        media.generate(args.media_dir, duration=args.duration)
+
+    server = None
+    player = None
+    publisher = None
+    shaping_log = open(args.shaping_log, "a") if args.shaping_log else None
+    try:
+        netem.setup()
+        command = [sys.executable, os.path.join(TESTBED_DIR, "server.py"), "--bind", netem.SERVER_IP,
+                   "--port", str(args.port), "--media-dir", os.path.abspath(args.media_dir),
+                   "--lib-dir", os.path.abspath(args.lib_dir)]
+        if args.access_log:
+            command += ["--access-log", os.path.abspath(args.access_log)]
+        server = subprocess.Popen(["ip", "netns", "exec", netem.NETNS] + command)
+
+        def on_step(link, kbit):
+            if shaping_log is not None:
+                shaping_log.write(json.dumps({"time": time.time(), "ifname": link.ifname, "rate_kbit": kbit}) + "\n")
+                shaping_log.flush()
+
+        links = netem.apply_profile(profile, base_dir=os.path.dirname(os.path.abspath(args.profiles)))
+        player = netem.TracePlayer(links, on_step=on_step)
+        player.start()
+
+        endpoint = args.publish_metadata
+        if endpoint:
+            publisher = MetadataPublisher(endpoint, profile.get("metadata", {}))
+            publisher.start()
+
+        # The client connects to where the publisher binds, "tcp://*:port" on the host itself
+        config = client_config(args.profile, args.port, endpoint.replace("*", "127.0.0.1") if endpoint else None)
+        with open(args.config, "w") as f:
+            json.dump(config, f, indent=2, sort_keys=True)
+        print("Testbed up with profile {}: {}".format(args.profile, profile.get("description", "")))
+        print("Server http://{}:{}/ behind {}, client configuration in {}".format(netem.SERVER_IP, args.port, netem.HOST_IF, args.config))
+
+        # SIGTERM ends the testbed like Ctrl-C
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        while server.poll() is None:
+            time.sleep(1)
+        print("Testbed server exited")
+    except KeyboardInterrupt:
+        pass
+    except (OSError, subprocess.CalledProcessError) as e:
+        print("Cannot set up the testbed: {}".format(e))
+    finally:
+        if player is not None:
+            player.stop()
+        if publisher is not None:
+            publisher.stop()
+        if server is not None and server.poll() is None:
+            server.terminate()
+            server.wait()
+        if shaping_log is not None:
+            shaping_log.close()
+        if not args.keep:
+            netem.teardown()
+
+def down(args):
+    netem.teardown()
+
+def list_profiles(args):
+    for name, profile in sorted(netem.load_profiles(args.profiles).items()):
+        print("{:16s} {}".format(name, profile.get("description", "")))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--profiles", default=netem.PROFILES_FILE, help="JSON file of the shaping profiles")
+    commands = parser.add_subparsers(dest="command")
+
+    parser_up = commands.add_parser("up", help="start the testbed until interrupted")
+    parser_up.add_argument("--profile", default="unshaped", help="shaping profile")
+    parser_up.add_argument("--port", type=int, default=8080, help="port of the testbed server")
+    parser_up.add_argument("--config", default="testbed-config.json", help="client configuration to write")
+    parser_up.add_argument("--media-dir", default=os.path.join(TESTBED_DIR, "media"))
+    parser_up.add_argument("--duration", type=int, default=120, help="length of the generated stream in seconds")
+    parser_up.add_argument("--no-media", action="store_true", help="do not generate the DASH content")
+    parser_up.add_argument("--lib-dir", default=os.path.join(TESTBED_DIR, "lib"), help="local copies of the player libraries")
+    parser_up.add_argument("--access-log", help="log the requests to the server to this file")
+    parser_up.add_argument("--shaping-log", help="log the rate changes of the bandwidth traces to this file")
+    parser_up.add_argument("--publish-metadata", metavar="ENDPOINT",
+                           help="publish modem metadata of the profile on this ZeroMQ endpoint, e.g. tcp://127.0.0.1:5556")
+    parser_up.add_argument("--keep", action="store_true", help="keep the namespace and shaping when stopping")
+    parser_up.set_defaults(func=up)
+    commands.add_parser("down", help="remove the namespace and veth pair").set_defaults(func=down)
+    commands.add_parser("profiles", help="list the shaping profiles").set_defaults(func=list_profiles)
+    args = parser.parse_args()
+
+    if args.command is None:
+        parser.error("a command is required")
+    if args.command != "profiles" and os.geteuid() != 0:
+        sys.exit("The testbed needs root to create the network namespace")
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
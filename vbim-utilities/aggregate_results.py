@@ -0,0 +1,358 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Aggregate downloaded VBIM results into tables.
+
+Scans results trees (e.g. mirrored with retrieve_results.sh) for the
+*_SUMMARY.json, *_PING.json and *_TRACEROUTE.json files and *.bundle files of
+the VBIM client, joins them per session and writes the tables
+
+    sessions         one row per session with the flat SUMMARY fields
+    ping_probes      one row per ping (per probe phase)
+    ping_rtts        one row per ping reply
+    traceroute_hops  one row per traceroute probe
+
+as CSV, NumPy .npz (column name -> array) and/or Parquet files. Every row
+carries cnf_sessionid and cnf_tag plus the node, interface, player and run
+time from the file name. Files are parsed in a process pool.
+
+With --incremental, the files that were processed are recorded in the output
+directory and only new or changed files are processed on the next run. CSV
+tables are appended to, .npz and Parquet tables are written as one new part
+per run.
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+from multiprocessing import Pool
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "vbim-client", "files"))
+try:
+    from result_bundle import BundleReader
+except ImportError:
+    BundleReader = None
+try:
+    import numpy
+except ImportError:
+    numpy = None
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+NAME_RE = re.compile(r'^(?P<key>(?P<dataid>.+?)_NODE\.(?P<nodeid>.*?)_INTERFACE\.(?P<interface>.*?)'
+                     r'_PLAYER\.(?P<player>.*?)_TIME\.(?P<time_run>[^_]+)_SESSION\.(?P<sessionid>.+?))'
+                     r'(?:_(?P<section>SUMMARY|PING|TRACEROUTE)\.json|\.bundle)$')
+
+TABLES = ["sessions", "ping_probes", "ping_rtts", "traceroute_hops"]
+NAME_COLUMNS = ["nodeid", "interface", "player", "time_run"]
+STATE_FILE = "aggregate_state.json"
+
+def scan(paths):
+    """Return {session key: {section (or "BUNDLE"): path}} for the result files below paths."""
+    groups = {}
+    for path in paths:
+        for root, dirs, files in os.walk(path):
+            for name in files:
+                m = NAME_RE.match(name)
+                if not m:
+                    continue
+                section = m.group("section") or "BUNDLE"
+                groups.setdefault(os.path.join(root, m.group("key")), {})[section] = os.path.join(root, name)
+    return groups
+
+def file_state(path):
+    st = os.stat(path)
+    return [st.st_size, int(st.st_mtime)]
+
+def as_list(result):
+    """PING/TRACEROUTE hold one result, or a list of results if probes ran in several phases."""
+    if result is None:
+        return []
+    if isinstance(result, list):
+        return result
+    return [result]
+
+def flat_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+def session_rows(keys, summary):
+    row = OrderedDict(keys)
+    for k in sorted(summary):
+        if k not in row:
+            row[k] = flat_value(summary[k])
+    return [row]
+
+def ping_rows(keys, pings):
+    probes = []
+    rtts = []
+    for ping in as_list(pings):
+        probe = OrderedDict(keys)
+        probe["phase"] = ping.get("phase")
+        for k in sorted(ping):
+            if k not in ("raw", "rtt_series", "phase"):
+                probe[k] = flat_value(ping[k])
+        probes.append(probe)
+        series = ping.get("rtt_series") or {}
+        for seq, rtt, t in zip(series.get("seq", []), series.get("rtt", []), series.get("time", [])):
+            row = OrderedDict(keys)
+            row["phase"] = ping.get("phase")
+            row["host"] = ping.get("host")
+            row["seq"] = seq
+            row["rtt"] = rtt
+            row["time"] = t
+            rtts.append(row)
+    return probes, rtts
+
+def traceroute_rows(keys, traceroutes):
+    rows = []
+    for traceroute in as_list(traceroutes):
+        for hop in traceroute.get("hops") or []:
+            for i, probe in enumerate(hop["probes"]):
+                row = OrderedDict(keys)
+                row["phase"] = traceroute.get("phase")
+                row["target"] = traceroute.get("target")
+                row["target_ip"] = traceroute.get("target_ip")
+                row["hop"] = hop["hop"]
+                row["probe"] = i
+                row["name"] = probe["name"]
+                row["ip"] = probe["ip"]
+                row["asn"] = probe["asn"]
+                row["rtt"] = probe["rtt"] if isinstance(probe["rtt"], float) else None
+                row["annotation"] = probe["annotation"]
+                rows.append(row)
+    return rows
+
+def load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+def load_group(files):
+    """Return the SUMMARY, PING and TRACEROUTE results of one session (None if missing)."""
+    if "BUNDLE" in files:
+        if BundleReader is None:
+            raise RuntimeError("result_bundle.py not found, cannot read bundles")
+        with BundleReader(files["BUNDLE"]) as bundle:
+            return [bundle.load(section) if section in bundle else None
+                    for section in ("SUMMARY", "PING", "TRACEROUTE")]
+    return [load_json(files[section]) if section in files else None
+            for section in ("SUMMARY", "PING", "TRACEROUTE")]
+
+def process_group(args):
+    """Parse the new files of one session; runs in the worker processes.
+
+       The SUMMARY is always read for the join keys, but only the sections in
+       new are turned into rows.
+    """
+    key, files, new = args
+    m = NAME_RE.match(os.path.basename(next(iter(files.values()))))
+    tables = dict((table, []) for table in TABLES)
+    try:
+        summary, pings, traceroutes = load_group(files)
+    except Exception as e:
+        return key, tables, "{}: {}".format(key, e)
+
+    keys = OrderedDict()
+    keys["cnf_sessionid"] = (summary or {}).get("cnf_sessionid", m.group("sessionid"))
+    keys["cnf_tag"] = (summary or {}).get("cnf_tag")
+    for column in NAME_COLUMNS:
+        keys[column] = m.group(column)
+
+    if summary is not None and ("SUMMARY" in new or "BUNDLE" in new):
+        tables["sessions"] = session_rows(keys, summary)
+    if pings is not None and ("PING" in new or "BUNDLE" in new):
+        tables["ping_probes"], tables["ping_rtts"] = ping_rows(keys, pings)
+    if traceroutes is not None and ("TRACEROUTE" in new or "BUNDLE" in new):
+        tables["traceroute_hops"] = traceroute_rows(keys, traceroutes)
+    return key, tables, None
+
+class Table(object):
+    """Columnar accumulation of rows; columns missing in a row are None."""
+
+    def __init__(self):
+        self.columns = OrderedDict()
+        self.length = 0
+
+    def append(self, row):
+        for column in row:
+            if column not in self.columns:
+                self.columns[column] = [None] * self.length
+        for column, values in self.columns.items():
+            values.append(row.get(column))
+        self.length += 1
+
+    def arrays(self):
+        """Return the columns as NumPy arrays: bool, int64 or float64 (None as NaN) where possible, else str."""
+        arrays = OrderedDict()
+        for column, values in self.columns.items():
+            present = [v for v in values if v is not None]
+            if present and all(isinstance(v, bool) for v in present) and len(present) == len(values):
+                arrays[column] = numpy.array(values, dtype=bool)
+            elif present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+                if len(present) == len(values) and all(isinstance(v, int) for v in present):
+                    arrays[column] = numpy.array(values, dtype=numpy.int64)
+                else:
+                    arrays[column] = numpy.array([numpy.nan if v is None else v for v in values], dtype=numpy.float64)
+            else:
+                arrays[column] = numpy.array([u"" if v is None else u"{}".format(v) for v in values])
+        return arrays
+
+if sys.version_info[0] < 3:
+    def open_csv(path, mode):
+        return open(path, mode + "b")
+
+    def csv_value(value):
+        if value is None:
+            return ""
+        if isinstance(value, unicode):
+            return value.encode("utf-8")
+        return value
+else:
+    def open_csv(path, mode):
+        return open(path, mode, newline="", encoding="utf-8")
+
+    def csv_value(value):
+        return "" if value is None else value
+
+def write_csv(path, table, append=False):
+    """Write (or append) the table; an existing file is rewritten if new columns appeared."""
+    columns = list(table.columns)
+    if append and os.path.exists(path):
+        with open_csv(path, "r") as f:
+            header = next(csv.reader(f), [])
+        if header and set(columns) <= set(header):
+            with open_csv(path, "a") as f:
+                writer = csv.writer(f)
+                for i in range(table.length):
+                    writer.writerow([csv_value(table.columns[c][i]) if c in table.columns else "" for c in header])
+            return
+        columns = header + [c for c in columns if c not in header]
+        tmp = path + ".tmp"
+        with open_csv(path, "r") as src, open_csv(tmp, "w") as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst)
+            next(reader, None)
+            writer.writerow(columns)
+            for row in reader:
+                writer.writerow(row + [""] * (len(columns) - len(row)))
+            for i in range(table.length):
+                writer.writerow([csv_value(table.columns[c][i]) if c in table.columns else "" for c in columns])
+        os.rename(tmp, path)
+        return
+    with open_csv(path, "w") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for i in range(table.length):
+            writer.writerow([csv_value(table.columns[c][i]) for c in columns])
+
+def write_npz(path, table):
+    numpy.savez_compressed(path, **table.arrays())
+
+def write_parquet(path, table):
+    pyarrow.parquet.write_table(pyarrow.Table.from_pydict(table.arrays()), path)
+
+def load_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {"files": {}, "runs": []}
+
+def save_state(path, state):
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.rename(path + ".tmp", path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("paths", nargs="+", help="results directories to scan")
+    parser.add_argument("-o", "--output", default="aggregated", help="directory for the tables")
+    parser.add_argument("-f", "--format", action="append", choices=["csv", "npz", "parquet"],
+                        help="output format, may be given several times (default: csv)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("-i", "--incremental", action="store_true", help="only process files added or changed since the last run")
+    parser.add_argument("-t", "--tag", default=None, help="only keep sessions with this cnf_tag")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+    formats = args.format or ["csv"]
+    if "npz" in formats and numpy is None:
+        parser.error("the npz format needs numpy")
+    if "parquet" in formats and (numpy is None or pyarrow is None):
+        parser.error("the parquet format needs numpy and pyarrow")
+
+    if not os.path.exists(args.output):
+        os.makedirs(args.output)
+    state_path = os.path.join(args.output, STATE_FILE)
+    state = load_state(state_path) if args.incremental else {"files": {}, "runs": []}
+
+    time_start = time.time()
+    groups = scan(args.paths)
+    jobs = []
+    seen = {}
+    for key, files in groups.items():
+        new = set()
+        for section, path in files.items():
+            seen[path] = file_state(path)
+            if state["files"].get(path) != seen[path]:
+                new.add(section)
+        if new:
+            jobs.append((key, files, new))
+    if args.verbose:
+        print("{} sessions found, {} with new files".format(len(groups), len(jobs)))
+
+    tables = dict((table, Table()) for table in TABLES)
+    failed = set()
+    pool = Pool(args.workers)
+    try:
+        for key, rows, error in pool.imap_unordered(process_group, jobs, chunksize=16):
+            if error:
+                print("Skipping " + error)
+                failed.add(key)
+                continue
+            for table, table_rows in rows.items():
+                for row in table_rows:
+                    if args.tag is None or row["cnf_tag"] == args.tag:
+                        tables[table].append(row)
+    finally:
+        pool.close()
+        pool.join()
+
+    part = time.strftime("%Y%m%d-%H%M%S", time.gmtime(time_start))
+    for name, table in tables.items():
+        if not table.length:
+            continue
+        if "csv" in formats:
+            write_csv(os.path.join(args.output, name + ".csv"), table, append=args.incremental)
+        suffix = ("." + part) if args.incremental else ""
+        if "npz" in formats:
+            write_npz(os.path.join(args.output, name + suffix + ".npz"), table)
+        if "parquet" in formats:
+            write_parquet(os.path.join(args.output, name + suffix + ".parquet"), table)
+        if args.verbose:
+            print("{}: {} rows".format(name, table.length))
+
+    # Files of sessions that could not be read are retried on the next run
+    for key, files, new in jobs:
+        if key not in failed:
+            for path in files.values():
+                state["files"][path] = seen[path]
+    state["runs"].append({"time": time_start, "duration": time.time() - time_start,
+                          "sessions": len(jobs) - len(failed), "failed": len(failed)})
+    if args.incremental:
+        save_state(state_path, state)
+
+if __name__ == "__main__":
+    main()
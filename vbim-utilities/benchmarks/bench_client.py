@@ -0,0 +1,357 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Benchmark suite of the node-side result pipeline of the VBIM client.
+
+Runs the parsers and orchestrator phases of the client on synthetic
+fixtures (see fixtures.py) and reports per component the throughput, the
+latency percentiles of a call and its peak memory:
+
+  - ping parsing (pingparser.parse_lines and pingparser.parse) of outputs
+    with 10 to 100000 replies,
+  - traceroute parsing (parse_traceroute) of 30 hop outputs with stars,
+    annotations and ASNs, the missing ASNs resolved by an offline stub,
+  - QoE event extraction from a browser console log,
+  - writing a result bundle,
+  - a burst of modem metadata into SharedMetaState and MetadataWriter,
+  - get_config_combinations on a large multiconfig list, save_output and
+    receive_metadata.
+
+Every component runs in its own process, so that the peak memory of one does
+not hide that of the next. Nothing is sent over the network.
+
+The results can be saved as JSON baseline (--save) and compared against one
+(--compare); the exit status is 1 if a component got slower or needs more
+memory than the tolerance allows, e.g.
+
+    ./bench_client.py --save baseline.json
+    ./bench_client.py --compare baseline.json --tolerance 0.2
+"""
+
+import argparse
+from collections import OrderedDict
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "vbim-client", "files"))
+import fixtures
+
+class StubResolver(object):
+    """Offline stand-in of asn_lookup.AsnResolver: a deterministic ASN per address."""
+
+    def get_asns(self, ips):
+        return dict((ip, str(sum(int(part) for part in ip.split(".")) + 64512)) for ip in ips)
+
+class Component(object):
+    """A benchmarked function; setup(rng, workdir) returns (call, items per call)."""
+
+    def __init__(self, name, unit, setup, calls, quick_calls=None):
+        self.name = name
+        self.unit = unit
+        self.setup = setup
+        self.calls = calls
+        self.quick_calls = quick_calls or max(1, calls // 10)
+
+def vbim_config(workdir):
+    from settings import EXPCONFIG
+    expconfig = EXPCONFIG.copy()
+    expconfig.update({"cnf_resultdir": workdir, "cnf_save_metadata_resultdir": os.path.join(workdir, "metadata"),
+                      "cnf_verbosity": 0, "cnf_player": "dashjs"})
+    return expconfig
+
+def setup_ping(replies, summary_only=False):
+    def setup(rng, workdir):
+        import pingparser
+        output = fixtures.synthetic_ping(rng, replies)
+        if summary_only:
+            return (lambda: pingparser.parse(output)), replies
+        lines = output.splitlines(True)
+        return (lambda: pingparser.parse_lines(lines)), replies
+    return setup
+
+def setup_traceroute(outputs):
+    def setup(rng, workdir):
+        import traceroute_parser
+        data = [fixtures.synthetic_traceroute(rng) for i in range(outputs)]
+        resolver = StubResolver()
+        def call():
+            for output in data:
+                traceroute_parser.parse_traceroute(output, asnlookup=True, resolver=resolver)
+        return call, sum(output.count("\n") - 1 for output in data)
+    return setup
+
+def setup_qoe(entries):
+    def setup(rng, workdir):
+        import qoe_events
+        log = fixtures.synthetic_console_log(rng, entries)
+        return (lambda: qoe_events.compute_kpis(qoe_events.extract_events(log, "dashjs"))), entries
+    return setup
+
+def setup_bundle(entries):
+    def setup(rng, workdir):
+        from result_bundle import BundleWriter
+        console = os.path.join(workdir, "console.jsonl")
+        with open(console, "w") as f:
+            for entry in fixtures.synthetic_console_log(rng, entries):
+                f.write(json.dumps(entry) + "\n")
+        summary = fixtures.synthetic_summary(rng)
+        ping = {"raw": fixtures.synthetic_ping(rng, 60)}
+        def call():
+            with BundleWriter(os.path.join(workdir, "result.bundle"), meta={"interface": "op0"}) as bundle:
+                bundle.add_json("SUMMARY", summary)
+                bundle.add_file("CONSOLEOUTPUT", console, "jsonl")
+                bundle.add_json("PING", ping)
+        return call, 1
+    return setup
+
+def setup_metadata_update(messages):
+    def setup(rng, workdir):
+        from metastore import SharedMetaState
+        from metadata_writer import MetadataWriter
+        burst = [data.split(" ", 1)[1] for data in fixtures.synthetic_modem_messages(rng, messages)]
+        state = SharedMetaState()
+        writer = MetadataWriter(os.path.join(workdir, "metadata"), "METADATA", compress=True)
+        def call():
+            for msgdata in burst:
+                state.update(json.loads(msgdata))
+                writer.write(msgdata)
+            writer.flush()
+            state.drain()
+        return call, messages
+    return setup
+
+def setup_config_combinations(configurations):
+    def setup(rng, workdir):
+        from settings import get_config_combinations
+        expconfig = vbim_config(workdir)
+        expconfig.update({"cnf_multiconfig_enabled": True, "cnf_multiconfig_randomize": False,
+                          "cnf_multiconfig": fixtures.synthetic_multiconfig(rng, configurations)})
+        return (lambda: list(get_config_combinations(expconfig))), configurations
+    return setup
+
+def setup_save_output(summaries):
+    def setup(rng, workdir):
+        import results
+        results.TAG = ""
+        expconfig = vbim_config(workdir)
+        messages = [json.dumps(fixtures.synthetic_summary(rng)) for i in range(summaries)]
+        def call():
+            for i, msg in enumerate(messages):
+                results.save_output(expconfig=expconfig, msg=msg, postfix=str(i), tstamp="20200101-000000",
+                                 outdir=workdir, interface="op0")
+        return call, summaries
+    return setup
+
+class FakeSocket(object):
+    """Replays a list of messages through recv_string(), like the zmq SUB socket of metadata_hub."""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.index = 0
+
+    def recv_string(self):
+        data = self.messages[self.index % len(self.messages)]
+        self.index += 1
+        return data
+
+def setup_metadata_receive(messages):
+    def setup(rng, workdir):
+        from metastore import SharedMetaState
+        import metadata_subscriber
+        metadata_subscriber.TAG = ""
+        expconfig = vbim_config(workdir)
+        socket = FakeSocket(fixtures.synthetic_modem_messages(rng, messages))
+        meta_states = dict((ifname, SharedMetaState()) for ifname in ("op0", "op1", "op2"))
+        writers = {}
+        def call():
+            saved = OrderedDict()
+            for i in range(messages):
+                metadata_subscriber.receive_metadata(socket, meta_states, writers, saved, True, expconfig)
+            for writer in writers.values():
+                writer.flush()
+            for state in meta_states.values():
+                state.drain()
+        return call, messages
+    return setup
+
+COMPONENTS = [
+    Component("ping_parse_lines_10", "replies", setup_ping(10), 2000),
+    Component("ping_parse_lines_1000", "replies", setup_ping(1000), 200),
+    Component("ping_parse_lines_100000", "replies", setup_ping(100000), 5, 2),
+    Component("ping_parse_10", "replies", setup_ping(10, summary_only=True), 2000),
+    Component("ping_parse_1000", "replies", setup_ping(1000, summary_only=True), 200),
+    Component("ping_parse_100000", "replies", setup_ping(100000, summary_only=True), 5, 2),
+    Component("traceroute_parse", "hops", setup_traceroute(10), 200),
+    Component("qoe_extract", "entries", setup_qoe(5000), 50),
+    Component("bundle_write", "bundles", setup_bundle(5000), 50),
+    Component("metadata_update", "messages", setup_metadata_update(10000), 10, 2),
+    Component("config_combinations", "configurations", setup_config_combinations(1000), 100),
+    Component("save_output", "files", setup_save_output(100), 20),
+    Component("metadata_receive", "messages", setup_metadata_receive(10000), 10, 2),
+]
+
+def percentile(ordered, p):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+def max_rss_kb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else None
+
+def measure(component, calls, seed):
+    """Run a component in the current process and return its results."""
+    rng = random.Random(seed)
+    workdir = tempfile.mkdtemp(prefix="vbim-bench-")
+    try:
+        call, items = component.setup(rng, workdir)
+        gc.collect()
+        rss_before = max_rss_kb()
+        # Warm up, e.g. compiled patterns and imports
+        call()
+        gc.collect()
+        latencies = []
+        for i in range(calls):
+            start = time.time()
+            call()
+            latencies.append(time.time() - start)
+        # The peak memory of one more call, tracing would distort the latencies;
+        # without tracemalloc the growth of the maximum RSS since the setup
+        if tracemalloc is not None:
+            gc.collect()
+            tracemalloc.start()
+            call()
+            peak_kb = tracemalloc.get_traced_memory()[1] // 1024
+            tracemalloc.stop()
+            memory = "tracemalloc"
+        else:
+            peak_kb = max_rss_kb() - rss_before if rss_before is not None else None
+            memory = "maxrss"
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies.sort()
+    total = sum(latencies)
+    return OrderedDict([("unit", component.unit),
+                        ("items_per_call", items),
+                        ("calls", calls),
+                        ("throughput", items * calls / total if total > 0 else None),
+                        ("p50_ms", percentile(latencies, 50) * 1000),
+                        ("p90_ms", percentile(latencies, 90) * 1000),
+                        ("p99_ms", percentile(latencies, 99) * 1000),
+                        ("peak_memory_kb", peak_kb),
+                        ("memory", memory)])
+
+def measure_isolated(component, calls, seed):
+    """Run measure() in a forked child and return its results (or an error)."""
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(r)
+        try:
+            result = measure(component, calls, seed)
+        except Exception as e:
+            result = {"error": "{}: {}".format(type(e).__name__, e)}
+        with os.fdopen(w, "w") as f:
+            json.dump(result, f)
+        os._exit(0)
+    os.close(w)
+    with os.fdopen(r) as f:
+        data = f.read()
+    os.waitpid(pid, 0)
+    try:
+        return json.loads(data, object_pairs_hook=OrderedDict)
+    except ValueError:
+        return {"error": "benchmark process died"}
+
+def compare(results, baseline, tolerance):
+    """Print the change against the baseline; return the names of the regressed components."""
+    regressed = []
+    print("")
+    print("{:26s} {:>10s} {:>10s} {:>8s} {:>10s} {:>10s} {:>8s}".format("vs. baseline", "p50 ms", "was", "change", "peak KiB", "was", "change"))
+    for name, result in results.items():
+        old = baseline.get("components", {}).get(name)
+        if old is None or "error" in old or "error" in result:
+            continue
+        changes = []
+        for key in ("p50_ms", "peak_memory_kb"):
+            if old.get(key) and result.get(key) is not None:
+                changes.append(float(result[key]) / old[key] - 1)
+            else:
+                changes.append(None)
+        # Memory measured differently (other Python version) is not comparable
+        if old.get("memory") != result.get("memory"):
+            changes[1] = None
+        flag = " REGRESSION" if any(change is not None and change > tolerance for change in changes) else ""
+        if flag:
+            regressed.append(name)
+        print("{:26s} {:10.3f} {:10.3f} {:>8s} {:>10s} {:>10s} {:>8s}{}".format(
+            name, result["p50_ms"], old["p50_ms"], "{:+.0%}".format(changes[0]) if changes[0] is not None else "-",
+            str(result["peak_memory_kb"]), str(old.get("peak_memory_kb")),
+            "{:+.0%}".format(changes[1]) if changes[1] is not None else "-", flag))
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("-k", "--filter", help="only run the components whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="fewer calls per component")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", metavar="FILE", help="save the results as JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare the results with a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative increase of p50 latency and peak memory")
+    args = parser.parse_args()
+
+    results = OrderedDict()
+    print("{:26s} {:>14s} {:>10s} {:>10s} {:>10s} {:>10s}".format("component", "throughput/s", "p50 ms", "p90 ms", "p99 ms", "peak KiB"))
+    for component in COMPONENTS:
+        if args.filter and args.filter not in component.name:
+            continue
+        result = measure_isolated(component, component.quick_calls if args.quick else component.calls, args.seed)
+        results[component.name] = result
+        if "error" in result:
+            print("{:26s} failed: {}".format(component.name, result["error"]))
+            continue
+        print("{:26s} {:14.0f} {:10.3f} {:10.3f} {:10.3f} {:>10s}  {}".format(
+            component.name, result["throughput"], result["p50_ms"], result["p90_ms"], result["p99_ms"],
+            str(result["peak_memory_kb"]), component.unit))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(OrderedDict([("time", time.time()),
+                                   ("python", platform.python_version()),
+                                   ("machine", platform.machine()),
+                                   ("seed", args.seed),
+                                   ("quick", args.quick),
+                                   ("components", results)]), f, indent=2)
+    failed = any("error" in result for result in results.values())
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("python") != platform.python_version():
+            print("Note: baseline was measured with Python {}".format(baseline.get("python")))
+        if compare(results, baseline, args.tolerance):
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Benchmark of the traceroute parsers of the VBIM client.
+
+Generates large synthetic "traceroute -A" outputs (many targets, load
+balanced hops with several addresses, timeouts and annotations), checks that
+the single-pass parser (parse_traceroute) returns the same result as the
+regular expression parser (parse_traceroute_regex) and reports the time per
+output, lines and hops per second of both, and of the streaming hop parser
+(iter_hops) alone, without the conversion of the Hop tuples to dicts.
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "vbim-client", "files"))
+import traceroute_parser
+from fixtures import synthetic_traceroute
+
+def hops_only(output, asnlookup=False):
+    return list(traceroute_parser.iter_hops(output.splitlines()))
+
+def best_of(repeat, func, outputs):
+    times = []
+    for i in range(repeat):
+        gc.collect()
+        start = time.time()
+        for output in outputs:
+            func(output, asnlookup=False)
+        times.append(time.time() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("-n", "--outputs", type=int, default=2000, help="number of traceroute outputs")
+    parser.add_argument("--hops", type=int, default=30)
+    parser.add_argument("--probes", type=int, default=3, help="probes per hop")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="report the best of this many rounds")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    outputs = [synthetic_traceroute(rng, args.hops, args.probes) for i in range(args.outputs)]
+    lines = sum(output.count("\n") for output in outputs)
+    hops = lines - len(outputs)
+
+    for output in outputs:
+        expected = traceroute_parser.parse_traceroute_regex(output, asnlookup=False)
+        if traceroute_parser.parse_traceroute(output, asnlookup=False) != expected:
+            sys.exit("Parsers disagree on:\n" + output)
+
+    print("{} outputs, {} lines, {:.1f} MB".format(len(outputs), lines, sum(len(o) for o in outputs) / 1e6))
+    results = {}
+    for name, func in [("regex", traceroute_parser.parse_traceroute_regex),
+                       ("single-pass", traceroute_parser.parse_traceroute),
+                       ("hops only", hops_only)]:
+        elapsed = best_of(args.repeat, func, outputs)
+        results[name] = elapsed
+        print("{:12s} {:8.3f}s {:9.1f} us/output {:10.0f} lines/s {:10.0f} hops/s".format(
+            name, elapsed, elapsed / len(outputs) * 1e6, lines / elapsed, hops / elapsed))
+    print("speedup      {:.2f}x ({:.2f}x hops only)".format(results["regex"] / results["single-pass"], results["regex"] / results["hops only"]))
+
+if __name__ == "__main__":
+    main()
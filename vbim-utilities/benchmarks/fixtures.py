@@ -0,0 +1,136 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Synthetic inputs for the benchmarks of the VBIM client.
+
+All generators take a random.Random, so that the same seed gives the same
+fixtures on every machine and Python version.
+"""
+
+import json
+
+def random_ip(rng):
+    return "{}.{}.{}.{}".format(rng.randint(1, 223), rng.randint(0, 255), rng.randint(0, 255), rng.randint(1, 254))
+
+def synthetic_ping(rng, replies=11, loss=0.01, duplicates=0.001, target="orf.at"):
+    """Return the output of "ping -D -a -c replies" with some lost, duplicated and unreachable replies."""
+    ip = random_ip(rng)
+    lines = ["PING {} ({}) 56(84) bytes of data.".format(target, ip)]
+    now = 1590000000.0 + rng.random() * 1e7
+    received = 0
+    rtts = []
+    for seq in range(1, replies + 1):
+        now += 1.0 + rng.random() * 0.01
+        r = rng.random()
+        if r < loss:
+            if r < loss / 2:
+                lines.append("From {} icmp_seq={} Destination Host Unreachable".format(random_ip(rng), seq))
+            continue
+        rtt = rng.uniform(5, 80) if rng.random() > 0.02 else rng.uniform(200, 2000)
+        rtts.append(rtt)
+        received += 1
+        lines.append("[{:.6f}] 64 bytes from {}: icmp_seq={} ttl=57 time={:.3g} ms".format(now, ip, seq, rtt))
+        if rng.random() < duplicates:
+            lines.append("[{:.6f}] 64 bytes from {}: icmp_seq={} ttl=57 time={:.3g} ms (DUP!)".format(now + 0.001, ip, seq, rtt))
+    lines.append("")
+    lines.append("--- {} ping statistics ---".format(target))
+    lines.append("{} packets transmitted, {} received, {:g}% packet loss, time {}ms".format(
+        replies, received, round(100.0 * (replies - received) / replies), replies * 1000))
+    if rtts:
+        mean = sum(rtts) / len(rtts)
+        mdev = (sum((rtt - mean) ** 2 for rtt in rtts) / len(rtts)) ** 0.5
+        lines.append("rtt min/avg/max/mdev = {:.3f}/{:.3f}/{:.3f}/{:.3f} ms".format(min(rtts), mean, max(rtts), mdev))
+    return "\n".join(lines) + "\n"
+
+def synthetic_traceroute(rng, hops=30, probes=3, paths=3):
+    """Return the output of one "traceroute -A"; hops of load balanced paths answer from up to paths addresses."""
+    target_ip = random_ip(rng)
+    lines = ["traceroute to target{}.example.net ({}), {} hops max, 60 byte packets".format(rng.randint(0, 9999), target_ip, hops)]
+    routers = [[random_ip(rng) for i in range(paths)] for hop in range(hops)]
+    for hop in range(1, hops + 1):
+        fields = []
+        last = None
+        for i in range(probes):
+            r = rng.random()
+            if r < 0.1:
+                fields.append("*")
+                continue
+            ip = target_ip if hop == hops else rng.choice(routers[hop - 1])
+            if ip != last:
+                name = ip if r < 0.4 else "r{}.as{}.example.net".format(hop, rng.randint(1, 65000))
+                asn = "[*]" if r < 0.2 else "[AS{}]".format(rng.randint(1, 65000))
+                fields.append("{} ({}) {}".format(name, ip, asn))
+                last = ip
+            fields.append("{:.3f} ms".format(rng.uniform(0.1, 300)))
+            if r > 0.98:
+                fields.append("!H")
+        lines.append("{:2d}  {}".format(hop, "  ".join(fields)))
+    return "\n".join(lines) + "\n"
+
+def synthetic_console_log(rng, entries=1000, player="dashjs"):
+    """Return driver.get_log("browser") entries of a playback: quality changes, buffer levels, stalls and noise."""
+    url = "https://vbim.example.net/players/{}.php?title=t&userId=u 60:14 ".format(player)
+    now = 1590000000000 + rng.randint(0, 10 ** 9)
+    log = [{"level": "INFO", "source": "console-api", "timestamp": now,
+            "message": url + '"sessionID = " "{:016x}"'.format(rng.getrandbits(64))}]
+    stalled = False
+    for i in range(entries - 1):
+        now += rng.randint(50, 1000)
+        r = rng.random()
+        if i == 5:
+            message = url + '"FIRST FRAME --->" {}'.format(now)
+        elif r < 0.6:
+            message = url + '"BUFFER --->" {:.3f}'.format(rng.uniform(0, 30))
+        elif r < 0.7:
+            message = url + '"QUALITY --->" {} 1280 720'.format(rng.choice([250000, 500000, 1000000, 3000000, 6000000]))
+        elif r < 0.75:
+            message = url + ('"STALL END --->" {}' if stalled else '"STALL START --->" {}').format(now)
+            stalled = not stalled
+        elif r < 0.77:
+            log.append({"level": "SEVERE", "source": "network", "timestamp": now,
+                        "message": "https://cdn.example.net/seg{}.m4s - Failed to load resource: net::ERR_TIMED_OUT".format(i)})
+            continue
+        else:
+            message = url + '"[{}][StreamController] ignored library output {}"'.format(now, i)
+        log.append({"level": "INFO", "source": "console-api", "timestamp": now, "message": message})
+    return log
+
+def synthetic_multiconfig(rng, configurations=1000):
+    """Return a cnf_multiconfig list of player/ABR/target combinations."""
+    players = [("bitmovin", "abrDynamic"), ("dashjs", "abrBola"), ("dashjs", "abrDynamic"),
+               ("dashjs", "abrThroughput"), ("shaka", "abrDynamic")]
+    result = []
+    for i in range(configurations):
+        player, abr = rng.choice(players)
+        result.append({"cnf_player": player, "cnf_abr": abr, "cnf_duration": rng.choice([30, 60, 120]),
+                       "cnf_ping_target": rng.choice(["cdn.bitmovin.com", "cdnjs.cloudflare.com", random_ip(rng)]),
+                       "cnf_tag": "config{}".format(i)})
+    return result
+
+def synthetic_summary(rng, stalls=20, events=200):
+    """Return a SUMMARY dict of about the size of a real one."""
+    summary = dict(("cnf_customdata{}".format(i), "testCustomData{}".format(i)) for i in range(1, 6))
+    summary.update({"summary_time_run": "20200101-000000", "summary_interface": "op0", "cnf_player": "dashjs",
+                    "summary_playback_stalls": [{"start": rng.random() * 60, "duration": rng.random() * 5} for i in range(stalls)],
+                    "summary_playback_events": [{"type": "waiting", "time": 1590000000000 + i} for i in range(events)],
+                    "summary_data_usage_series": {"rx_bps": [rng.randint(0, 10 ** 7) for i in range(120)],
+                                                  "tx_bps": [rng.randint(0, 10 ** 5) for i in range(120)]}})
+    return summary
+
+def synthetic_modem_messages(rng, messages=10000, interfaces=("op0", "op1", "op2")):
+    """Return a burst of "topic json" MONROE.META.DEVICE.MODEM strings as sent by the metadata publisher."""
+    topic = "MONROE.META.DEVICE.MODEM"
+    result = []
+    for sequence_number in range(1, messages + 1):
+        ifname = interfaces[sequence_number % len(interfaces)]
+        msg = {"SequenceNumber": sequence_number, "Timestamp": 1590000000.0 + sequence_number * 0.01,
+               "DataVersion": 3, "DataId": topic, "InternalInterface": ifname, "InterfaceName": ifname,
+               "Operator": "localOperator", "ICCID": "localIccid." + ifname, "IMSIMCCMNC": 24201, "NWMCCMNC": 24201,
+               "CID": 1000 + sequence_number % 3, "LAC": 42, "DEVICEMODE": 4 if (sequence_number // 20) % 2 == 0 else 3,
+               "DEVICESUBMODE": 0, "RSSI": rng.randint(-95, -55), "RSRP": rng.randint(-120, -80), "RSRQ": rng.randint(-15, -5)}
+        result.append("{}.{}.UPDATE {}".format(topic, msg["ICCID"], json.dumps(msg)))
+    return result
@@ -0,0 +1,70 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Local stand-in for the MONROE metadata publisher.
+
+Publishes synthetic MONROE.META.DEVICE.MODEM messages for the given
+interfaces on a ZeroMQ PUB socket, so that the VBIM client metadata hub can be
+run without a MONROE node, e.g. with "zmqport": "tcp://127.0.0.1:5556".
+"""
+
+import argparse
+import json
+import random
+import time
+
+import zmq
+
+TOPIC = "MONROE.META.DEVICE.MODEM"
+
+def modem_message(ifname, sequence_number, devicemode):
+    return {"SequenceNumber": sequence_number,
+            "Timestamp": time.time(),
+            "DataVersion": 3,
+            "DataId": TOPIC,
+            "InternalInterface": ifname,
+            "InterfaceName": ifname,
+            "Operator": "localOperator",
+            "ICCID": "localIccid." + ifname,
+            "IMSIMCCMNC": 24201,
+            "NWMCCMNC": 24201,
+            "CID": 1000 + sequence_number % 3,
+            "LAC": 42,
+            "DEVICEMODE": devicemode,
+            "DEVICESUBMODE": 0,
+            "RSSI": random.randint(-95, -55),
+            "RSRP": random.randint(-120, -80),
+            "RSRQ": random.randint(-15, -5)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--bind", default="tcp://127.0.0.1:5556", help="ZeroMQ endpoint to publish on")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between rounds of messages")
+    parser.add_argument("--duplicates", type=int, default=0, help="publish every message this many extra times")
+    parser.add_argument("--count", type=int, default=0, help="stop after this many rounds (0 = forever)")
+    parser.add_argument("interfaces", nargs="*", default=["op0", "op1", "op2"])
+    args = parser.parse_args()
+
+    socket = zmq.Context().socket(zmq.PUB)
+    socket.bind(args.bind)
+
+    sequence_number = 0
+    rounds = 0
+    while not args.count or rounds < args.count:
+        for ifname in args.interfaces:
+            sequence_number += 1
+            # Change the device mode now and then (LTE / 3G)
+            devicemode = 4 if (sequence_number // 20) % 2 == 0 else 3
+            msg = modem_message(ifname, sequence_number, devicemode)
+            data = "{}.{}.UPDATE {}".format(TOPIC, msg["ICCID"], json.dumps(msg))
+            for i in range(1 + args.duplicates):
+                socket.send_string(data)
+        rounds += 1
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Local HTTPS stand-in for the MONROE results server.
+
+Serves a directory with listings like the MONROE user area, with ETag,
+Last-Modified, conditional and range request support, and optionally requires
+a client certificate, so that retrieve_results.py can be run and tested
+without access to the MONROE system, e.g.
+
+    openssl req -x509 -newkey rsa:2048 -nodes -subj /CN=localhost \\
+        -keyout server.key -out server.crt
+    ./results_server.py --cert server.crt --key server.key results/
+    ./retrieve_results.py --base-url https://localhost:8443/user/ \\
+        --ca-bundle server.crt 1 10
+
+with the experiment directories in results/user/<id>/.
+"""
+
+import argparse
+import email.utils
+import os
+import random
+import ssl
+import sys
+try:
+    from BaseHTTPServer import HTTPServer
+    from SimpleHTTPServer import SimpleHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+except ImportError:
+    from http.server import HTTPServer, SimpleHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+class ResultsHandler(SimpleHTTPRequestHandler):
+    """SimpleHTTPRequestHandler with keep-alive, validators and single byte ranges."""
+
+    protocol_version = "HTTP/1.1"
+    error_rate = 0.0
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) or not os.path.isfile(path):
+            return SimpleHTTPRequestHandler.send_head(self)
+        if random.random() < self.error_rate:
+            self.send_error(503, "Injected error")
+            return None
+
+        f = open(path, "rb")
+        st = os.fstat(f.fileno())
+        etag = '"{:x}-{:x}"'.format(st.st_size, int(st.st_mtime))
+        last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+        if self.headers.get("If-None-Match") == etag or \
+           (self.headers.get("If-Modified-Since") == last_modified and "If-None-Match" not in self.headers):
+            f.close()
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+
+        start, end = 0, st.st_size - 1
+        ranged = False
+        range_header = self.headers.get("Range")
+        if range_header and range_header.startswith("bytes=") and self.headers.get("If-Range", etag) == etag:
+            first, _, last = range_header[len("bytes="):].partition("-")
+            try:
+                start = int(first)
+                if last:
+                    end = min(int(last), end)
+                ranged = True
+            except ValueError:
+                pass
+            if ranged and start >= st.st_size:
+                f.close()
+                self.send_response(416)
+                self.send_header("Content-Range", "bytes */{}".format(st.st_size))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+
+        f.seek(start)
+        self.send_response(206 if ranged else 200)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(end - start + 1))
+        if ranged:
+            self.send_header("Content-Range", "bytes {}-{}/{}".format(start, end, st.st_size))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        return _Limited(f, end - start + 1)
+
+class _Limited(object):
+    """File object reading at most length bytes, as served for a range."""
+
+    def __init__(self, f, length):
+        self.f = f
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.f.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.f.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("directory", help="directory to serve")
+    parser.add_argument("--bind", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--cert", help="server certificate (plain HTTP if not given)")
+    parser.add_argument("--key", help="server private key")
+    parser.add_argument("--client-ca", help="require client certificates issued by these CAs")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of file requests answered with 503")
+    args = parser.parse_args()
+
+    ResultsHandler.error_rate = args.error_rate
+    server = ThreadingHTTPServer((args.bind, args.port), ResultsHandler)
+    if args.cert:
+        context = ssl.SSLContext(getattr(ssl, "PROTOCOL_TLS_SERVER", ssl.PROTOCOL_SSLv23))
+        context.load_cert_chain(args.cert, args.key)
+        if args.client_ca:
+            context.verify_mode = ssl.CERT_REQUIRED
+            context.load_verify_locations(args.client_ca)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    os.chdir(args.directory)
+    sys.stderr.write("Serving {} on {}://{}:{}/\n".format(args.directory, "https" if args.cert else "http", args.bind, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# License: GNU General Public License v3
+# Developed for use within the EU H2020 MONROE project
+
+"""
+Download the results of a range of MONROE experiments.
+
+Replacement for retrieve_results.sh: the result directories of the
+experiments are crawled and downloaded by a bounded pool of worker threads,
+each keeping a persistent HTTPS connection that authenticates with the user
+certificate. Files are stored in the same layout as "wget -r"
+(<output>/<host>/user/<id>/...), streamed to *.part files and renamed when
+complete.
+
+Downloaded files are recorded in a manifest (size, ETag, Last-Modified) so
+that reruns skip them, and interrupted downloads are resumed with a range
+request. Use --base-url and --ca-bundle to run against a local stand-in such
+as results_server.py.
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import ssl
+import sys
+import threading
+import time
+try:
+    import httplib
+    from Queue import Queue
+    from urllib import unquote
+    from urlparse import urljoin, urlsplit
+except ImportError:
+    import http.client as httplib
+    from queue import Queue
+    from urllib.parse import unquote, urljoin, urlsplit
+
+HREF_RE = re.compile(r'href\s*=\s*"([^"?#]+)"', re.IGNORECASE)
+CONTENT_RANGE_RE = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+MANIFEST_FILE = ".retrieve_manifest.json"
+CHUNK_SIZE = 65536
+
+class RetrieveError(Exception):
+    pass
+
+class Session(threading.local):
+    """Keeps one persistent connection per host and thread."""
+
+    def __init__(self, context, timeout=60):
+        self.context = context
+        self.timeout = timeout
+        self.connections = {}
+
+    def _connection(self, scheme, netloc):
+        conn = self.connections.get((scheme, netloc))
+        if conn is None:
+            if scheme == "https":
+                conn = httplib.HTTPSConnection(netloc, timeout=self.timeout, context=self.context)
+            else:
+                conn = httplib.HTTPConnection(netloc, timeout=self.timeout)
+            self.connections[(scheme, netloc)] = conn
+        return conn
+
+    def request(self, method, url, headers=None):
+        """Send the request and return the response, which must be read completely before the next request."""
+        parts = urlsplit(url)
+        path = parts.path + ("?" + parts.query if parts.query else "")
+        for attempt in range(2):
+            conn = self._connection(parts.scheme, parts.netloc)
+            try:
+                conn.request(method, path, headers=headers or {})
+                return conn.getresponse()
+            except (socket.error, httplib.HTTPException):
+                # The server may have closed the idle connection, reconnect once
+                conn.close()
+                del self.connections[(parts.scheme, parts.netloc)]
+                if attempt:
+                    raise
+
+    def close(self):
+        for conn in self.connections.values():
+            conn.close()
+        self.connections = {}
+
+class Manifest(object):
+    """Already downloaded files: url -> {"size", "etag", "last_modified", "time"}."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.changes = 0
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (IOError, OSError, ValueError):
+            self.entries = {}
+
+    def get(self, url):
+        with self.lock:
+            return self.entries.get(url)
+
+    def set(self, url, entry, save_every=50):
+        with self.lock:
+            self.entries[url] = entry
+            self.changes += 1
+        if self.changes >= save_every:
+            self.save()
+
+    def save(self):
+        with self.lock:
+            if not self.changes:
+                return
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+            os.rename(tmp, self.path)
+            self.changes = 0
+
+class Retriever(object):
+    """Crawls directory listings below the given URLs and downloads the files with workers threads."""
+
+    def __init__(self, session, output, manifest, workers=4, retries=3, revalidate=False, verbose=0):
+        self.session = session
+        self.output = os.path.abspath(output)
+        self.manifest = manifest
+        self.workers = workers
+        self.retries = retries
+        self.revalidate = revalidate
+        self.verbose = verbose
+        self.queue = Queue()
+        self.lock = threading.Lock()
+        self.stats = {"listed": 0, "downloaded": 0, "resumed": 0, "skipped": 0, "bytes": 0, "failed": 0}
+        self.failures = []
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def local_path(self, url):
+        parts = urlsplit(url)
+        path = os.path.normpath(os.path.join(self.output, parts.netloc, unquote(parts.path).lstrip("/")))
+        if not path.startswith(self.output + os.sep):
+            raise RetrieveError("{} is outside of the output directory".format(url))
+        return path
+
+    def list_directory(self, url, redirects=5):
+        """Queue the files and subdirectories linked from the listing at url (no parents)."""
+        resp = self.session.request("GET", url)
+        body = resp.read()
+        if resp.status in (301, 302, 303, 307, 308) and redirects:
+            return self.list_directory(urljoin(url, resp.getheader("Location")), redirects - 1)
+        if resp.status == 404:
+            if self.verbose:
+                print("Not found: " + url)
+            return
+        if resp.status != 200:
+            raise RetrieveError("{} {}".format(resp.status, resp.reason))
+        self.count("listed")
+        seen = set()
+        for href in HREF_RE.findall(body.decode("utf-8", "replace")):
+            target = urljoin(url, href)
+            if target in seen or target == url or not target.startswith(url):
+                continue
+            seen.add(target)
+            self.queue.put(("list" if target.endswith("/") else "get", target, 0))
+
+    def download(self, url):
+        path = self.local_path(url)
+        part = path + ".part"
+        entry = self.manifest.get(url)
+        complete = entry is not None and os.path.exists(path) and os.path.getsize(path) == entry["size"]
+        if complete and not self.revalidate:
+            self.count("skipped")
+            return
+
+        headers = {}
+        if complete:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            elif entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        if offset and not complete:
+            headers["Range"] = "bytes={}-".format(offset)
+            if entry and entry.get("etag"):
+                headers["If-Range"] = entry["etag"]
+
+        resp = self.session.request("GET", url, headers)
+        if resp.status == 304:
+            resp.read()
+            self.count("skipped")
+            return
+        if resp.status == 206:
+            m = CONTENT_RANGE_RE.match(resp.getheader("Content-Range", ""))
+            if not m or int(m.group(1)) != offset:
+                resp.read()
+                os.remove(part)
+                raise RetrieveError("unexpected Content-Range {}".format(resp.getheader("Content-Range")))
+            mode = "ab"
+            expected = int(m.group(3)) if m.group(3) != "*" else None
+            self.count("resumed")
+        elif resp.status == 200:
+            mode = "wb"
+            offset = 0
+            length = resp.getheader("Content-Length")
+            expected = int(length) if length is not None else None
+        else:
+            resp.read()
+            raise RetrieveError("{} {}".format(resp.status, resp.reason))
+
+        # Remember the validators first, so an interrupted download can be resumed safely
+        self.manifest.set(url, {"size": None, "etag": resp.getheader("ETag"),
+                                "last_modified": resp.getheader("Last-Modified"), "time": None})
+        directory = os.path.dirname(path)
+        if not os.path.exists(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+        size = offset
+        with open(part, mode) as f:
+            while True:
+                data = resp.read(CHUNK_SIZE)
+                if not data:
+                    break
+                f.write(data)
+                size += len(data)
+        self.count("bytes", size - offset)
+        if expected is not None and size != expected:
+            raise RetrieveError("incomplete, got {} of {} bytes".format(size, expected))
+        os.rename(part, path)
+        self.manifest.set(url, {"size": size, "etag": resp.getheader("ETag"),
+                                "last_modified": resp.getheader("Last-Modified"), "time": time.time()})
+        self.count("downloaded")
+        if self.verbose > 1:
+            print("Downloaded {} ({} bytes)".format(url, size))
+
+    def worker(self):
+        while True:
+            task = self.queue.get()
+            if task is None:
+                self.queue.task_done()
+                break
+            kind, url, attempt = task
+            try:
+                if kind == "list":
+                    self.list_directory(url)
+                else:
+                    self.download(url)
+            except Exception as e:
+                if attempt < self.retries:
+                    time.sleep(2 ** attempt)
+                    self.queue.put((kind, url, attempt + 1))
+                else:
+                    print("Failed {}: {}".format(url, e))
+                    self.count("failed")
+                    with self.lock:
+                        self.failures.append(url)
+            finally:
+                self.queue.task_done()
+        self.session.close()
+
+    def run(self, urls):
+        for url in urls:
+            self.queue.put(("list", url, 0))
+        threads = [threading.Thread(target=self.worker) for i in range(self.workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            # Queue.join() cannot be interrupted on Python 2, poll instead
+            while self.queue.unfinished_tasks:
+                time.sleep(0.2)
+        finally:
+            self.manifest.save()
+        for thread in threads:
+            self.queue.put(None)
+        for thread in threads:
+            thread.join()
+        self.manifest.save()
+        return not self.failures
+
+def create_context(cert=None, key=None, ca_bundle=None, insecure=False):
+    context = ssl.create_default_context(cafile=ca_bundle)
+    if insecure:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    if cert:
+        context.load_cert_chain(cert, key)
+    return context
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("begin", type=int, nargs="?", help="first experiment ID")
+    parser.add_argument("end", type=int, nargs="?", help="last experiment ID")
+    parser.add_argument("--cert", help="certificate file")
+    parser.add_argument("--key", help="private key file")
+    parser.add_argument("--base-url", default="https://www.monroe-system.eu/user/", help="URL of the experiment directories")
+    parser.add_argument("--ca-bundle", default=None, help="CA certificates to verify the server with")
+    parser.add_argument("--insecure", action="store_true", help="do not verify the server certificate")
+    parser.add_argument("-o", "--output", default=".", help="download directory")
+    parser.add_argument("-j", "--workers", type=int, default=8, help="number of parallel downloads")
+    parser.add_argument("--retries", type=int, default=3, help="attempts per file before giving up")
+    parser.add_argument("--revalidate", action="store_true", help="check already downloaded files with the server (ETag/Last-Modified)")
+    parser.add_argument("-v", "--verbose", action="count", default=0)
+    args = parser.parse_args()
+
+    # Ask like retrieve_results.sh for what was not given on the command line
+    read = raw_input if sys.version_info[0] < 3 else input
+    if args.begin is None:
+        args.begin = int(read("Range begin: "))
+    if args.end is None:
+        args.end = int(read("Range end: "))
+    if args.cert is None:
+        args.cert = read("Certificate file: ") or None
+    if args.cert and args.key is None:
+        args.key = read("Private key file: ") or None
+
+    base_url = args.base_url if args.base_url.endswith("/") else args.base_url + "/"
+    urls = ["{}{}/".format(base_url, x) for x in range(args.begin, args.end + 1)]
+    if args.verbose:
+        print("Range: {} - {}".format(args.begin, args.end))
+
+    context = create_context(args.cert, args.key, args.ca_bundle, args.insecure)
+    if not os.path.exists(args.output):
+        os.makedirs(args.output)
+    manifest = Manifest(os.path.join(args.output, MANIFEST_FILE))
+    retriever = Retriever(Session(context), args.output, manifest, args.workers, args.retries, args.revalidate, args.verbose)
+
+    time_start = time.time()
+    ok = retriever.run(urls)
+    stats = retriever.stats
+    print("{listed} directories, {downloaded} files downloaded ({resumed} resumed, {bytes} bytes), "
+          "{skipped} skipped, {failed} failed".format(**stats) + " in {:.1f}s".format(time.time() - time_start))
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()